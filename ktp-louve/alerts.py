@@ -0,0 +1,213 @@
+import json
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque, namedtuple
+from datetime import datetime
+import pygame
+
+ALERT_LOG_FILE = "alerts.log"
+ALERT_QUEUE_SIZE = 256  # Alerts waiting for the worker; beyond this new ones are dropped (and counted)
+SINK_QUEUE_SIZE = 64  # Alerts waiting for one blocking sink (e.g. a slow webhook); same drop policy
+DEBOUNCE_INTERVAL = 10.0  # The same alert for the same object sounds/posts at most this often (seconds)
+RATE_LIMIT = 10  # At most this many alerts sound/post ...
+RATE_WINDOW = 60.0  # ... per this many seconds, across all objects
+WEBHOOK_TIMEOUT = 2.0
+
+Alert = namedtuple("Alert", ["kind", "object_id", "timestamp", "message", "details"])
+
+
+class AudioSink:
+    """Plays a sound per alert kind, decoded once up front (pygame.mixer.Sound) instead of per alert.
+
+    Playback is fire-and-forget on a free mixer channel. An alert whose
+    sound is still playing doesn't start it a second time on top.
+    """
+
+    throttled = True  # Debounced and rate limited by AlertDispatcher
+
+    def __init__(self, default_sound, sounds=None):
+        self._sounds = {}
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            decoded = {}  # One decode per file, even if several kinds share it
+            for kind, path in [(None, default_sound)] + list((sounds or {}).items()):
+                if path not in decoded:
+                    decoded[path] = pygame.mixer.Sound(path)
+                self._sounds[kind] = decoded[path]
+        except Exception as e:
+            print(f"⚠️ Sound error: {e}")
+
+    def handle(self, alert):
+        sound = self._sounds.get(alert.kind, self._sounds.get(None))
+        if sound is not None and sound.get_num_channels() == 0:
+            sound.play()
+
+
+class LogSink:
+    """Appends one line per alert to a plain text file"""
+
+    def __init__(self, path=ALERT_LOG_FILE):
+        # Line-buffered, so a tail -f sees alerts as they happen
+        self._file = open(path, 'a', buffering=1)
+
+    def handle(self, alert):
+        when = datetime.fromtimestamp(alert.timestamp).astimezone().isoformat(timespec="seconds")
+        note = " (throttled: no sound/webhook)" if alert.details.get("throttled") else ""
+        self._file.write(f"{when} {alert.kind} object={alert.object_id} {alert.message}{note}\n")
+
+    def close(self):
+        self._file.close()
+
+
+class WebhookSink:
+    """POSTs each alert as JSON to an HTTP receiver (e.g. a local relay to SMS/Slack)"""
+
+    blocking = True  # Network I/O: AlertDispatcher gives it its own thread
+    throttled = True  # Debounced and rate limited by AlertDispatcher
+
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+
+    def handle(self, alert):
+        body = json.dumps({"kind": alert.kind, "object_id": alert.object_id, "timestamp": alert.timestamp,
+                           "message": alert.message, **alert.details}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class EventLogSink:
+    """Records each delivered alert in the event log (the detection events themselves are logged already)"""
+
+    def __init__(self, event_log):
+        self.event_log = event_log
+
+    def handle(self, alert):
+        self.event_log.log("alert", alert.object_id, alert.timestamp, alert=alert.kind, message=alert.message,
+                           **alert.details)
+
+
+class AlertDispatcher:
+    """Delivers alerts to sinks on a background thread, so raising one costs the frame loop a queue put.
+
+    Sinks with `throttled = True` (sound, webhook) don't get repeats of the
+    same (kind, object) within `debounce` seconds, nor more than
+    `rate_limit` alerts per `rate_window` seconds; those alerts count as
+    `suppressed`. The record sinks (log file, event log) get every alert,
+    with `throttled=True` in its details when the noisy ones were skipped,
+    so a burst leaves no gap in the audit trail. Sinks are objects
+    with handle(alert) (and optionally close()); one failing sink doesn't
+    keep the alert from the others. Sinks with `blocking = True` (the
+    webhook) get their own thread and queue, so a slow receiver never
+    delays the alarm sound or the log.
+    """
+
+    def __init__(self, sinks, debounce=DEBOUNCE_INTERVAL, rate_limit=RATE_LIMIT, rate_window=RATE_WINDOW,
+                 max_pending=ALERT_QUEUE_SIZE):
+        self.sinks = list(sinks)
+        self.debounce = debounce
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.delivered = 0
+        self.suppressed = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._last_sent = {}  # (kind, object_id) -> timestamp
+        self._recent = deque()  # Delivery timestamps inside the rate window
+        self._sink_workers = {id(sink): _SinkWorker(sink) for sink in self.sinks if getattr(sink, "blocking", False)}
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def dispatch(self, kind, object_id=None, message="", timestamp=None, **details):
+        """Queue an alert; never blocks"""
+        alert = Alert(kind, object_id, time.time() if timestamp is None else timestamp, message, details)
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def _allowed(self, alert):
+        key = (alert.kind, alert.object_id)
+        last = self._last_sent.get(key)
+        if last is not None and alert.timestamp - last < self.debounce:
+            return False
+        while self._recent and alert.timestamp - self._recent[0] >= self.rate_window:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            return False
+        self._last_sent[key] = alert.timestamp
+        self._recent.append(alert.timestamp)
+        return True
+
+    def _worker(self):
+        while True:
+            alert = self._queue.get()
+            if alert is None:
+                break
+            allowed = self._allowed(alert)
+            if not allowed:
+                self.suppressed += 1
+                alert = alert._replace(details=dict(alert.details, throttled=True))
+            for sink in self.sinks:
+                if not allowed and getattr(sink, "throttled", False):
+                    continue
+                worker = self._sink_workers.get(id(sink))
+                if worker is not None:
+                    worker.submit(alert)
+                else:
+                    _deliver(sink, alert)
+            self.delivered += 1
+
+    @property
+    def sink_dropped(self):
+        """Alerts a blocking sink's queue had no room for"""
+        return sum(worker.dropped for worker in self._sink_workers.values())
+
+    def close(self, timeout=5.0):
+        """Deliver what's queued, then stop the workers and close the sinks"""
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        for worker in self._sink_workers.values():
+            worker.close(timeout)
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+
+def _deliver(sink, alert):
+    try:
+        sink.handle(alert)
+    except Exception as e:
+        print(f"⚠️ Alert sink {type(sink).__name__} failed: {e}")
+
+
+class _SinkWorker:
+    """One blocking sink on its own thread, fed by AlertDispatcher after debounce/rate limiting"""
+
+    def __init__(self, sink, max_pending=SINK_QUEUE_SIZE):
+        self.sink = sink
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, alert):
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            alert = self._queue.get()
+            if alert is None:
+                break
+            _deliver(self.sink, alert)
+
+    def close(self, timeout):
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
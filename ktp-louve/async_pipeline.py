@@ -0,0 +1,134 @@
+import threading
+import time
+import numpy as np
+from openvino.runtime import AsyncInferQueue
+
+_FAILED = object()  # Placeholder in _done for a frame whose preprocessing or inference raised
+
+
+class AsyncInferencePipeline:
+    """Overlaps capture, preprocessing, inference and postprocessing.
+
+    A producer thread reads frames from `cap`, preprocesses them and submits
+    them to an OpenVINO AsyncInferQueue with several requests in flight.
+    Completed requests are parked by sequence number and handed back by
+    `results()` strictly in capture order, so the tracker never sees frames
+    out of order even though requests finish out of order. Each frame
+    keeps the time it was grabbed, since the capture has moved on by the
+    time it comes out. A frame that fails still fills its slot (and is
+    skipped, with the exception kept in `error`), so one failure can't
+    stall everything behind it.
+    """
+
+    def __init__(self, compiled_model, preprocess, num_requests=0, max_pending=None, gate=None):
+        # num_requests=0 lets OpenVINO pick the optimal number for the device
+        self.infer_queue = AsyncInferQueue(compiled_model, num_requests)
+        self.infer_queue.set_callback(self._on_done)
+        self.preprocess = preprocess
+        self.gate = gate  # Optional frame -> bool; False passes the frame through with output None
+        self.num_requests = len(self.infer_queue)
+        # Bound finished-but-not-consumed frames so a slow consumer applies backpressure
+        self.max_pending = max_pending or self.num_requests * 2
+
+        self._cond = threading.Condition()
+        self._done = {}  # seq -> (frame, output, grab timestamp), or _FAILED
+        self._next_submit = 0
+        self._next_emit = 0
+        self._producer = None
+        self._running = False
+        self._eof = False
+        self.error = None
+
+    def _on_done(self, request, userdata):
+        seq, frame, timestamp = userdata
+        try:
+            # The request's output buffer is reused for the next job, so take a copy
+            result = (frame, np.copy(request.get_output_tensor(0).data), timestamp)
+        except Exception as e:
+            self._fail(e)
+            result = _FAILED
+        with self._cond:
+            self._done[seq] = result
+            self._cond.notify_all()
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+        print(f"⚠️ Inference failed, frame skipped: {error}")
+
+    def _in_flight(self):
+        return self._next_submit - self._next_emit
+
+    def submit(self, frame, infer=True, timestamp=None):
+        """Preprocess and queue one frame, blocking while the pipeline is full.
+
+        With infer=False the frame skips inference and comes out of
+        results() in order, with None as its output. `timestamp` is when
+        the frame was grabbed (time.monotonic() based), default now.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._cond:
+            while self._running and self._in_flight() >= self.num_requests + self.max_pending:
+                self._cond.wait(0.1)
+            seq = self._next_submit
+            self._next_submit += 1
+            if not infer:
+                self._done[seq] = (frame, None, timestamp)
+                self._cond.notify_all()
+                return
+        try:
+            input_tensor = self.preprocess(frame)
+            # start_async itself blocks until one of the infer requests is idle
+            self.infer_queue.start_async({0: input_tensor}, (seq, frame, timestamp))
+        except Exception:
+            with self._cond:
+                self._done[seq] = _FAILED
+                self._cond.notify_all()
+            raise
+
+    def _produce(self, cap):
+        try:
+            while self._running:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                # When the camera grabbed it, if the capture knows; otherwise when we got it
+                timestamp = getattr(cap, "last_timestamp", None) or time.monotonic()
+                infer = self.gate is None or self.gate(frame)
+                # Frames stay alive until postprocessing, don't hold on to the capture's buffer
+                self.submit(frame.copy(), infer, timestamp)
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def start(self, cap):
+        """Start the capture/submit thread reading from `cap`"""
+        self._running = True
+        self._producer = threading.Thread(target=self._produce, args=(cap,), daemon=True)
+        self._producer.start()
+
+    def results(self):
+        """Yield (frame, output, grab timestamp) in submission order until the source ends"""
+        while True:
+            with self._cond:
+                while self._next_emit not in self._done:
+                    if self._eof and self._next_emit >= self._next_submit:
+                        return
+                    self._cond.wait(0.1)
+                result = self._done.pop(self._next_emit)
+                self._next_emit += 1
+                self._cond.notify_all()
+            if result is not _FAILED:
+                yield result
+
+    def stop(self):
+        """Stop producing and wait for in-flight requests to drain"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._producer is not None:
+            self._producer.join()
+        self.infer_queue.wait_all()
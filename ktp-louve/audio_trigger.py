@@ -0,0 +1,182 @@
+import time
+import wave
+import numpy as np
+
+SAMPLE_RATE = 44100
+BLOCK_SIZE = 1024  # Samples per analysis block (~23 ms); pass the same blocksize to the input stream
+# Frequency bands (Hz) whose energies are tracked; TRIGGER_BANDS decide. HVAC/traffic rumble sits in "low".
+BANDS = {"low": (20, 250), "mid": (250, 2000), "high": (2000, 8000)}
+TRIGGER_BANDS = ("mid", "high")  # Shouting, impacts, glass breaking
+TRIGGER_LEVEL = 0.05  # Minimum band-limited level (full scale = 1.0) that can trigger
+NOISE_MARGIN = 4.0  # ... and it must also be this many times above the learned noise floor
+RELEASE_RATIO = 0.5  # Stays triggered until the level drops below this fraction of the trigger threshold
+RELEASE_SECONDS = 0.5  # ... for this long
+RETRIGGER_INTERVAL = 0.5  # While triggered, on_trigger is called again this often (keeps a clip going)
+ENVELOPE_RELEASE = 0.2  # Per-block decay of the level envelope (attack is instant, so short bursts count)
+RMS_SMOOTHING = 0.2  # EWMA weight of the newest block in the smoothed RMS
+NOISE_FLOOR_RATE = 0.01  # How fast the noise floor follows the quiet level
+
+
+class AudioTrigger:
+    """Streaming sound trigger over fixed-size blocks, with no allocations per block.
+
+    Each block gets a Hann window and the DFT bins of BANDS are computed
+    with one matrix product against a precomputed cos/sin basis, into
+    preallocated arrays. For a few hundred bins this is as fast as an FFT,
+    and np.fft would allocate its output on every call. This gives the
+    band levels and a smoothed RMS.
+
+    The trigger level is the combined energy of TRIGGER_BANDS, followed by
+    an envelope that rises instantly and decays slowly, so a glass-break
+    lasting a single block still registers. It triggers (attack) when the
+    envelope is above both TRIGGER_LEVEL and NOISE_MARGIN times the
+    learned noise floor. It releases only after staying below
+    RELEASE_RATIO of that for RELEASE_SECONDS. The noise floor follows
+    the level slowly while not triggered, so a steady fan raises the
+    threshold instead of firing it.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE, bands=BANDS, trigger_bands=TRIGGER_BANDS,
+                 trigger_level=TRIGGER_LEVEL, on_trigger=None):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.band_names = list(bands)
+        self.trigger_level = trigger_level
+        self.on_trigger = on_trigger  # Called with the block's timestamp on attack and every RETRIGGER_INTERVAL
+        self.active = False
+        self.rms = 0.0
+        self.level = 0.0  # Envelope of the trigger bands
+        self.noise_floor = None
+        self.triggers = 0
+
+        freqs = np.fft.rfftfreq(block_size, 1.0 / sample_rate)
+        band_of_bin = np.full(len(freqs), -1)
+        for index, (low, high) in enumerate(bands.values()):
+            band_of_bin[(freqs >= low) & (freqs < high)] = index
+        bins = np.flatnonzero(band_of_bin >= 0)
+        window = np.hanning(block_size).astype(np.float32)
+        t = np.arange(block_size)[:, None]
+        phase = 2 * np.pi * t * bins[None, :] / block_size
+        # Window folded into the basis: one product gives the windowed DFT (real parts, then imaginary)
+        self._basis = (np.hstack([np.cos(phase), np.sin(phase)]) * window[:, None]).astype(np.float32)
+        # Sums |X_k|^2 per band, scaled so a band's value is its RMS contribution (one-sided, Hann-corrected)
+        scale = 2.0 / (block_size * float(np.sum(window.astype(np.float64) ** 2)))
+        membership = (band_of_bin[bins][None, :] == np.arange(len(bands))[:, None]).astype(np.float32) * scale
+        self._band_matrix = np.hstack([membership, membership])
+        self._trigger_weights = np.array([name in trigger_bands for name in self.band_names], dtype=np.float32)
+
+        self._block = np.zeros(block_size, dtype=np.float32)
+        self._spectrum = np.zeros(2 * len(bins), dtype=np.float32)
+        self._band_power = np.zeros(len(bands), dtype=np.float32)
+        self.bands = np.zeros(len(bands), dtype=np.float32)  # Per-band RMS level of the latest block
+        self._below_since = None
+        self._last_trigger = -float("inf")
+
+    def process(self, samples, timestamp=None):
+        """Analyze one block of mono float samples (-1..1); `timestamp` = time.monotonic() of its first sample.
+
+        Returns True while triggered.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        block = self._block
+        count = min(len(samples), self.block_size)
+        block[:count] = samples[:count]
+        block[count:] = 0.0
+        np.dot(block, self._basis, out=self._spectrum)
+        np.square(self._spectrum, out=self._spectrum)
+        np.dot(self._band_matrix, self._spectrum, out=self._band_power)
+        np.sqrt(self._band_power, out=self.bands)
+
+        block_rms = float(np.sqrt(np.dot(block[:count], block[:count]) / max(count, 1)))
+        self.rms += RMS_SMOOTHING * (block_rms - self.rms)
+        level = float(np.sqrt(np.dot(self._band_power, self._trigger_weights)))
+        # Instant attack, slow release
+        self.level = level if level > self.level else self.level + ENVELOPE_RELEASE * (level - self.level)
+        if self.noise_floor is None:
+            self.noise_floor = level
+
+        threshold = max(self.trigger_level, self.noise_floor * NOISE_MARGIN)
+        if not self.active:
+            if self.level >= threshold:
+                self.active = True
+                self.triggers += 1
+                self._below_since = None
+                self._fire(timestamp)
+            else:
+                # Only learn the floor from quiet audio, so the event itself doesn't raise it
+                self.noise_floor += NOISE_FLOOR_RATE * (level - self.noise_floor)
+        else:
+            if self.level < threshold * RELEASE_RATIO:
+                if self._below_since is None:
+                    self._below_since = timestamp
+                elif timestamp - self._below_since >= RELEASE_SECONDS:
+                    self.active = False
+            else:
+                self._below_since = None
+            if self.active and timestamp - self._last_trigger >= RETRIGGER_INTERVAL:
+                self._fire(timestamp)
+        return self.active
+
+    def _fire(self, timestamp):
+        self._last_trigger = timestamp
+        if self.on_trigger is not None:
+            self.on_trigger(timestamp)
+
+
+class AudioRing:
+    """The last `seconds` of mono audio as int16 in a preallocated ring, addressable by time.monotonic().
+
+    write() is called from the audio callback with each block and the
+    time of its first sample. save_wav() cuts out the same time span a
+    video clip covers (video frames carry capture timestamps from the same
+    clock), so the two line up.
+    """
+
+    def __init__(self, seconds, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE):
+        self.sample_rate = sample_rate
+        self._ring = np.zeros(int(seconds * sample_rate), dtype=np.int16)
+        self._scratch = np.zeros(block_size, dtype=np.float32)
+        self._written = 0  # Samples written in total
+        self._anchor = (0, 0.0)  # (sample index, timestamp) of the latest block's first sample
+
+    def write(self, samples, timestamp=None):
+        """Append mono float samples (-1..1); no allocations as long as blocks fit the scratch buffer"""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        count = len(samples)
+        if count > len(self._scratch):
+            self._scratch = np.zeros(count, dtype=np.float32)
+        scratch = self._scratch[:count]
+        np.multiply(samples, 32767.0, out=scratch)
+        np.clip(scratch, -32768, 32767, out=scratch)
+        capacity = len(self._ring)
+        if count > capacity:
+            scratch = scratch[-capacity:]
+            count = capacity
+        start = self._written % capacity
+        first = min(count, capacity - start)
+        self._ring[start:start + first] = scratch[:first]
+        self._ring[:count - first] = scratch[first:]
+        self._anchor = (self._written, timestamp)
+        self._written += count
+
+    def read(self, start_time, end_time):
+        """int16 samples between two time.monotonic() timestamps (clamped to what is still held)"""
+        anchor_index, anchor_time = self._anchor
+        capacity = len(self._ring)
+        first = max(anchor_index + int(round((start_time - anchor_time) * self.sample_rate)),
+                    self._written - capacity, 0)
+        last = min(anchor_index + int(round((end_time - anchor_time) * self.sample_rate)), self._written)
+        if last <= first:
+            return np.zeros(0, dtype=np.int16)
+        indices = np.arange(first, last) % capacity
+        return self._ring[indices]
+
+    def save_wav(self, path, start_time, end_time):
+        """Write the span as a 16-bit mono WAV; returns the number of samples written"""
+        samples = self.read(start_time, end_time)
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(samples.astype("<i2").tobytes())
+        return len(samples)
@@ -0,0 +1,217 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+import openvino
+# pygame prints a banner to stdout on import, which would end up in the JSON report
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import detection
+from capture import ThreadedCapture
+from event_log import EventLog
+from stage_timer import StageTimer
+from motion_gate import MotionGate
+from tiling import TileBatcher, plan_tiles, TILE_SIZE
+from status_publisher import StatusPublisher
+
+
+class SyntheticSource:
+    """cv2.VideoCapture look-alike serving pre-rendered frames with a few moving shapes"""
+
+    def __init__(self, width=1280, height=720, count=300, pool_size=60, seed=0):
+        self.width = width
+        self.height = height
+        self.count = count
+        self.dropped = 0
+        self._served = 0
+        rng = np.random.default_rng(seed)
+        background = rng.integers(40, 200, size=(height, width, 3), dtype=np.uint8)
+        background = cv2.GaussianBlur(background, (31, 31), 0)
+        shapes = [(rng.integers(0, width), rng.integers(0, height), rng.integers(-8, 9), rng.integers(-8, 9),
+                   tuple(int(c) for c in rng.integers(0, 255, 3))) for _ in range(5)]
+        # Rendered up front so "capture" measures a frame copy, not the drawing
+        self._pool = []
+        for i in range(pool_size):
+            frame = background.copy()
+            for x, y, dx, dy, color in shapes:
+                cx, cy = int((x + dx * i) % width), int((y + dy * i) % height)
+                cv2.rectangle(frame, (cx - 30, cy - 80), (cx + 30, cy + 80), color, -1)
+            self._pool.append(frame)
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.count
+        return 0
+
+    def read(self):
+        if self._served >= self.count:
+            return False, None
+        frame = self._pool[self._served % len(self._pool)].copy()
+        self._served += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay a video (or synthetic frames) through the detection pipeline headless and "
+                    "report throughput and p50/p95/p99 latency per stage as JSON",
+        epilog="example: python benchmark.py --source clip.mp4 --frames 500 --output before.json")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--source", help="recorded video file to replay")
+    source.add_argument("--synthetic", action="store_true", help="generate frames instead of reading a video")
+    parser.add_argument("--width", type=int, default=1280, help="synthetic frame width")
+    parser.add_argument("--height", type=int, default=720, help="synthetic frame height")
+    parser.add_argument("--frames", type=int, default=300, help="frames to measure (after warmup)")
+    parser.add_argument("--warmup", type=int, default=20, help="frames to run before measuring")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync",
+                        help="sync times every stage; async measures the overlapped pipeline")
+    parser.add_argument("--hint", choices=["LATENCY", "THROUGHPUT"], help="OpenVINO performance hint")
+    parser.add_argument("--num-requests", type=int, default=detection.NUM_INFER_REQUESTS,
+                        help="in-flight requests in async mode (0 = let OpenVINO choose)")
+    parser.add_argument("--device", default="CPU")
+    parser.add_argument("--no-in-graph", action="store_true", help="preprocess with OpenCV instead of in the graph")
+    parser.add_argument("--letterbox", action="store_true")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="skip inference on static frames, as detection.py does with MOTION_GATE")
+    parser.add_argument("--keyframe-interval", type=int, default=1,
+                        help="run the detector every Nth frame, optical flow in between")
+    parser.add_argument("--tiles", action="store_true", help="tiled inference, one batched request per frame")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--annotate", action="store_true",
+                        help="draw the overlay on every frame, like a preview window or live viewer would")
+    parser.add_argument("--precision", choices=["FP32", "INT8"], type=str.upper, default=detection.MODEL_PRECISION,
+                        help="which detector model to use when --model-dir isn't given")
+    parser.add_argument("--model-dir", help="OpenVINO IR directory (default: the one detection.py uses)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def run_benchmark(args):
+    total_frames = args.warmup + args.frames
+    if args.synthetic:
+        cap = SyntheticSource(args.width, args.height, count=total_frames)
+    else:
+        # Lossless for files, so every run sees exactly the same frames
+        cap = ThreadedCapture(args.source)
+        if not cap.isOpened():
+            raise SystemExit(f"❌ Cannot open {args.source}")
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    in_graph = not args.no_in_graph
+    hint = args.hint or ("THROUGHPUT" if args.mode == "async" else "LATENCY")
+    model_dir = args.model_dir or detection.find_model(args.precision)
+    tile_batcher = None
+    if args.tiles:
+        tile_batcher = TileBatcher(plan_tiles(frame_width, frame_height, detection.INPUT_SIZE,
+                                              tile_size=args.tile_size))
+    load_start = time.perf_counter()
+    compiled_model, input_transform = detection.load_model(
+        model_dir, frame_width, frame_height, in_graph_preprocess=in_graph,
+        letterbox=args.letterbox, performance_hint=hint, device=args.device,
+        batch=tile_batcher.batch_size if tile_batcher else 1)
+    load_time = time.perf_counter() - load_start
+
+    timer = StageTimer()
+    measured = {"frames": 0, "start": None, "last": None}
+
+    def on_frame(frame, grabbed):
+        if args.annotate:
+            detector.annotate(frame)
+        now = time.perf_counter()
+        if measured["last"] is not None:
+            timer.add("frame", now - measured["last"])
+        measured["last"] = now
+        if measured["start"] is None:
+            if detector.frame_count < args.warmup:
+                return True
+            # Warmup done: drop its samples and start the clock
+            timer.reset()
+            measured["start"] = now
+            return True
+        measured["frames"] += 1
+        return measured["frames"] < args.frames
+
+    motion_gate = MotionGate(refresh_interval=detection.MOTION_REFRESH_INTERVAL) if args.motion_gate else None
+    with tempfile.TemporaryDirectory() as scratch:
+        # Status writes are part of the measurement, but never touch the live detector's files
+        status_publisher = StatusPublisher(os.path.join(scratch, "status.json"), heartbeat=detection.STATUS_HEARTBEAT)
+        event_log = EventLog(os.path.join(scratch, "events.db"))
+        detector = detection.Detector(detection.load_class_names(model_dir), frame_width, frame_height,
+                                      status_publisher, event_log, input_transform=input_transform,
+                                      in_graph_preprocess=in_graph, on_alert=None, capture=cap, timer=timer,
+                                      motion_gate=motion_gate, keyframe_interval=args.keyframe_interval,
+                                      tile_batcher=tile_batcher)
+        if args.mode == "async":
+            detection.run_async(detector, compiled_model, cap, on_frame=on_frame, num_requests=args.num_requests)
+        else:
+            detection.run_sync(detector, compiled_model, cap, on_frame=on_frame)
+        event_log.close()
+        status_publisher.close()
+    cap.release()
+
+    wall_time = (measured["last"] - measured["start"]) if measured["start"] is not None else 0.0
+    return {
+        "config": {
+            "source": args.source or f"synthetic {frame_width}x{frame_height}",
+            "frame_size": [frame_width, frame_height],
+            "mode": args.mode,
+            "device": args.device,
+            "model_dir": model_dir,
+            "performance_hint": hint,
+            "num_requests": args.num_requests if args.mode == "async" else 1,
+            "in_graph_preprocess": in_graph,
+            "letterbox": args.letterbox,
+            "annotate": args.annotate,
+            "motion_gate": args.motion_gate,
+            "keyframe_interval": args.keyframe_interval,
+            "tiles": tile_batcher.batch_size if tile_batcher else None,
+            "input_size": detection.INPUT_SIZE,
+            "warmup_frames": args.warmup,
+            "openvino": openvino.__version__ if hasattr(openvino, "__version__") else None,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "model_load_s": round(load_time, 3),
+        "frames": measured["frames"],
+        "wall_time_s": round(wall_time, 3),
+        "fps": round(measured["frames"] / wall_time, 2) if wall_time > 0 else None,
+        "inferred_frames": motion_gate.inferred if motion_gate else None,
+        "gated_frames": motion_gate.skipped if motion_gate else None,
+        "stages": timer.summary(),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Keep stdout clean for the JSON report; the pipeline's own progress prints go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        result = run_benchmark(args)
+    report = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+        print(f"📊 Benchmark report written to {args.output}", file=sys.stderr)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
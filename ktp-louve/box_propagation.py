@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+
+PROPAGATION_WIDTH = 640  # Optical flow runs on grayscale frames downscaled to this width
+POINTS_PER_BOX = 16  # Corner features tracked per box
+MIN_POINTS = 4  # A box with fewer surviving points is lost
+MIN_TRACKED_FRACTION = 0.5  # ... or with fewer than this fraction of its points tracked reliably
+MAX_FB_ERROR = 1.0  # Forward-backward flow error (pixels, downscaled) above which a point is dropped
+MIN_APPEARANCE = 0.5  # Normalized correlation with the keyframe crop below which a box is lost
+TEMPLATE_SIZE = (24, 24)
+
+_LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+class BoxPropagator:
+    """Carries detection boxes from a keyframe to the following frames with sparse optical flow.
+
+    reset() picks corner features inside every box of a keyframe. Each
+    propagate() tracks them with pyramidal Lucas-Kanade, forward and then
+    backward, and keeps only points that come back to where they started.
+    Each box is shifted by the median motion of its points. A box that
+    loses too many points is marked dead and `needs_keyframe` is raised,
+    so the caller runs the detector again early. So is a box whose content
+    no longer looks like its keyframe crop (an object taken away leaves
+    flow points on the static background behind it).
+    """
+
+    def __init__(self, width=PROPAGATION_WIDTH):
+        self.width = width
+        self.needs_keyframe = True
+        self.active = False
+        self._boxes = np.empty((0, 4), dtype=np.float64)
+        self._alive = np.empty(0, dtype=bool)
+        self._points = None
+        self._owner = None
+        self._prev = None
+        self._templates = []
+        self._scale = 1.0
+
+    def _gray(self, frame):
+        height, width = frame.shape[:2]
+        self._scale = min(1.0, self.width / width)
+        if self._scale < 1.0:
+            frame = cv2.resize(frame, (self.width, int(round(height * self._scale))), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def _features(self, gray, box):
+        height, width = gray.shape
+        x1, y1, x2, y2 = np.round(box * self._scale).astype(int)
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, width), min(y2, height)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return np.empty((0, 2), dtype=np.float32)
+        corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], maxCorners=POINTS_PER_BOX,
+                                          qualityLevel=0.01, minDistance=3)
+        if corners is not None and len(corners) >= MIN_POINTS:
+            return corners.reshape(-1, 2) + (x1, y1)
+        # Flat, textureless box: fall back to a grid over its inner part
+        xs = np.linspace(x1 + (x2 - x1) * 0.2, x2 - (x2 - x1) * 0.2, 4)
+        ys = np.linspace(y1 + (y2 - y1) * 0.2, y2 - (y2 - y1) * 0.2, 4)
+        return np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2).astype(np.float32)
+
+    def _crop(self, gray, box):
+        height, width = gray.shape
+        x1, y1, x2, y2 = np.round(box * self._scale).astype(int)
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, width), min(y2, height)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        return cv2.resize(gray[y1:y2, x1:x2], TEMPLATE_SIZE, interpolation=cv2.INTER_AREA)
+
+    def _looks_same(self, gray, box_index):
+        template = self._templates[box_index]
+        if template is None or template.std() < 2.0:
+            # Nothing to compare against (flat crop); rely on the flow alone
+            return True
+        crop = self._crop(gray, self._boxes[box_index])
+        if crop is None:
+            return False
+        return cv2.matchTemplate(crop, template, cv2.TM_CCOEFF_NORMED)[0, 0] >= MIN_APPEARANCE
+
+    def reset(self, frame, boxes):
+        """Start propagating `boxes` (N, 4 full-frame x1, y1, x2, y2) from this keyframe"""
+        gray = self._gray(frame)
+        self._boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4).copy()
+        self._alive = np.ones(len(self._boxes), dtype=bool)
+        points = [self._features(gray, box) for box in self._boxes]
+        self._owner = np.repeat(np.arange(len(points)), [len(p) for p in points])
+        self._points = (np.concatenate(points) if points else np.empty((0, 2))).astype(np.float32).reshape(-1, 1, 2)
+        # Boxes too small to put points in aren't carried; they reappear on the next keyframe
+        self._alive &= np.bincount(self._owner, minlength=len(self._boxes)) >= MIN_POINTS
+        self._templates = [self._crop(gray, box) for box in self._boxes]
+        self._prev = gray
+        self.active = True
+        self.needs_keyframe = False
+
+    def propagate(self, frame):
+        """Move the keyframe boxes to `frame`. Returns (boxes int32 (N, 4), alive bool (N,))."""
+        gray = self._gray(frame)
+        if self._points is not None and len(self._points):
+            next_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev, gray, self._points, None, **_LK_PARAMS)
+            back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev, next_points, None, **_LK_PARAMS)
+            fb_error = np.abs(self._points - back_points).reshape(-1, 2).max(axis=1)
+            good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < MAX_FB_ERROR)
+
+            motion = (next_points - self._points).reshape(-1, 2)
+            total = np.bincount(self._owner, minlength=len(self._boxes))
+            tracked = np.bincount(self._owner[good], minlength=len(self._boxes))
+            ok = (tracked >= MIN_POINTS) & (tracked >= MIN_TRACKED_FRACTION * np.maximum(total, 1))
+            for box_index in np.flatnonzero(self._alive & ok):
+                shift = np.median(motion[good & (self._owner == box_index)], axis=0) / self._scale
+                self._boxes[box_index] += (shift[0], shift[1], shift[0], shift[1])
+                ok[box_index] = self._looks_same(gray, box_index)
+            lost = self._alive & ~ok
+            if lost.any():
+                self._alive &= ok
+                self.needs_keyframe = True
+
+            keep = good & self._alive[self._owner]
+            self._points = next_points[keep]
+            self._owner = self._owner[keep]
+        self._prev = gray
+
+        height, width = frame.shape[:2]
+        boxes = np.round(self._boxes).astype(np.int32)
+        np.clip(boxes[:, 0::2], 0, width - 1, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, height - 1, out=boxes[:, 1::2])
+        return boxes, self._alive.copy()
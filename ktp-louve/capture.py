@@ -0,0 +1,152 @@
+import threading
+import time
+import cv2
+from collections import namedtuple
+
+# frame is a view into the capture ring; it stays valid until the next read() (for good with reuse_buffers=False)
+CapturedFrame = namedtuple("CapturedFrame", ["frame", "timestamp", "seq", "dropped"])
+
+
+def parse_source(source):
+    """Camera indices may arrive as strings from the command line ("0" -> 0)"""
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+def is_live_source(source):
+    """Camera indices and network streams are live; anything else is treated as a file"""
+    source = parse_source(source)
+    if isinstance(source, int):
+        return True
+    return "://" in source or source.startswith("bus:")
+
+
+def open_capture(source=0, **kwargs):
+    """ThreadedCapture for cameras, files and streams; "bus:<name>" attaches to a frame_bus.py capture service"""
+    if isinstance(source, str) and source.startswith("bus:"):
+        from frame_bus import FrameBusCapture
+        return FrameBusCapture(source[len("bus:"):])
+    return ThreadedCapture(source, **kwargs)
+
+
+class ThreadedCapture:
+    """Reads frames on a dedicated thread into a small ring of preallocated buffers.
+
+    The consumer always gets the newest frame. For live sources, frames the
+    consumer didn't get to are overwritten (drop-oldest) and counted in
+    `dropped`, so a slow detector works on current video instead of a
+    backlog queued up in the driver. For video files nothing is dropped by
+    default: the reader waits for the consumer, so offline runs see every frame.
+
+    The read()/get()/isOpened()/release() methods mirror cv2.VideoCapture so
+    it can be dropped into existing loops.
+    """
+
+    def __init__(self, source=0, ring_size=3, drop_frames=None, reuse_buffers=True):
+        if ring_size < 3:
+            # One slot being written, one published, one held by the consumer
+            raise ValueError("ring_size must be at least 3")
+        self.source = parse_source(source)
+        self.cap = cv2.VideoCapture(self.source)
+        self.drop_frames = is_live_source(self.source) if drop_frames is None else drop_frames
+        if self.drop_frames:
+            # Keep the driver's own queue as short as possible, we buffer ourselves
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        # False: every frame gets a fresh buffer the consumer can keep (e.g. hand to a recorder
+        # thread) without copying it; allocation then happens here on the reader thread instead
+        self.reuse_buffers = reuse_buffers
+        self._slots = [None] * ring_size
+        self._slot_meta = [(0.0, 0)] * ring_size  # (timestamp, seq) per slot
+        self._latest = -1  # slot holding the newest unread frame
+        self._held = -1  # slot currently handed to the consumer
+        self._last_seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._eof = False
+        self._thread = None
+        self.dropped = 0
+        self.last_timestamp = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._reader, daemon=True)
+            self._thread.start()
+        return self
+
+    def _free_slot(self):
+        for i in range(len(self._slots)):
+            if i != self._latest and i != self._held:
+                return i
+        return -1
+
+    def _reader(self):
+        while self._running:
+            with self._cond:
+                if not self.drop_frames:
+                    # Lossless mode: wait until the consumer took the last frame
+                    while self._running and self._latest != -1:
+                        self._cond.wait(0.1)
+                slot = self._free_slot()
+
+            # Reading into the existing buffer reuses it once its shape is known
+            ret, frame = self.cap.read(self._slots[slot]) if self.reuse_buffers else self.cap.read()
+            timestamp = time.monotonic()
+            if not ret:
+                break
+
+            with self._cond:
+                self._slots[slot] = frame
+                self._last_seq += 1
+                self._slot_meta[slot] = (timestamp, self._last_seq)
+                if self._latest != -1:
+                    self.dropped += 1
+                self._latest = slot
+                self._cond.notify_all()
+
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+    def read_frame(self, timeout=None):
+        """Return the newest CapturedFrame, or None once the source is exhausted"""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._latest == -1:
+                if self._eof:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining if remaining is not None else 0.1)
+            self._held = self._latest
+            self._latest = -1
+            self._cond.notify_all()
+            timestamp, seq = self._slot_meta[self._held]
+            frame = self._slots[self._held]
+        return CapturedFrame(frame, timestamp, seq, self.dropped)
+
+    def read(self):
+        """cv2.VideoCapture-compatible read: (ret, frame)"""
+        captured = self.read_frame()
+        if captured is None:
+            return False, None
+        self.last_timestamp = captured.timestamp  # time.monotonic() when the frame was grabbed
+        return True, captured.frame
+
+    def release(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.cap.release()
@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+import cv2
+
+# Next to this file, not in the CWD, so every process (detection, robberClipper, web server) shares one index
+CLIP_LIBRARY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "clips.db")
+CLIP_QUOTA_BYTES = 20 * 1024 ** 3  # Oldest clips are deleted once all clips together take more than this
+CLIP_MAX_AGE = 30 * 24 * 3600.0  # ... and any clip older than this (seconds)
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_JPEG_QUALITY = 70
+MAX_QUERY_LIMIT = 200
+FFMPEG = shutil.which("ffmpeg")  # Turns finished clips into MP4s browsers can play; without it clips stay MJPEG AVI
+TRANSCODE_TIMEOUT = 600.0  # Seconds before giving up on one clip (it is then kept as recorded)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    start REAL NOT NULL,
+    duration REAL NOT NULL,
+    trigger TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    event TEXT,
+    attachments TEXT,
+    thumbnail BLOB
+);
+CREATE INDEX IF NOT EXISTS clips_start ON clips (start, id);
+"""
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    # WAL: web_server.py reads while detection.py / robberClipper.py add clips
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def probe_clip(path):
+    """(duration in seconds, JPEG thumbnail of the middle frame or None) of a video file"""
+    cap = cv2.VideoCapture(path)
+    try:
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        duration = frames / fps if frames > 0 and fps > 0 else 0.0
+        if frames > 1:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(frames // 2))
+        ret, frame = cap.read()
+    finally:
+        cap.release()
+    if not ret:
+        return duration, None
+    height, width = frame.shape[:2]
+    if width > THUMBNAIL_WIDTH:
+        frame = cv2.resize(frame, (THUMBNAIL_WIDTH, max(1, height * THUMBNAIL_WIDTH // width)),
+                           interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_JPEG_QUALITY])
+    return duration, encoded.tobytes() if ok else None
+
+
+def transcode_for_browser(path, audio=None):
+    """Re-encode a recorded clip as H.264 MP4 with its index up front, so a browser can play and seek it.
+
+    `audio` (e.g. robberClipper's WAV) is muxed in as AAC. On success the
+    original file is deleted and the MP4's path returned; without ffmpeg,
+    or if it fails, `path` is returned unchanged.
+    """
+    if FFMPEG is None or os.path.splitext(path)[1].lower() == ".mp4":
+        return path
+    target = os.path.splitext(path)[0] + ".mp4"
+    partial = target + ".part"
+    command = [FFMPEG, "-y", "-loglevel", "error", "-i", path]
+    if audio:
+        command += ["-i", audio, "-map", "0:v:0", "-map", "1:a:0", "-c:a", "aac"]
+    command += ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+                "-movflags", "+faststart", "-f", "mp4", partial]
+    try:
+        subprocess.run(command, check=True, timeout=TRANSCODE_TIMEOUT, capture_output=True)
+        os.replace(partial, target)
+    except (OSError, subprocess.SubprocessError) as e:
+        stderr = getattr(e, "stderr", None)
+        print(f"⚠️ Can't transcode {path} for the browser, keeping it as recorded: "
+              f"{stderr.decode(errors='replace').strip() if stderr else e}")
+        if os.path.exists(partial):
+            os.remove(partial)
+        return path
+    os.remove(path)
+    return target
+
+
+class ClipLibrary:
+    """Index of recorded clips (SQLite), kept up to date as clips are saved, with retention.
+
+    The recorders call add_later() once per finished clip. The library's
+    own thread then transcodes it to a browser-playable MP4 (when ffmpeg
+    is installed), probes it and makes the thumbnail, so neither the
+    capture loop nor the recorder's writer waits on it. Nothing rescans
+    the recordings directory. After every add, the oldest clips are
+    deleted, files and rows, until the rest fit in `quota` bytes and none
+    is older than `max_age`.
+    """
+
+    def __init__(self, path=CLIP_LIBRARY_FILE, quota=CLIP_QUOTA_BYTES, max_age=CLIP_MAX_AGE):
+        self.path = path
+        self.quota = quota
+        self.max_age = max_age
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.executescript(_SCHEMA)
+        if FFMPEG is None:
+            print("⚠️ ffmpeg not found: clips stay MJPEG AVI, which browsers can't play. "
+                  "Download them from /clips/<id> and open them in VLC or another desktop player.")
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def add(self, clip_path, start, trigger, event=None, attachments=(), duration=None, transcode=True):
+        """Index a finished clip. `start` is its wall-clock start time; `attachments` are
+        files that belong to it (e.g. its audio), counted in its size and deleted with it.
+        Returns (clip id or None, path of the indexed file, which is the MP4 after transcoding)."""
+        clip_path = os.path.abspath(clip_path)
+        attachments = [os.path.abspath(p) for p in attachments if os.path.exists(p)]
+        if transcode:
+            audio = next((p for p in attachments if p.lower().endswith(".wav")), None)
+            clip_path = transcode_for_browser(clip_path, audio)
+        try:
+            size = sum(os.path.getsize(p) for p in [clip_path] + attachments)
+            probed, thumbnail = probe_clip(clip_path)
+        except OSError as e:
+            print(f"⚠️ Clip library: can't index {clip_path}: {e}")
+            return None, clip_path
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO clips (path, start, duration, trigger, size, event, attachments, thumbnail) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (clip_path, start, probed if duration is None else duration, trigger, size, event,
+                 json.dumps(attachments) if attachments else None, thumbnail))
+        clip_id = cursor.lastrowid
+        self.enforce_retention()
+        return clip_id, clip_path
+
+    def add_later(self, clip_path, start, trigger, event=None, attachments=(), on_added=None):
+        """add() on the library's thread; `on_added(clip_id, path)` is called there once it's indexed"""
+        self._queue.put((clip_path, start, trigger, event, list(attachments), on_added))
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            clip_path, start, trigger, event, attachments, on_added = item
+            try:
+                clip_id, path = self.add(clip_path, start, trigger, event=event, attachments=attachments)
+            except Exception as e:
+                print(f"⚠️ Clip library: can't index {clip_path}: {e}")
+                clip_id, path = None, clip_path
+            if on_added is not None:
+                on_added(clip_id, path)
+
+    def enforce_retention(self, now=None):
+        """Delete the oldest clips beyond the age limit or the disk quota; returns how many went"""
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self._conn
+            victims = conn.execute("SELECT id, path, attachments FROM clips WHERE start < ? ORDER BY start, id",
+                                   (now - self.max_age,)).fetchall()
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM clips WHERE start >= ?",
+                                 (now - self.max_age,)).fetchone()[0]
+            if total > self.quota:
+                # Oldest first until the rest fits
+                for row_id, path, attachments, size in conn.execute(
+                        "SELECT id, path, attachments, size FROM clips WHERE start >= ? ORDER BY start, id",
+                        (now - self.max_age,)):
+                    if total <= self.quota:
+                        break
+                    victims.append((row_id, path, attachments))
+                    total -= size
+            if not victims:
+                return 0
+            for _, path, attachments in victims:
+                for file_path in [path] + (json.loads(attachments) if attachments else []):
+                    try:
+                        os.remove(file_path)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        print(f"⚠️ Clip library: can't delete {file_path}: {e}")
+            with conn:
+                conn.executemany("DELETE FROM clips WHERE id = ?", [(row_id,) for row_id, _, _ in victims])
+        self.evicted += len(victims)
+        print(f"🧹 Retention removed {len(victims)} old clip(s)")
+        return len(victims)
+
+    def close(self, timeout=None):
+        """Index what's still queued (transcoding included), then close the database"""
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._conn.close()
+
+
+class ClipLibraryReader:
+    """Clip listing for web_server.py, newest first, paginated like EventLogReader"""
+
+    def __init__(self, path=CLIP_LIBRARY_FILE):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=5.0)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def encode_cursor(row):
+        return f"{row['start']!r}:{row['id']}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        start, row_id = cursor.rsplit(":", 1)
+        return float(start), int(row_id)
+
+    def query(self, since=None, until=None, trigger=None, limit=50, cursor=None):
+        """Clips with since <= start < until, newest first. Returns (clips, next_cursor)."""
+        limit = max(1, min(int(limit), MAX_QUERY_LIMIT))
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("start >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("start < ?")
+            params.append(until)
+        if trigger is not None:
+            clauses.append("trigger = ?")
+            params.append(trigger)
+        if cursor:
+            clauses.append("(start, id) < (?, ?)")
+            params.extend(self.decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        try:
+            rows = self._conn().execute(
+                f"SELECT id, path, start, duration, trigger, size, event, thumbnail IS NOT NULL AS has_thumbnail "
+                f"FROM clips {where} ORDER BY start DESC, id DESC LIMIT ?", params + [limit + 1]).fetchall()
+        except sqlite3.OperationalError:
+            # Nothing recorded yet (no database file)
+            return [], None
+
+        next_cursor = self.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        clips = []
+        for row in rows[:limit]:
+            clips.append({
+                "id": row["id"],
+                "name": os.path.basename(row["path"]),
+                "start": row["start"],
+                "duration": row["duration"],
+                "trigger": row["trigger"],
+                "size": row["size"],
+                "event": row["event"],
+                "url": f"/clips/{row['id']}",
+                "thumbnail_url": f"/clips/{row['id']}/thumbnail" if row["has_thumbnail"] else None,
+            })
+        return clips, next_cursor
+
+    def clip_path(self, clip_id):
+        try:
+            row = self._conn().execute("SELECT path FROM clips WHERE id = ?", (clip_id,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row["path"] if row else None
+
+    def thumbnail(self, clip_id):
+        try:
+            row = self._conn().execute("SELECT thumbnail FROM clips WHERE id = ?", (clip_id,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row["thumbnail"] if row else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add existing recordings to the clip library / apply retention")
+    parser.add_argument("--library", default=CLIP_LIBRARY_FILE)
+    parser.add_argument("--import", dest="import_dir", help="index every video in this directory (one-off)")
+    parser.add_argument("--trigger", default="sound", help="trigger type recorded for imported clips")
+    args = parser.parse_args(argv)
+    library = ClipLibrary(args.library)
+    if args.import_dir:
+        added = 0
+        for name in sorted(os.listdir(args.import_dir)):
+            if os.path.splitext(name)[1].lower() not in (".avi", ".mp4"):
+                continue
+            path = os.path.join(args.import_dir, name)
+            audio = os.path.splitext(path)[0] + ".wav"
+            duration, _ = probe_clip(path)
+            # Files are closed when recording ends, so the mtime is roughly the clip's end
+            clip_id, _ = library.add(path, os.path.getmtime(path) - duration, args.trigger, attachments=[audio])
+            if clip_id is not None:
+                added += 1
+        print(f"📚 Indexed {added} clips from {args.import_dir}")
+    library.enforce_retention()
+    library.close()
+
+
+if __name__ == "__main__":
+    main()
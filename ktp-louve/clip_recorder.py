@@ -0,0 +1,161 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import cv2
+from preroll import CompressedFrameRing, MjpegAviWriter, PREROLL_SECONDS, PREROLL_MAX_BYTES, PREROLL_JPEG_QUALITY
+
+POSTROLL_SECONDS = 3.0  # Keep recording this long after the last trigger
+MAX_CLIP_SECONDS = 120.0  # A clip that keeps getting extended continues in a new file after this long
+RECORDER_QUEUE_SIZE = 8  # Raw frames waiting for the writer (~6 MB each at 1080p); more are dropped
+
+
+class ClipRecorder:
+    """Continuous pre-roll plus triggered clips, with all encoding and file I/O on a background thread.
+
+    add() is all the capture loop does per frame: copy it into a bounded
+    queue (dropping it if the writer is behind). The writer JPEG-encodes
+    each frame once and the same bytes go into the pre-roll ring and,
+    while a clip is open, into the clip. trigger() can be called from any
+    thread; a trigger during a clip pushes its end out to
+    `postroll` seconds after the trigger instead of being ignored.
+
+    Clips are Motion JPEG AVIs at a fixed `fps`. Frames are placed by
+    their capture timestamps: a gap (camera stall, dropped frame) repeats
+    the previous frame and frames arriving faster than `fps` are skipped,
+    so playback time matches wall time.
+    """
+
+    def __init__(self, out_dir, fps, width, height, preroll=PREROLL_SECONDS, postroll=POSTROLL_SECONDS,
+                 max_clip=MAX_CLIP_SECONDS, preroll_bytes=PREROLL_MAX_BYTES, quality=PREROLL_JPEG_QUALITY,
+                 max_pending=RECORDER_QUEUE_SIZE, prefix="clip", on_saved=None):
+        self.out_dir = out_dir
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.postroll = postroll
+        self.max_clip = max_clip
+        self.quality = quality
+        self.prefix = prefix
+        self.on_saved = on_saved  # Called on the writer thread with (path, start, end) when a clip is closed
+        self.ring = CompressedFrameRing(duration=preroll, max_bytes=preroll_bytes, quality=quality)
+        self.recording = False
+        self.dropped = 0
+        self.clips = 0
+        self._triggers = deque()  # Timestamps not yet seen by the writer
+        self._last_tick = None  # Frame-rate tick of the last frame taken by add()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._writer = None
+        self._clip_start = 0.0
+        self._clip_end = 0.0
+        self._written = 0  # Frames in the open clip
+        self._last_jpeg = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, frame, timestamp=None, copy=True):
+        """Hand a captured frame to the writer; never blocks. `timestamp` is time.monotonic() based.
+
+        Frames arriving faster than `fps` are skipped here, before they are
+        copied or encoded. Pass copy=False for a frame nobody will write to
+        again (the writer then just keeps a reference).
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        tick = int(round(timestamp * self.fps))
+        if tick == self._last_tick:
+            return
+        self._last_tick = tick
+        try:
+            # Copy: capture buffers get reused before the writer gets to them
+            self._queue.put_nowait((frame.copy() if copy else frame, timestamp))
+        except queue.Full:
+            self.dropped += 1
+
+    def trigger(self, timestamp=None):
+        """Start a clip (pre-roll included) or extend the open one; safe from any thread"""
+        self._triggers.append(time.monotonic() if timestamp is None else timestamp)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, timestamp = item
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                continue
+            jpeg = encoded.tobytes()
+            self._handle_triggers(timestamp)
+            if self._writer is not None:
+                if timestamp > self._clip_end:
+                    self._close_clip()
+                elif timestamp - self._clip_start >= self.max_clip:
+                    # Long incident: carry on in a new file, starting right where this one stops
+                    end = self._clip_end
+                    self._clip_end = timestamp
+                    self._close_clip()
+                    self._open_clip(timestamp, with_preroll=False)
+                    self._clip_end = end
+                    self._place(jpeg, timestamp)
+                else:
+                    self._place(jpeg, timestamp)
+            self.ring.append_jpeg(jpeg, timestamp)
+        self._handle_triggers(float("inf"))
+        if self._writer is not None:
+            self._close_clip()
+
+    def _handle_triggers(self, timestamp):
+        triggers = self._triggers
+        while triggers and triggers[0] <= timestamp:
+            trigger = triggers.popleft()
+            if self._writer is None:
+                self._open_clip(trigger)
+            self._clip_end = max(self._clip_end, trigger + self.postroll)
+
+    def _open_clip(self, trigger, with_preroll=True):
+        preroll = self.ring.frames() if with_preroll else []
+        self._clip_start = preroll[0][0] if preroll else trigger
+        self._clip_end = trigger
+        wall_start = time.time() - (time.monotonic() - self._clip_start)
+        stem = os.path.join(self.out_dir, f"{self.prefix}_{datetime.fromtimestamp(wall_start).strftime('%Y%m%d_%H%M%S')}")
+        self._path = stem + ".avi"
+        suffix = 1
+        while os.path.exists(self._path):
+            self._path = f"{stem}_{suffix}.avi"
+            suffix += 1
+        self._writer = MjpegAviWriter(self._path, self.fps, self.width, self.height, quality=self.quality)
+        self._written = 0
+        self._last_jpeg = None
+        self.recording = True
+        print(f"🔴 Recording {self._path} ({trigger - self._clip_start:.1f}s pre-roll)")
+        # Stored JPEGs go in as they are
+        for timestamp, jpeg in preroll:
+            self._place(jpeg, timestamp)
+
+    def _place(self, jpeg, timestamp):
+        target = int(round((timestamp - self._clip_start) * self.fps))
+        writer = self._writer
+        while self._written < target and self._last_jpeg is not None:
+            writer.write_jpeg(self._last_jpeg)  # Gap: hold the previous frame
+            self._written += 1
+        if self._written <= target:
+            writer.write_jpeg(jpeg)
+            self._written += 1
+            self._last_jpeg = jpeg
+
+    def _close_clip(self):
+        self._writer.release()
+        self._writer = None
+        self.recording = False
+        self.clips += 1
+        duration = self._written / self.fps
+        print(f"💾 Saved clip: {self._path} ({duration:.1f}s)")
+        if self.on_saved is not None:
+            self.on_saved(self._path, self._clip_start, self._clip_end)
+
+    def close(self, timeout=10.0):
+        """Finish the open clip with what's queued, then stop the writer"""
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
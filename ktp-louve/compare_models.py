@@ -0,0 +1,174 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+# pygame prints a banner to stdout on import, which would end up in the JSON report
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import benchmark
+import detection
+from capture import ThreadedCapture
+from event_log import EventLog
+from stage_timer import StageTimer
+from yolo_decoder import class_ids_for_names
+from status_publisher import StatusPublisher
+
+MATCH_IOU = 0.5  # A candidate detection agrees with a reference one at this IoU (same class)
+
+
+def count_matches(ref_boxes, ref_classes, cand_boxes, cand_classes, iou_threshold=MATCH_IOU):
+    """Greedy one-to-one matching of same-class boxes by IoU; returns the number of matched pairs"""
+    if not len(ref_boxes) or not len(cand_boxes):
+        return 0
+    a = ref_boxes.astype(np.float32)[:, None]
+    b = cand_boxes.astype(np.float32)[None]
+    inter = (np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None) *
+             np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None))
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    iou = inter / np.maximum(area_a + area_b - inter, 1.0)
+    iou[ref_classes[:, None] != cand_classes[None]] = 0.0
+    matched = 0
+    while True:
+        r, c = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[r, c] < iou_threshold:
+            return matched
+        matched += 1
+        iou[r, :] = 0.0
+        iou[:, c] = 0.0
+
+
+def run_detections(model_dir, source, max_frames):
+    """Every frame of `source` through one model, in sync mode. Returns (per-frame detections, stage summary)."""
+    cap = ThreadedCapture(source)  # Lossless for files, so both models see exactly the same frames
+    if not cap.isOpened():
+        raise SystemExit(f"❌ Cannot open {source}")
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    compiled_model, input_transform = detection.load_model(model_dir, frame_width, frame_height,
+                                                           performance_hint="LATENCY")
+    timer = StageTimer()
+    frames = []
+
+    def collect(frame, grabbed):
+        frames.append(detector.detections())
+        return len(frames) < max_frames
+
+    with tempfile.TemporaryDirectory() as scratch:
+        status_publisher = StatusPublisher(os.path.join(scratch, "status.json"), heartbeat=detection.STATUS_HEARTBEAT)
+        event_log = EventLog(os.path.join(scratch, "events.db"))
+        # No motion gate or keyframes: every frame gets a fresh inference to compare
+        detector = detection.Detector(detection.load_class_names(model_dir), frame_width, frame_height,
+                                      status_publisher, event_log, input_transform=input_transform,
+                                      on_alert=None, capture=cap, timer=timer)
+        detection.run_sync(detector, compiled_model, cap, on_frame=collect)
+        event_log.close()
+        status_publisher.close()
+    cap.release()
+    return frames, timer.summary()
+
+
+def agreement(reference, candidate, object_class_ids):
+    """Recall/precision of the candidate's detections against the reference's, frame by frame"""
+    totals = {"reference": 0, "candidate": 0, "matched": 0,
+              "reference_objects": 0, "matched_objects": 0}
+    for (ref_boxes, ref_classes), (cand_boxes, cand_classes) in zip(reference, candidate):
+        totals["reference"] += len(ref_boxes)
+        totals["candidate"] += len(cand_boxes)
+        totals["matched"] += count_matches(ref_boxes, ref_classes, cand_boxes, cand_classes)
+        # The tracked class is what actually raises alerts, so it gets its own recall
+        ref_objects = np.isin(ref_classes, object_class_ids)
+        cand_objects = np.isin(cand_classes, object_class_ids)
+        totals["reference_objects"] += int(ref_objects.sum())
+        totals["matched_objects"] += count_matches(ref_boxes[ref_objects], ref_classes[ref_objects],
+                                                   cand_boxes[cand_objects], cand_classes[cand_objects])
+
+    def ratio(part, whole):
+        return round(part / whole, 4) if whole else None
+
+    return {
+        "frames": min(len(reference), len(candidate)),
+        "object_recall": ratio(totals["matched_objects"], totals["reference_objects"]),
+        "recall": ratio(totals["matched"], totals["reference"]),
+        "precision": ratio(totals["matched"], totals["candidate"]),
+        **totals,
+    }
+
+
+def latency(summary):
+    return {stage: {key: summary[stage][key] for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms")}
+            for stage in ("inference", "frame") if stage in summary}
+
+
+def throughput(model_dir, source, frames, warmup):
+    args = benchmark.parse_args(["--source", source, "--model-dir", model_dir, "--mode", "async",
+                                 "--frames", str(frames), "--warmup", str(warmup)])
+    return benchmark.run_benchmark(args)["fps"]
+
+
+def compare(args):
+    models = {"reference": args.reference_dir or detection.find_model("FP32"),
+              "candidate": args.candidate_dir or detection.find_model("INT8")}
+    object_class_ids = class_ids_for_names(detection.load_class_names(models["reference"]), [detection.OBJECT_NAME])
+    clips = []
+    for source in args.source:
+        result = {"source": source}
+        runs = {}
+        for role, model_dir in models.items():
+            start = time.perf_counter()
+            frames, summary = run_detections(model_dir, source, args.frames)
+            runs[role] = frames
+            result[role] = {
+                "latency": latency(summary),
+                "sync_wall_time_s": round(time.perf_counter() - start, 3),
+                "async_fps": throughput(model_dir, source, args.frames, args.warmup),
+            }
+        result["agreement"] = agreement(runs["reference"], runs["candidate"], object_class_ids)
+        clips.append(result)
+    return {"config": {"models": models, "object": detection.OBJECT_NAME, "match_iou": MATCH_IOU,
+                       "max_frames": args.frames}, "clips": clips}
+
+
+def print_summary(report):
+    for clip in report["clips"]:
+        ref, cand, agree = clip["reference"], clip["candidate"], clip["agreement"]
+        print(f"🎞️ {clip['source']} ({agree['frames']} frames)", file=sys.stderr)
+        for role, run in (("reference", ref), ("candidate", cand)):
+            inference = run["latency"].get("inference", {})
+            print(f"   {role:9}  inference p50 {inference.get('p50_ms')} ms  p95 {inference.get('p95_ms')} ms"
+                  f"  async {run['async_fps']} fps", file=sys.stderr)
+        print(f"   agreement  {report['config']['object']} recall {agree['object_recall']}"
+              f"  recall {agree['recall']}  precision {agree['precision']}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare two detector models (FP32 vs INT8 by default) on the same clips: latency, "
+                    "throughput and how well the candidate's detections agree with the reference's",
+        epilog="example: python compare_models.py --source gallery1.mp4 gallery2.mp4 --output int8.json")
+    parser.add_argument("--source", nargs="+", required=True, help="recorded clips to replay")
+    parser.add_argument("--reference-dir", help="reference IR directory (default: the FP32 model)")
+    parser.add_argument("--candidate-dir", help="candidate IR directory (default: the INT8 model)")
+    parser.add_argument("--frames", type=int, default=300, help="frames per clip")
+    parser.add_argument("--warmup", type=int, default=20, help="frames before the throughput run starts measuring")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = compare(args)
+    print_summary(report)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+        print(f"📊 Comparison report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,567 +1,709 @@
 import os
+import shutil
+import sys
+import tempfile
+import argparse
 import cv2
 import numpy as np
 import pygame
-import json
 import time
-from ultralytics import YOLO
+import yaml
 from openvino.runtime import Core
 from datetime import datetime
-
-# Initialize pygame mixer for audio
-pygame.mixer.init()
+from yolo_decoder import decode_yolo_output, nms, class_ids_for_names, letterbox_transform
+from async_pipeline import AsyncInferencePipeline
+from capture import open_capture
+from preprocessing import embed_preprocessing
+from tracker import ObjectTracker
+from status_publisher import StatusPublisher, STATUS_SHM_PATH
+from live_view import LiveFrameWriter
+from event_log import EventLog, EVENT_LOG_FILE
+from stage_timer import NullTimer
+from overlay import OverlayRenderer
+from motion_gate import MotionGate
+from box_propagation import BoxPropagator
+from tiling import TileBatcher, plan_tiles, merge_nms, TILE_SIZE
+from alerts import AlertDispatcher, AudioSink, LogSink, WebhookSink, EventLogSink, ALERT_LOG_FILE
+from quality_controller import QualityController, LATENCY_TARGET, QUALITY_INPUT_SIZES
+from evidence import EvidenceRecorder, EVIDENCE_FPS
+from clip_library import ClipLibrary, CLIP_LIBRARY_FILE
 
 OBJECT_NAME = "bottle"
 ALERT_SOUND = "AGAIN_fetty.mp3"
+ALERT_WEBHOOK_URL = None  # e.g. "http://127.0.0.1:9000/alert" to also POST every alert as JSON
+EVIDENCE_CAPTURE = True  # Save snapshots and a pre/post-roll clip for every movement/missing alert (see evidence.py)
 MOVE_THRESHOLD = 100
+MISSING_TIME_THRESHOLD = 2.0  # Alert if bottle missing for more than 2 seconds
+MATCH_DISTANCE_THRESHOLD = 100  # Max distance to match a bottle between frames
 MODEL_NAME = "yolov8n.pt"
+MODEL_PRECISION = "FP32"  # "INT8" uses the quantized model built by quantize.py (see compare_models.py first)
 STATUS_FILE = "status.json"  # Shared status file
+STATUS_HEARTBEAT = 1.0  # Republish unchanged status at least this often (seconds)
+USE_SHARED_MEMORY_STATUS = True  # Also publish status through shared memory for web_server.py
+EVENT_HEARTBEAT = 60.0  # Log a detector heartbeat event this often (seconds)
+CONF_THRESHOLD = 0.5
+NMS_THRESHOLD = 0.4
+DRAW_OTHER_OBJECTS = True  # False = only score OBJECT_NAME (faster decode, no boxes for other classes)
+ASYNC_INFERENCE = True  # Pipeline capture, inference and postprocessing across threads
+NUM_INFER_REQUESTS = 0  # In-flight async requests (0 = let OpenVINO choose)
+CAMERA_SOURCE = "0"  # Camera index, video file path or rtsp:// URL
+INPUT_SIZE = 640
+IN_GRAPH_PREPROCESS = True  # Feed raw uint8 BGR frames, resize/normalize inside the OpenVINO graph
+LETTERBOX = False  # Keep aspect ratio and pad (only with IN_GRAPH_PREPROCESS)
+LIVE_VIEW = True  # Hand annotated frames to web_server.py's /video_feed while someone is watching
+MOTION_GATE = True  # Skip inference while the scene is static (see motion_gate.py)
+MOTION_REFRESH_INTERVAL = 1.0  # Run the detector at least this often anyway; keep below MISSING_TIME_THRESHOLD
+KEYFRAME_INTERVAL = 1  # Run the detector every Nth frame and carry boxes forward with optical flow in between (1 = every frame)
+TILED_INFERENCE = False  # Run the detector on overlapping tiles (one batched request) for small objects in 4K frames
+TILE_ZONES = []  # Optional (x1, y1, x2, y2) artifact zones in frame pixels; tiles then only cover these
+ADAPTIVE_QUALITY = False  # Switch input size / frame rate to hold LATENCY_TARGET (see quality_controller.py); runs sync
+HEADLESS = False  # No local window (also forced on when there is no display); stop with Ctrl+C
 
-def play_alert():
-    try:
-        pygame.mixer.music.load(ALERT_SOUND)
-        pygame.mixer.music.play()
-    except Exception as e:
-        print(f"⚠️ Sound error: {e}")
+script_dir = os.path.dirname(os.path.abspath(__file__))
+model_cache_dir = os.path.join(script_dir, "model_cache")
 
-def update_status_file(status):
-    """Write status to JSON file for web server to read"""
-    try:
-        with open(STATUS_FILE, 'w') as f:
-            json.dump(status, f)
-    except Exception as e:
-        print(f"⚠️ Status file error: {e}")
-
-# Initialize status
-status = {
-    "object_present": False,
-    "last_seen": None,
-    "movement_detected": False,
-    "last_movement": None,
-    "status_message": "Initializing...",
-    "bottles": [],  # Array of individual bottle statuses
-    "total_bottles": 0,
-    "present_count": 0,
-    "missing_count": 0,
-    "max_bottles_seen": 0
-}
-update_status_file(status)
+def initial_status():
+    return {
+        "object_present": False,
+        "last_seen": None,
+        "movement_detected": False,
+        "last_movement": None,
+        "last_seen_at": None,  # ISO 8601 versions of last_seen / last_movement, with date and UTC offset
+        "last_movement_at": None,
+        "status_message": "Initializing...",
+        "bottles": [],  # Array of individual bottle statuses
+        "total_bottles": 0,
+        "present_count": 0,
+        "missing_count": 0,
+        "max_bottles_seen": 0
+    }
 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-model_dir = os.path.join(script_dir, "yolov8n_openvino_model")
-model_xml_path = os.path.join(model_dir, "yolov8n.xml")
+def iso_time(timestamp):
+    return datetime.fromtimestamp(timestamp).astimezone().isoformat(timespec="seconds") if timestamp else None
+
+def load_class_names(model_dir):
+    """Read the class id -> name map that the Ultralytics export writes next to the IR"""
+    with open(os.path.join(model_dir, "metadata.yaml"), 'r') as f:
+        return yaml.safe_load(f)["names"]
+
+def _export_sized_model(input_size, model_dir):
+    from ultralytics import YOLO
+    # Export inside a scratch dir: Ultralytics always writes yolov8n_openvino_model next to the weights,
+    # which would overwrite the default 640 model
+    with tempfile.TemporaryDirectory() as workdir:
+        weights = os.path.join(workdir, MODEL_NAME)
+        if os.path.exists(MODEL_NAME):
+            shutil.copy(MODEL_NAME, weights)
+        exported = YOLO(weights).export(format="openvino", imgsz=input_size)
+        shutil.move(exported, model_dir)
+    return model_dir
+
+def int8_model_dir(input_size=INPUT_SIZE):
+    """Where quantize.py writes (and find_model looks for) the INT8 model for one input size"""
+    sized = "" if input_size == INPUT_SIZE else f"_{input_size}"
+    return os.path.join(script_dir, f"yolov8n{sized}_int8_openvino_model")
 
-print("🔧 Loading YOLOv8 model...")
-model = YOLO(MODEL_NAME)
+def find_model(precision=MODEL_PRECISION, input_size=INPUT_SIZE):
+    """Directory of the OpenVINO IR, exporting it from MODEL_NAME the first time
 
-if not os.path.exists(model_xml_path):
-    print("🧩 OpenVINO model not found — exporting...")
-    export_path = model.export(format="openvino")
-    model_dir = export_path
+    The exported graph has its anchor grid baked in for one input size, so
+    other sizes get an IR of their own (yolov8n_320_openvino_model, ...).
+    """
+    sized = "" if input_size == INPUT_SIZE else f"_{input_size}"
+    if sized and precision.upper() == "FP32":
+        model_dir = os.path.join(script_dir, f"yolov8n{sized}_openvino_model")
+        if not os.path.exists(os.path.join(model_dir, "yolov8n.xml")):
+            print(f"🧩 No {input_size}x{input_size} OpenVINO model — exporting...")
+            _export_sized_model(input_size, model_dir)
+        else:
+            print(f"✅ Found {input_size}x{input_size} OpenVINO model at:\n{model_dir}")
+        return model_dir
+    if precision.upper() == "INT8":
+        model_dir = int8_model_dir(input_size)
+        if not os.path.exists(os.path.join(model_dir, "yolov8n.xml")):
+            size_arg = f" --input-size {input_size}" if sized else ""
+            raise Exception(f"❌ INT8 model not found — build it with: "
+                            f"python quantize.py --calibration <recordings>{size_arg}")
+        print(f"✅ Found INT8 OpenVINO model at:\n{model_dir}")
+        return model_dir
+    model_dir = os.path.join(script_dir, "yolov8n_openvino_model")
     model_xml_path = os.path.join(model_dir, "yolov8n.xml")
-else:
-    print(f"✅ Found existing OpenVINO model at:\n{model_xml_path}")
+    if not os.path.exists(model_xml_path):
+        print("🧩 OpenVINO model not found — exporting...")
+        # Ultralytics pulls in torch, so only import it when we actually have to export
+        from ultralytics import YOLO
+        print("🔧 Loading YOLOv8 model...")
+        model_dir = YOLO(MODEL_NAME).export(format="openvino")
+    else:
+        print(f"✅ Found existing OpenVINO model at:\n{model_xml_path}")
+    return model_dir
 
-print("🚀 Loading OpenVINO model...")
-ie = Core()
-ov_model = ie.read_model(model=model_xml_path)
-compiled_model = ie.compile_model(model=ov_model, device_name="CPU")
+def load_model(model_dir, frame_width, frame_height, in_graph_preprocess=IN_GRAPH_PREPROCESS,
+               letterbox=LETTERBOX, performance_hint=None, device="CPU", config=None, batch=1,
+               input_size=INPUT_SIZE):
+    """Compile the detector for this frame size. Returns (compiled_model, input_transform).
 
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    raise Exception("❌ Camera not found or cannot be opened!")
+    With batch > 1 the model takes that many input_size x input_size tiles
+    per request (see tiling.py) instead of one full frame. `input_size`
+    must match the IR in model_dir (see find_model).
+    """
+    print("🚀 Loading OpenVINO model...")
+    ie = Core()
+    # Compiled blobs are cached on disk, so restarts skip graph compilation
+    ie.set_property({"CACHE_DIR": model_cache_dir})
+    ov_model = ie.read_model(model=os.path.join(model_dir, "yolov8n.xml"))
+    input_transform = None  # Plain stretch to input_size
+    if batch > 1:
+        ov_model.reshape([batch, 3, input_size, input_size])
+        if in_graph_preprocess:
+            # Tiles are already cut and scaled to input_size on the host; the graph does color/layout/scale
+            ov_model = embed_preprocessing(ov_model, input_size, input_size, input_size, batch=batch)
+    elif in_graph_preprocess:
+        ov_model = embed_preprocessing(ov_model, frame_width, frame_height, input_size, letterbox=letterbox)
+        if letterbox:
+            input_transform = letterbox_transform(frame_width, frame_height, input_size)
+    # Throughput hint lets the CPU plugin run several inference streams in parallel for the async queue
+    compile_config = {"PERFORMANCE_HINT": performance_hint or ("THROUGHPUT" if ASYNC_INFERENCE else "LATENCY")}
+    compile_config.update(config or {})
+    compiled_model = ie.compile_model(model=ov_model, device_name=device, config=compile_config)
+    return compiled_model, input_transform
 
-# Track multiple bottles: {id: {'position': (x, y), 'frames_seen': count, 'last_seen_time': timestamp, 'missing_alerted': bool, 'initial_position': (x, y)}}
-tracked_bottles = {}
-max_bottles_seen_simultaneously = 0  # Track the maximum number of bottles seen at once
-MISSING_TIME_THRESHOLD = 2.0  # Alert if bottle missing for more than 2 seconds
-MATCH_DISTANCE_THRESHOLD = 100  # Max distance to match a bottle between frames
 
-def has_moved(prev, current, threshold=MOVE_THRESHOLD):
-    if prev is None or current is None:
+class Detector:
+    """Everything that happens to a frame around inference, split into timed stages.
+
+    preprocess() turns a frame into the model input; process_frame() runs
+    decode, nms, tracking, status building and the status write for one
+    frame's output. Overlay drawing is lazy, see annotate(). `timer` (see
+    stage_timer.py) records each stage; the default NullTimer costs
+    nothing.
+
+    With a `motion_gate` or a `keyframe_interval` above 1, should_infer()
+    tells the loops when inference can be skipped, and
+    process_frame(frame, None) then works from the last keyframe's
+    detections. With keyframes they are moved along by optical flow
+    (box_propagation.py), so tracking and move alerts keep working between
+    keyframes. A box the flow loses forces an early keyframe. With only
+    the motion gate, the detections are reused as they are. Either way
+    tracked objects stay present and alert timing is unchanged.
+    """
+
+    def __init__(self, class_names, frame_width, frame_height, status_publisher, event_log,
+                 input_transform=None, in_graph_preprocess=IN_GRAPH_PREPROCESS, on_alert=None,
+                 capture=None, timer=None, motion_gate=None, keyframe_interval=1, tile_batcher=None,
+                 input_size=INPUT_SIZE):
+        self.class_names = class_names
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.status_publisher = status_publisher
+        self.event_log = event_log
+        self.input_transform = input_transform
+        self.input_size = input_size  # Changed together with input_transform by the quality controller
+        self.in_graph_preprocess = in_graph_preprocess
+        self.on_alert = on_alert
+        self.capture = capture  # Only used for the dropped-frame count in heartbeats
+        self.timer = timer or NullTimer()
+        self.motion_gate = motion_gate
+        self.tile_batcher = tile_batcher  # Tiled mode: one batched request of crops per frame
+        self.keyframe_interval = keyframe_interval
+        self.propagator = BoxPropagator() if keyframe_interval > 1 else None
+        self._since_keyframe = 0
+        # Restrict decoding to the tracked class unless we also want to draw everything else
+        self.scored_class_ids = None if DRAW_OTHER_OBJECTS else class_ids_for_names(class_names, [OBJECT_NAME])
+        # Track multiple bottles; IDs stay in [0, max_seen) and missing bottles' IDs get reused
+        self.tracked_bottles = ObjectTracker(move_threshold=MOVE_THRESHOLD, match_threshold=MATCH_DISTANCE_THRESHOLD,
+                                             missing_time=MISSING_TIME_THRESHOLD)
+        self.renderer = OverlayRenderer(self.tracked_bottles, MISSING_TIME_THRESHOLD)
+        self._overlay = None  # What annotate() would draw for the latest frame
+        self._annotated = None  # ... and the frame it was drawn on
+        # Detections (boxes, scores, class_ids, keep) of the last frame that went through inference
+        self._last_detections = (np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32),
+                                 np.empty(0, dtype=np.int32), [])
+        self._keyframe_labels = None  # (scores, class_ids) of the boxes the propagator carries
+        self.status = initial_status()
+        self.frame_count = 0
+        self.last_heartbeat = time.time()
+
+    def preprocess(self, frame):
+        """Turn a BGR frame into the model input tensor"""
+        with self.timer.stage("preprocess"):
+            if self.tile_batcher is not None:
+                tiles = self.tile_batcher.fill(frame)
+                if self.in_graph_preprocess:
+                    return tiles
+                return tiles[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+            if self.in_graph_preprocess:
+                # The compiled model does resize/color/scale itself and takes the frame as-is (NHWC uint8)
+                if frame.shape[1] != self.frame_width or frame.shape[0] != self.frame_height:
+                    frame = cv2.resize(frame, (self.frame_width, self.frame_height))
+                return frame[np.newaxis]
+            input_image = cv2.resize(frame, (self.input_size, self.input_size))
+            input_rgb = cv2.cvtColor(input_image, cv2.COLOR_BGR2RGB)
+            return np.expand_dims(input_rgb.transpose(2, 0, 1), 0).astype(np.float32) / 255.0
+
+    def skips_frames(self):
+        return self.motion_gate is not None or self.propagator is not None
+
+    def should_infer(self, frame):
+        """False if this frame can do without inference (static scene, or not a keyframe)"""
+        if self.motion_gate is not None:
+            with self.timer.stage("gate"):
+                if not self.motion_gate.check(frame):
+                    return False
+        if self.propagator is None:
+            return True
+        self._since_keyframe += 1
+        if self._since_keyframe >= self.keyframe_interval or self.propagator.needs_keyframe:
+            self._since_keyframe = 0
+            return True
         return False
-    return np.linalg.norm(np.array(prev) - np.array(current)) > threshold
-
-def match_bottles(prev_bottles, current_positions, match_threshold=MATCH_DISTANCE_THRESHOLD, current_time=None):
-    """Match current bottle positions to previous tracked bottles"""
-    matched = {}
-    used_current = set()
-    
-    if current_time is None:
-        current_time = time.time()
-    
-    # Extract just positions for matching (first 2 elements)
-    current_pos_only = [(pos[0], pos[1]) for pos in current_positions]
-    
-    # First, try to match active bottles (those that were seen recently)
-    for bottle_id, bottle_data in prev_bottles.items():
-        # Skip bottles that have been missing for a long time and already alerted
-        # We'll try to reuse their IDs later if needed
-        last_seen = bottle_data.get('last_seen_time', current_time)
-        time_missing = current_time - last_seen
-        if time_missing > MISSING_TIME_THRESHOLD and bottle_data.get('missing_alerted', False):
-            # Skip already-alerted missing bottles for matching
-            continue
-            
-        prev_pos = bottle_data.get('position')
-        if prev_pos is None:
-            continue
-            
-        best_match = None
-        best_distance = match_threshold
-        
-        for i, curr_pos in enumerate(current_pos_only):
-            if i in used_current:
-                continue
-            distance = np.linalg.norm(np.array(prev_pos) - np.array(curr_pos))
-            if distance < best_distance:
-                best_distance = distance
-                best_match = i
-        
-        if best_match is not None:
-            matched[bottle_id] = current_positions[best_match]  # Store full position data
-            used_current.add(best_match)
+
+    def process_frame(self, frame, output):
+        """Decode, track and publish status for one frame's inference output (None = skipped by the gate)"""
+        timer = self.timer
+        if output is None and self._keyframe_labels is not None:
+            # Between keyframes: the keyframe's boxes, moved along with the scene
+            with timer.stage("propagate"):
+                boxes, alive = self.propagator.propagate(frame)
+            scores, class_ids = self._keyframe_labels
+            keep = np.flatnonzero(alive)
+        elif output is None:
+            # Nothing changed since the last inference, so its detections still hold
+            boxes, scores, class_ids, keep = self._last_detections
         else:
-            # Bottle not found in current frame
-            matched[bottle_id] = None
-    
-    # Add new bottles for unmatched current positions
-    return matched, used_current
-
-def get_available_bottle_id(tracked_bottles, max_allowed, current_time=None):
-    """Get an available bottle ID within the range [0, max_allowed-1], reusing missing bottle IDs first"""
-    if max_allowed <= 0:
-        return 0
-    
-    if current_time is None:
-        current_time = time.time()
-    
-    # First, try to find an unused ID slot (0 to max_allowed-1)
-    for bottle_id in range(max_allowed):
-        if bottle_id not in tracked_bottles:
-            return bottle_id
-    
-    # All IDs in range are taken, try to find a missing bottle ID to reuse
-    # (bottles that have been missing for longer than threshold)
-    for bottle_id in range(max_allowed):
-        if bottle_id in tracked_bottles:
-            bottle_data = tracked_bottles[bottle_id]
-            last_seen = bottle_data.get('last_seen_time', current_time)
-            time_missing = current_time - last_seen
-            if time_missing > MISSING_TIME_THRESHOLD:
-                # This ID is available for reuse (bottle has been missing)
-                return bottle_id
-    
-    # All IDs are active, find the one that's been missing the longest to reuse
-    oldest_missing_id = None
-    longest_missing_time = 0
-    for bottle_id in range(max_allowed):
-        if bottle_id in tracked_bottles:
-            bottle_data = tracked_bottles[bottle_id]
-            last_seen = bottle_data.get('last_seen_time', current_time)
-            time_missing = current_time - last_seen
-            if time_missing > longest_missing_time:
-                longest_missing_time = time_missing
-                oldest_missing_id = bottle_id
-    
-    if oldest_missing_id is not None:
-        return oldest_missing_id
-    
-    # Fallback: return first available ID (shouldn't reach here if logic is correct)
-    return 0
-
-print("✅ Ready — Detection running!")
-print("🌐 Run 'python web_server.py' in another terminal to start the web interface")
-
-frame_count = 0
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    input_image = cv2.resize(frame, (640, 640))
-    input_rgb = cv2.cvtColor(input_image, cv2.COLOR_BGR2RGB)
-    input_tensor = np.expand_dims(input_rgb.transpose(2, 0, 1), 0).astype(np.float32) / 255.0
-
-    result = compiled_model([input_tensor])
-    output = result[compiled_model.output(0)]
-
-    if len(output.shape) == 3:
-        output = output[0].T
-
-    current_bottle_positions = []  # Initialize list for current frame's bottle positions
-    boxes = []
-    scores = []
-    class_ids = []
-
-    for det in output:
-        x_center, y_center, width, height = det[:4]
-        class_scores = det[4:]
-        cls = np.argmax(class_scores)
-        conf = class_scores[cls]
-        
-        if conf < 0.5:
-            continue
-
-        x1 = int((x_center - width / 2) * frame.shape[1] / 640)
-        y1 = int((y_center - height / 2) * frame.shape[0] / 640)
-        x2 = int((x_center + width / 2) * frame.shape[1] / 640)
-        y2 = int((y_center + height / 2) * frame.shape[0] / 640)
-
-        x1, y1 = max(0, x1), max(0, y1)
-        x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
-
-        boxes.append([x1, y1, x2, y2])
-        scores.append(float(conf))
-        class_ids.append(cls)
-    
-    if len(boxes) > 0:
-        indices = cv2.dnn.NMSBoxes(boxes, scores, score_threshold=0.5, nms_threshold=0.4)
-        
-        if len(indices) > 0:
-            for i in indices.flatten():
-                x1, y1, x2, y2 = boxes[i]
-                conf = scores[i]
-                cls = class_ids[i]
-                class_name = model.names.get(cls, str(cls))
-
-                # Draw detection boxes for non-bottle objects only
-                # Bottles will be drawn with IDs in the tracking section
-                if class_name != OBJECT_NAME:
-                    color = (255, 0, 0)
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(frame, f"{class_name} {conf:.2f}", (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+            with timer.stage("decode"):
+                if self.tile_batcher is not None:
+                    boxes, scores, class_ids, tiles = self.tile_batcher.decode(
+                        output, conf_threshold=CONF_THRESHOLD, class_ids=self.scored_class_ids)
                 else:
-                    # Store bottle position and bbox for tracking
-                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                    current_bottle_positions.append((cx, cy, x1, y1, x2, y2))
-
-    # Track multiple bottles
-    current_bottles = {}
-    alert_triggered = False
-    current_time = time.time()  # Get current timestamp for this frame
-    
-    # Update maximum bottles seen simultaneously
-    num_bottles_current = len(current_bottle_positions)
-    if num_bottles_current > max_bottles_seen_simultaneously:
-        max_bottles_seen_simultaneously = num_bottles_current
-        print(f"📊 Maximum bottles seen simultaneously updated to: {max_bottles_seen_simultaneously}")
-    
-    if len(current_bottle_positions) > 0:
-        # Match current positions to tracked bottles (including trying to match to missing bottles)
-        matched_bottles, used_positions = match_bottles(tracked_bottles, current_bottle_positions, current_time=current_time)
-        
-        # Also try to match unmatched positions to missing bottles (for ID reuse)
-        unmatched_positions = [(i, pos) for i, pos in enumerate(current_bottle_positions) if i not in used_positions]
-        # Find missing bottles that haven't been alerted yet (so we can try to match them)
-        missing_bottle_ids = []
-        for bid, bdata in tracked_bottles.items():
-            if bid < max_bottles_seen_simultaneously:
-                last_seen = bdata.get('last_seen_time', current_time)
-                time_missing = current_time - last_seen
-                if time_missing > MISSING_TIME_THRESHOLD and not bdata.get('missing_alerted', False):
-                    missing_bottle_ids.append(bid)
-        
-        # Try to match unmatched positions to missing bottle IDs
-        for missing_id in missing_bottle_ids:
-            if not unmatched_positions:
-                break
-            if 'position' not in tracked_bottles[missing_id]:
-                continue
-            missing_pos = tracked_bottles[missing_id]['position']
-            best_match_idx = None
-            best_match_pos_idx = None
-            best_distance = MATCH_DISTANCE_THRESHOLD
-            
-            for pos_idx, (curr_idx, pos_data) in enumerate(unmatched_positions):
-                curr_pos = (pos_data[0], pos_data[1])
-                distance = np.linalg.norm(np.array(missing_pos) - np.array(curr_pos))
-                if distance < best_distance:
-                    best_distance = distance
-                    best_match_idx = curr_idx
-                    best_match_pos_idx = pos_idx
-            
-            if best_match_idx is not None:
-                # Reuse this missing bottle's ID
-                matched_bottles[missing_id] = current_bottle_positions[best_match_idx]
-                used_positions.add(best_match_idx)
-                unmatched_positions.pop(best_match_pos_idx)
-        
-        # Update matched bottles
-        for bottle_id, new_position_data in matched_bottles.items():
-            if new_position_data is not None:
-                # Extract position from tuple (cx, cy, x1, y1, x2, y2)
-                new_position = (new_position_data[0], new_position_data[1])
-                
-                # Check if this bottle was previously missing (reused ID)
-                last_seen = tracked_bottles[bottle_id].get('last_seen_time', current_time)
-                time_missing = current_time - last_seen
-                was_missing = time_missing > MISSING_TIME_THRESHOLD
-                
-                # Bottle found - update last seen time and reset missing alert flag
-                tracked_bottles[bottle_id]['last_seen_time'] = current_time
-                tracked_bottles[bottle_id]['missing_alerted'] = False  # Reset alert flag since bottle is back
-                
-                # Bottle found - check for movement
-                prev_pos = tracked_bottles[bottle_id].get('position', new_position)
-                initial_pos = tracked_bottles[bottle_id].get('initial_position', prev_pos)
-                
-                # If bottle was missing and is now found, reset it as a new detection
-                if was_missing:
-                    # Reset the bottle as if it's new (new initial position, reset movement alert)
-                    tracked_bottles[bottle_id] = {
-                        'position': new_position,
-                        'initial_position': new_position,
-                        'frames_seen': 1,
-                        'last_seen_time': current_time,
-                        'missing_alerted': False,
-                        'movement_alerted': False,
-                        'bbox': (new_position_data[2], new_position_data[3], 
-                                new_position_data[4], new_position_data[5]),
-                        'settling_frames': 10
-                    }
-                    current_bottles[bottle_id] = tracked_bottles[bottle_id]
-                    continue
-                
-                # Update settling frames counter
-                settling_frames = tracked_bottles[bottle_id].get('settling_frames', 0)
-                is_settled = (settling_frames == 0)
-                
-                if settling_frames > 0:
-                    tracked_bottles[bottle_id]['settling_frames'] = settling_frames - 1
-                    # After settling completes, lock in the initial position
-                    if tracked_bottles[bottle_id]['settling_frames'] == 0:
-                        tracked_bottles[bottle_id]['initial_position'] = new_position
-                        is_settled = True
-                
-                # Check if moved significantly from initial position or previous position
-                # Only check movement after settling period
-                if is_settled:
-                    # Use the locked initial position for comparison
-                    locked_initial = tracked_bottles[bottle_id].get('initial_position', new_position)
-                    moved_from_initial = has_moved(locked_initial, new_position, threshold=MOVE_THRESHOLD * 2)
-                    moved_from_prev = has_moved(prev_pos, new_position)
-                    
-                    if moved_from_initial or moved_from_prev:
-                        if not tracked_bottles[bottle_id].get('movement_alerted', False):
-                            print(f"🚨 Bottle {bottle_id} moved!")
-                            play_alert()
-                            alert_triggered = True
-                            status["movement_detected"] = True
-                            status["last_movement"] = datetime.now().strftime("%I:%M:%S %p")
-                            tracked_bottles[bottle_id]['movement_alerted'] = True
-                
-                tracked_bottles[bottle_id]['position'] = new_position
-                tracked_bottles[bottle_id]['frames_seen'] = tracked_bottles[bottle_id].get('frames_seen', 0) + 1
-                if 'settling_frames' not in tracked_bottles[bottle_id]:
-                    tracked_bottles[bottle_id]['settling_frames'] = 10
-                if 'initial_position' not in tracked_bottles[bottle_id]:
-                    tracked_bottles[bottle_id]['initial_position'] = new_position
-                
-                # Store bbox for display
-                tracked_bottles[bottle_id]['bbox'] = (new_position_data[2], new_position_data[3], 
-                                                     new_position_data[4], new_position_data[5])
-                current_bottles[bottle_id] = tracked_bottles[bottle_id]
+                    boxes, scores, class_ids = decode_yolo_output(output, frame.shape[1], frame.shape[0],
+                                                                  conf_threshold=CONF_THRESHOLD, input_size=self.input_size,
+                                                                  class_ids=self.scored_class_ids,
+                                                                  transform=self.input_transform)
+            with timer.stage("nms"):
+                if self.tile_batcher is not None:
+                    # Objects on a tile seam show up in both tiles
+                    keep = merge_nms(boxes, scores, class_ids, tiles, score_threshold=CONF_THRESHOLD,
+                                     nms_threshold=NMS_THRESHOLD)
+                else:
+                    keep = nms(boxes, scores, score_threshold=CONF_THRESHOLD, nms_threshold=NMS_THRESHOLD)
+            self._last_detections = (boxes, scores, class_ids, keep)
+            if self.propagator is not None:
+                with timer.stage("propagate"):
+                    keep = np.asarray(keep, dtype=np.intp)
+                    self.propagator.reset(frame, boxes[keep])
+                    self._keyframe_labels = (scores[keep], class_ids[keep])
+                # Same detections, indexed the way propagate() returns them
+                boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+                keep = np.arange(len(keep))
+        with timer.stage("tracking"):
+            current_time = time.time()  # Get current timestamp for this frame
+            other_objects = self.track(boxes, scores, class_ids, keep, current_time)
+            if self.motion_gate is not None:
+                # Changes around the artifacts we track count even when they are small
+                present = self.tracked_bottles.present_mask(current_time)
+                self.motion_gate.set_regions(self.tracked_bottles.bbox[present])
+        with timer.stage("status"):
+            self.build_status(current_time)
+        self._overlay = (other_objects, current_time)
+        self._annotated = None
+        with timer.stage("status_write"):
+            self.publish(current_time)
+        self.frame_count += 1
+
+    def track(self, boxes, scores, class_ids, keep, current_time):
+        """Update the tracker with this frame's bottles; returns the other detections for the overlay"""
+        current_bottle_positions = []  # Initialize list for current frame's bottle positions
+        other_objects = []
+        for i in keep:
+            x1, y1, x2, y2 = boxes[i].tolist()
+            cls = int(class_ids[i])
+            class_name = self.class_names.get(cls, str(cls))
+            # Bottles will be drawn with IDs in the tracking section
+            if class_name != OBJECT_NAME:
+                other_objects.append((class_name, float(scores[i]), x1, y1, x2, y2))
+            else:
+                # Store bottle position and bbox for tracking
+                cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+                current_bottle_positions.append((cx, cy, x1, y1, x2, y2))
+
+        # Track multiple bottles
+        tracked_bottles = self.tracked_bottles
+        previous_max = tracked_bottles.max_seen
+        events = tracked_bottles.update(current_bottle_positions, current_time)
+        if tracked_bottles.max_seen > previous_max:
+            print(f"📊 Maximum bottles seen simultaneously updated to: {tracked_bottles.max_seen}")
+
+        event_log = self.event_log
+        for event in events:
+            if event.kind == "moved":
+                print(f"🚨 Bottle {event.object_id} moved!")
+                uid = event_log.log("moved", event.object_id, current_time,
+                                    position=tracked_bottles[event.object_id]['position'])
+                self.alert("moved", event.object_id, f"Bottle {event.object_id} moved", current_time, event=uid)
+            elif event.kind == "missing":
+                print(f"🚨 Bottle {event.object_id} STOLEN/MISSING! (missing for {event.time_missing:.2f}s)")
+                uid = event_log.log("missing", event.object_id, current_time,
+                                    missing_for=round(event.time_missing, 2),
+                                    last_position=tracked_bottles[event.object_id]['position'])
+                self.alert("missing", event.object_id, f"Bottle {event.object_id} missing", current_time, event=uid)
+            elif event.kind == "recovered":
+                print(f"✅ Bottle {event.object_id} back after {event.time_missing:.2f}s")
+                event_log.log("recovered", event.object_id, current_time, missing_for=round(event.time_missing, 2))
             else:
-                # Bottle not found in current frame - check if it's been missing long enough to alert
-                last_seen = tracked_bottles[bottle_id].get('last_seen_time', current_time)
+                event_log.log("reassigned", event.object_id, current_time, missing_for=round(event.time_missing, 2))
+        return other_objects
+
+    def alert(self, kind, object_id, message, timestamp, **details):
+        # Only queues it (see alerts.AlertDispatcher); sounds, webhooks etc. run off the frame loop
+        if self.on_alert is not None:
+            self.on_alert(kind, object_id, message, timestamp=timestamp, **details)
+
+    def build_status(self, current_time):
+        """Check for missing bottles and update status with individual bottle information"""
+        tracked_bottles = self.tracked_bottles
+        status = self.status
+        max_bottles_seen_simultaneously = tracked_bottles.max_seen
+        any_missing = False
+        bottles_count = 0
+        missing_count = 0
+        bottles_status_list = []
+        last_movement_time = None
+        last_seen_time = None
+        any_movement_detected = False
+
+        # Build individual bottle statuses
+        for bottle_id in range(max_bottles_seen_simultaneously):
+            if bottle_id in tracked_bottles:
+                bottle_data = tracked_bottles[bottle_id]
+                last_seen = bottle_data.get('last_seen_time', current_time)
                 time_missing = current_time - last_seen
-                
-                # Check if bottle has been missing for more than threshold and we haven't alerted yet
-                if time_missing > MISSING_TIME_THRESHOLD and not tracked_bottles[bottle_id].get('missing_alerted', False):
-                    print(f"🚨 Bottle {bottle_id} STOLEN/MISSING! (missing for {time_missing:.2f}s)")
-                    play_alert()
-                    alert_triggered = True
-                    tracked_bottles[bottle_id]['missing_alerted'] = True  # Mark as alerted to prevent repeated alerts
-                    
-                # Keep tracking the bottle even if missing (for potential recovery)
-                if 'position' in tracked_bottles[bottle_id]:
-                    current_bottles[bottle_id] = tracked_bottles[bottle_id]
-        
-        # Add new bottles for unmatched positions
-        # The max_bottles_seen_simultaneously was already updated at the start based on current detections
-        unmatched_indices = [i for i in range(len(current_bottle_positions)) if i not in used_positions]
-        
-        # Create new bottles for unmatched positions
-        for i in unmatched_indices:
-            pos_data = current_bottle_positions[i]
-            # Get an available ID within the max range (0 to max_bottles_seen_simultaneously-1)
-            bottle_id = get_available_bottle_id(tracked_bottles, max_bottles_seen_simultaneously, current_time=current_time)
-            
-            pos = (pos_data[0], pos_data[1])
-            tracked_bottles[bottle_id] = {
-                'position': pos,
-                'initial_position': pos,
-                'frames_seen': 1,
-                'last_seen_time': current_time,
-                'missing_alerted': False,
-                'movement_alerted': False,
-                'bbox': (pos_data[2], pos_data[3], pos_data[4], pos_data[5]),
-                'settling_frames': 10  # Wait 10 frames before alerting on movement
-            }
-            current_bottles[bottle_id] = tracked_bottles[bottle_id]
-    else:
-        # No bottles detected in current frame - check all tracked bottles for missing time
-        for bottle_id in tracked_bottles.keys():
-            last_seen = tracked_bottles[bottle_id].get('last_seen_time', current_time)
-            time_missing = current_time - last_seen
-            
-            # Check if bottle has been missing for more than threshold and we haven't alerted yet
-            if time_missing > MISSING_TIME_THRESHOLD and not tracked_bottles[bottle_id].get('missing_alerted', False):
-                print(f"🚨 Bottle {bottle_id} STOLEN/MISSING! (missing for {time_missing:.2f}s)")
-                play_alert()
-                alert_triggered = True
-                tracked_bottles[bottle_id]['missing_alerted'] = True  # Mark as alerted to prevent repeated alerts
-                
-            # Keep tracking the bottle even if missing (for potential recovery)
-            if 'position' in tracked_bottles[bottle_id]:
-                current_bottles[bottle_id] = tracked_bottles[bottle_id]
-    
-    # Check for missing bottles and update status with individual bottle information
-    any_missing = False
-    bottles_count = 0
-    missing_count = 0
-    bottles_status_list = []
-    last_movement_time = None
-    last_seen_time = None
-    any_movement_detected = False
-    
-    # Build individual bottle statuses
-    for bottle_id in range(max_bottles_seen_simultaneously):
-        if bottle_id in tracked_bottles:
-            bottle_data = tracked_bottles[bottle_id]
-            last_seen = bottle_data.get('last_seen_time', current_time)
-            time_missing = current_time - last_seen
-            is_missing = time_missing > MISSING_TIME_THRESHOLD
-            
-            bottle_status = {
-                "id": bottle_id,
-                "present": not is_missing,
-                "last_seen": datetime.fromtimestamp(last_seen).strftime("%I:%M:%S %p") if last_seen else None,
-                "missing_for": round(time_missing, 2) if is_missing else 0,
-                "movement_detected": bottle_data.get('movement_alerted', False),
-                "missing_alerted": bottle_data.get('missing_alerted', False)
-            }
-            
-            # Add position if available
-            if 'position' in bottle_data:
-                bottle_status["position"] = {
-                    "x": int(bottle_data['position'][0]),
-                    "y": int(bottle_data['position'][1])
+                is_missing = time_missing > MISSING_TIME_THRESHOLD
+
+                bottle_status = {
+                    "id": bottle_id,
+                    "present": not is_missing,
+                    "last_seen": datetime.fromtimestamp(last_seen).strftime("%I:%M:%S %p") if last_seen else None,
+                    "last_seen_at": iso_time(last_seen),
+                    "missing_for": round(time_missing, 2) if is_missing else 0,
+                    "movement_detected": bottle_data.get('movement_alerted', False),
+                    "missing_alerted": bottle_data.get('missing_alerted', False)
                 }
-            
-            bottles_status_list.append(bottle_status)
-            
-            if is_missing:
-                any_missing = True
-                missing_count += 1
-            else:
-                bottles_count += 1
-                if last_seen_time is None or last_seen > last_seen_time:
-                    last_seen_time = last_seen
-            
-            if bottle_data.get('movement_alerted', False):
-                any_movement_detected = True
-                # Track the most recent movement
-                if last_movement_time is None or last_seen > last_movement_time:
-                    last_movement_time = last_seen
-    
-    # Update overall status
-    status["bottles"] = bottles_status_list
-    status["total_bottles"] = max_bottles_seen_simultaneously
-    status["present_count"] = bottles_count
-    status["missing_count"] = missing_count
-    status["max_bottles_seen"] = max_bottles_seen_simultaneously
-    
-    if any_missing:
-        status["object_present"] = False
-        status["status_message"] = f"⚠️ {missing_count} bottle(s) missing!"
-    elif bottles_count > 0:
-        status["object_present"] = True
-        status["last_seen"] = datetime.fromtimestamp(last_seen_time).strftime("%I:%M:%S %p") if last_seen_time else None
-        status["status_message"] = f"{bottles_count} bottle(s) detected ✓"
-    else:
-        # No bottles detected at all
-        if len(tracked_bottles) > 0:
-            # We had bottles before but now none detected
+
+                # Add position if available
+                if 'position' in bottle_data:
+                    bottle_status["position"] = {
+                        "x": int(bottle_data['position'][0]),
+                        "y": int(bottle_data['position'][1])
+                    }
+
+                bottles_status_list.append(bottle_status)
+
+                if is_missing:
+                    any_missing = True
+                    missing_count += 1
+                else:
+                    bottles_count += 1
+                    if last_seen_time is None or last_seen > last_seen_time:
+                        last_seen_time = last_seen
+
+                if bottle_data.get('movement_alerted', False):
+                    any_movement_detected = True
+                    # Track the most recent movement
+                    if last_movement_time is None or last_seen > last_movement_time:
+                        last_movement_time = last_seen
+
+        # Update overall status
+        status["bottles"] = bottles_status_list
+        status["total_bottles"] = max_bottles_seen_simultaneously
+        status["present_count"] = bottles_count
+        status["missing_count"] = missing_count
+        status["max_bottles_seen"] = max_bottles_seen_simultaneously
+
+        if any_missing:
             status["object_present"] = False
-            status["status_message"] = "⚠️ All bottles missing!"
+            status["status_message"] = f"⚠️ {missing_count} bottle(s) missing!"
+        elif bottles_count > 0:
+            status["object_present"] = True
+            status["last_seen"] = datetime.fromtimestamp(last_seen_time).strftime("%I:%M:%S %p") if last_seen_time else None
+            status["last_seen_at"] = iso_time(last_seen_time)
+            status["status_message"] = f"{bottles_count} bottle(s) detected ✓"
         else:
-            # Initial state - no bottles tracked yet
-            status["object_present"] = False
-            status["status_message"] = "No bottles detected yet"
-    
-    # Update movement status
-    status["movement_detected"] = any_movement_detected
-    if last_movement_time:
-        status["last_movement"] = datetime.fromtimestamp(last_movement_time).strftime("%I:%M:%S %p")
-    else:
-        status["last_movement"] = None
-    
-    # Display bottle IDs and bounding boxes on frame
-    for bottle_id, bottle_data in current_bottles.items():
-        last_seen = bottle_data.get('last_seen_time', current_time)
-        time_missing = current_time - last_seen
-        
-        if 'bbox' in bottle_data and time_missing <= MISSING_TIME_THRESHOLD:
-            x1, y1, x2, y2 = bottle_data['bbox']
-            # Determine color based on movement status
-            if bottle_data.get('movement_alerted', False):
-                color = (0, 0, 255)  # Red for moved bottles
-                label = f"Bottle #{bottle_id} MOVED!"
-            else:
-                color = (0, 255, 0)  # Green for stable bottles
-                label = f"Bottle #{bottle_id}"
-            
-            # Draw bounding box
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
-            # Draw label with background for better visibility
-            (text_width, text_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-            cv2.rectangle(frame, (x1, y2 + 5), (x1 + text_width + 10, y2 + text_height + 25), (0, 0, 0), -1)
-            cv2.putText(frame, label, (x1 + 5, y2 + text_height + 15),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-        elif time_missing > MISSING_TIME_THRESHOLD and 'position' in bottle_data:
-            # Bottle missing - show last known position
-            cx, cy = bottle_data['position']
-            if not bottle_data.get('missing_alerted', False):
-                # Still within threshold or just crossed it
-                cv2.circle(frame, (int(cx), int(cy)), 25, (0, 165, 255), 3)  # Orange for missing
-                cv2.putText(frame, f"Bottle #{bottle_id}?", (int(cx) - 50, int(cy) - 35),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 165, 255), 2)
+            # No bottles detected at all
+            if len(tracked_bottles) > 0:
+                # We had bottles before but now none detected
+                status["object_present"] = False
+                status["status_message"] = "⚠️ All bottles missing!"
             else:
-                # Already alerted - show as missing
-                cv2.circle(frame, (int(cx), int(cy)), 30, (0, 0, 255), 3)  # Red for confirmed missing
-                cv2.putText(frame, f"Bottle #{bottle_id} MISSING!", (int(cx) - 70, int(cy) - 40),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-    
-    # Clean up bottles with IDs beyond the maximum allowed (max_bottles_seen_simultaneously)
-    # Only keep bottles with IDs in range [0, max_bottles_seen_simultaneously-1]
-    if max_bottles_seen_simultaneously > 0:
-        bottles_to_remove = []
-        for bid in tracked_bottles.keys():
-            if bid >= max_bottles_seen_simultaneously:
-                bottles_to_remove.append(bid)
-        for bid in bottles_to_remove:
-            del tracked_bottles[bid]
-    
-    # Display count on frame
-    present_count = len([b for bid, b in tracked_bottles.items() 
-                        if (current_time - b.get('last_seen_time', current_time)) <= MISSING_TIME_THRESHOLD])
-    missing_count = len([b for bid, b in tracked_bottles.items() 
-                        if (current_time - b.get('last_seen_time', current_time)) > MISSING_TIME_THRESHOLD])
-    max_display = max_bottles_seen_simultaneously if max_bottles_seen_simultaneously > 0 else "?"
-    cv2.putText(frame, f"Tracking: {present_count} present, {missing_count} missing (Max: {max_display})", (10, 30),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-    # Write status to file every frame
-    update_status_file(status)
-    frame_count += 1
-
-    cv2.imshow("Object Movement Detector", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
-pygame.mixer.quit()
\ No newline at end of file
+                # Initial state - no bottles tracked yet
+                status["object_present"] = False
+                status["status_message"] = "No bottles detected yet"
+
+        # Update movement status
+        status["movement_detected"] = any_movement_detected
+        if last_movement_time:
+            status["last_movement"] = datetime.fromtimestamp(last_movement_time).strftime("%I:%M:%S %p")
+        else:
+            status["last_movement"] = None
+        status["last_movement_at"] = iso_time(last_movement_time)
+
+    def detections(self):
+        """(boxes, class_ids) kept after NMS on the last frame that went through inference"""
+        boxes, _, class_ids, keep = self._last_detections
+        keep = np.asarray(keep, dtype=np.intp)
+        return boxes[keep], class_ids[keep]
+
+    def annotate(self, frame):
+        """Draw the latest detections and tracked bottles onto `frame` (the frame just processed).
+
+        Drawing is skipped during detection and only happens here, for
+        consumers that want annotated frames; repeated calls for the same
+        frame draw once. Read-only frames (shared with other processes over
+        the frame bus) are drawn on a copy.
+        """
+        if self._overlay is None:
+            return frame if self._annotated is None else self._annotated
+        if not frame.flags.writeable:
+            frame = frame.copy()
+        with self.timer.stage("overlay"):
+            self.renderer.render(frame, *self._overlay)
+        self._overlay = None
+        self._annotated = frame
+        return frame
+
+    def publish(self, current_time):
+        # Publish status (skipped when nothing changed since the last heartbeat)
+        self.status_publisher.publish(self.status)
+        if current_time - self.last_heartbeat >= EVENT_HEARTBEAT:
+            self.event_log.log("heartbeat", ts=current_time, frames=self.frame_count,
+                               present=self.status["present_count"], missing=self.status["missing_count"],
+                               dropped_frames=getattr(self.capture, "dropped", 0))
+            self.last_heartbeat = current_time
+
+
+def run_async(detector, compiled_model, cap, on_frame=None, num_requests=NUM_INFER_REQUESTS):
+    """Capture/preprocess, inference and postprocessing all overlap; results come back in order"""
+    pipeline = AsyncInferencePipeline(compiled_model, detector.preprocess, num_requests=num_requests,
+                                      gate=detector.should_infer if detector.skips_frames() else None)
+    print(f"⚡ Async inference with {pipeline.num_requests} requests in flight")
+    pipeline.start(cap)
+    try:
+        for frame, output, grabbed in pipeline.results():
+            detector.process_frame(frame, output)
+            if on_frame is not None and on_frame(frame, grabbed) is False:
+                break
+    finally:
+        pipeline.stop()
+    if pipeline.error:
+        print(f"⚠️ Pipeline error: {pipeline.error}")
+
+def run_sync(detector, compiled_model, cap, on_frame=None, controller=None):
+    """One frame at a time, each stage timed separately
+
+    With a QualityController, compiled_model is ignored: the controller
+    picks the model (input size) and paces the loop to its frame rate cap.
+    """
+    timer = detector.timer
+    # One long-lived request per model so its input/output tensors are allocated once and reused
+    infer_requests = {}
+    while True:
+        if controller is not None:
+            controller.wait()
+            compiled_model = controller.compiled_model
+            detector.input_size = controller.input_size
+            detector.input_transform = controller.input_transform
+        infer_request = infer_requests.get(compiled_model)
+        if infer_request is None:
+            infer_request = infer_requests[compiled_model] = compiled_model.create_infer_request()
+        with timer.stage("capture"):
+            ret, frame = cap.read()
+        if not ret:
+            break
+        # When the camera grabbed it, if the capture knows; otherwise when we got it
+        grabbed = getattr(cap, "last_timestamp", None) or time.monotonic()
+
+        output = None
+        if detector.should_infer(frame):
+            input_tensor = detector.preprocess(frame)
+            with timer.stage("inference"):
+                # Copies straight into the request's preallocated input tensor
+                infer_request.infer({0: input_tensor})
+                output = infer_request.get_output_tensor(0).data
+        detector.process_frame(frame, output)
+        if controller is not None:
+            # Frames the motion gate skipped cost next to nothing; only inferred ones count toward the budget
+            controller.record(time.monotonic() - grabbed, inferred=output is not None)
+        if on_frame is not None and on_frame(frame, grabbed) is False:
+            break
+
+def main():
+    parser = argparse.ArgumentParser(description="Art Watch object movement detector")
+    parser.add_argument("--source", default=CAMERA_SOURCE,
+                        help="camera index, video file, stream URL or bus:<name> (shared camera, see frame_bus.py)")
+    parser.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL,
+                        help="run the detector every Nth frame, optical flow in between (1 = every frame)")
+    parser.add_argument("--tiles", action="store_true", default=TILED_INFERENCE,
+                        help="tiled inference for high-resolution cameras (see TILE_ZONES)")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE, help="grid tile side in frame pixels")
+    parser.add_argument("--precision", choices=["FP32", "INT8"], type=str.upper, default=MODEL_PRECISION,
+                        help="detector model precision (INT8 needs quantize.py first)")
+    parser.add_argument("--adaptive", action="store_true", default=ADAPTIVE_QUALITY,
+                        help="switch between %s input sizes and cap the frame rate to hold --latency-target"
+                             % "/".join(map(str, QUALITY_INPUT_SIZES)))
+    parser.add_argument("--latency-target", type=float, default=LATENCY_TARGET * 1000,
+                        help="glass-to-decision latency budget in ms for --adaptive")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="no preview window; frames are only annotated for the live view")
+    args = parser.parse_args()
+    headless = args.headless
+    if not headless and sys.platform.startswith("linux") and not (os.environ.get("DISPLAY") or
+                                                                  os.environ.get("WAYLAND_DISPLAY")):
+        print("🖥️ No display found — running headless")
+        headless = True
+
+    startup_time = time.time()
+    # Initialize pygame mixer for audio
+    pygame.mixer.init()
+
+    # Only rewrites status.json (atomically) when something changed, plus a heartbeat
+    status_publisher = StatusPublisher(STATUS_FILE, heartbeat=STATUS_HEARTBEAT,
+                                       shm_path=STATUS_SHM_PATH if USE_SHARED_MEMORY_STATUS else None)
+    status_publisher.publish(initial_status(), force=True)
+    # Persistent history of alerts, recoveries, ID reassignments and heartbeats (served at /api/events)
+    event_log = EventLog(EVENT_LOG_FILE)
+    event_log.log("detector_started", source=args.source)
+    # The alert sound is decoded once here; the frame loop only queues alerts
+    alert_sinks = [AudioSink(ALERT_SOUND), LogSink(ALERT_LOG_FILE), EventLogSink(event_log)]
+    if ALERT_WEBHOOK_URL:
+        alert_sinks.append(WebhookSink(ALERT_WEBHOOK_URL))
+    alerts = AlertDispatcher(alert_sinks)
+    # No-op unless web_server.py reports a viewer; the server does the JPEG encoding
+    live_view = None
+    if LIVE_VIEW:
+        try:
+            live_view = LiveFrameWriter()  # Size/rate/quality: see live_view.py
+        except OSError as e:
+            print(f"⚠️ Live view disabled: {e}")
+
+    model_dir = find_model(args.precision)
+    class_names = load_class_names(model_dir)
+
+    # With evidence on, every frame gets its own buffer so the recorder can keep it without a copy here
+    cap = open_capture(args.source, reuse_buffers=not EVIDENCE_CAPTURE)
+    if not cap.isOpened():
+        raise Exception("❌ Camera not found or cannot be opened!")
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    tile_batcher = None
+    if args.tiles:
+        tile_batcher = TileBatcher(plan_tiles(frame_width, frame_height, INPUT_SIZE, tile_size=args.tile_size,
+                                              zones=tuple(map(tuple, TILE_ZONES)) or None))
+        print(f"🧩 Tiled inference: {tile_batcher.batch_size} crops per frame")
+    adaptive = args.adaptive
+    if adaptive and tile_batcher is not None:
+        print("⚠️ Adaptive quality doesn't work with tiled inference — disabled")
+        adaptive = False
+    # Adaptive mode runs one frame at a time, where the latency hint is the faster one
+    compiled_model, input_transform = load_model(model_dir, frame_width, frame_height,
+                                                 performance_hint="LATENCY" if adaptive else None,
+                                                 batch=tile_batcher.batch_size if tile_batcher else 1)
+    controller = None
+    if adaptive:
+        # Everything compiled up front, so switching sizes mid-stream is just picking another model
+        levels = {INPUT_SIZE: (compiled_model, input_transform)}
+        for size in QUALITY_INPUT_SIZES:
+            if size not in levels:
+                precision = args.precision
+                if precision == "INT8" and not os.path.exists(os.path.join(int8_model_dir(size), "yolov8n.xml")):
+                    print(f"⚠️ No {size}x{size} INT8 model (python quantize.py --calibration <recordings> "
+                          f"--input-size {size}) — using FP32 at that size")
+                    precision = "FP32"
+                levels[size] = load_model(find_model(precision, size), frame_width, frame_height,
+                                          performance_hint="LATENCY", input_size=size)
+
+        def log_quality_change(input_size, max_fps, reason):
+            event_log.log("quality_changed", input_size=input_size, max_fps=max_fps, reason=reason)
+
+        controller = QualityController(levels, target_latency=args.latency_target / 1000.0,
+                                       on_change=log_quality_change)
+    print(f"⏱️ Model ready in {time.time() - startup_time:.1f}s")
+
+    evidence = None
+    if EVIDENCE_CAPTURE:
+        # Alert clips show up in web_server.py's /api/clips next to robberClipper.py's
+        evidence = EvidenceRecorder(event_log, min(cap.get(cv2.CAP_PROP_FPS) or 30.0, EVIDENCE_FPS),
+                                    frame_width, frame_height, library=ClipLibrary(CLIP_LIBRARY_FILE))
+
+    def on_alert(kind, object_id, message, timestamp=None, **details):
+        alerts.dispatch(kind, object_id, message, timestamp, **details)
+        if evidence is not None:
+            tracked = detector.tracked_bottles
+            bbox = tracked[object_id]['bbox'] if object_id in tracked else None
+            evidence.capture(kind, object_id, details.get("event", ""), bbox, timestamp)
+
+    motion_gate = MotionGate(refresh_interval=MOTION_REFRESH_INTERVAL) if MOTION_GATE else None
+    detector = Detector(class_names, frame_width, frame_height, status_publisher, event_log,
+                        input_transform=input_transform, capture=cap, motion_gate=motion_gate,
+                        keyframe_interval=args.keyframe_interval, tile_batcher=tile_batcher,
+                        on_alert=on_alert)
+
+    print("✅ Ready — Detection running!")
+    print("🌐 Run 'python web_server.py' in another terminal to start the web interface")
+
+    def show(frame, grabbed):
+        if evidence is not None:
+            # Before annotate() draws on it; the grab time keeps clip timing true to the camera.
+            # No copy: the capture (or the async pipeline) never writes to a frame it handed out
+            evidence.add(frame, grabbed, copy=False)
+        # Only annotate when someone will actually look at the frame
+        if live_view is not None and live_view.wants_frame():
+            live_view.publish(detector.annotate(frame))
+        if headless:
+            return True
+        cv2.imshow("Object Movement Detector", detector.annotate(frame))
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+    if headless:
+        print("🛑 Press Ctrl+C to stop")
+    try:
+        if controller is not None:
+            # The async queue adds its own latency, which is exactly what the controller is holding down
+            run_sync(detector, compiled_model, cap, on_frame=show, controller=controller)
+        elif ASYNC_INFERENCE:
+            run_async(detector, compiled_model, cap, on_frame=show)
+        else:
+            run_sync(detector, compiled_model, cap, on_frame=show)
+    except KeyboardInterrupt:
+        print("🛑 Stopping...")
+
+    if motion_gate is not None and motion_gate.inferred:
+        total = motion_gate.inferred + motion_gate.skipped
+        print(f"💤 Motion gate skipped inference on {motion_gate.skipped}/{total} frames")
+    if cap.dropped:
+        print(f"📉 Skipped {cap.dropped} stale camera frames to stay real-time")
+    cap.release()
+    alerts.close()
+    if evidence is not None:
+        evidence.close()
+        evidence.library.close()
+        if evidence.dropped:
+            print(f"⚠️ {evidence.dropped} evidence snapshots were dropped (workers backlogged)")
+    if alerts.suppressed or alerts.dropped:
+        print(f"🔕 {alerts.suppressed} repeated/rate-limited alerts logged without sound/webhook, "
+              f"{alerts.dropped} dropped")
+    if alerts.sink_dropped:
+        print(f"⚠️ {alerts.sink_dropped} alerts never reached the webhook (its queue was full)")
+    event_log.log("detector_stopped", frames=detector.frame_count)
+    event_log.close()
+    if event_log.dropped:
+        print(f"⚠️ {event_log.dropped} events were not logged (event log backlog full)")
+    if live_view is not None:
+        live_view.close()
+    if not headless:
+        cv2.destroyAllWindows()
+    pygame.mixer.quit()
+
+
+if __name__ == "__main__":
+    main()
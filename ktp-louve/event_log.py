@@ -0,0 +1,173 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+EVENT_LOG_FILE = "events.db"
+MAX_QUERY_LIMIT = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid TEXT NOT NULL UNIQUE,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    object_id INTEGER,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts, id);
+CREATE INDEX IF NOT EXISTS events_object_ts ON events (object_id, ts, id);
+"""
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    # WAL: readers (web_server.py) never block the writer and vice versa
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Commits only reach the WAL; fsync happens at checkpoints, which EventLog bounds in time
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class EventLog:
+    """Append-only security event store (SQLite, WAL mode).
+
+    log() only puts the event on a queue, so the frame loop never waits on
+    the disk. A writer thread commits whatever has queued up every
+    flush_interval seconds as one transaction, and checkpoints (fsyncs)
+    the WAL at most every sync_interval seconds. A crash loses at most
+    that much history. If the queue ever fills up, new events are counted
+    in `dropped` instead of blocking.
+    """
+
+    def __init__(self, path=EVENT_LOG_FILE, flush_interval=0.5, sync_interval=5.0, max_pending=10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.sync_interval = sync_interval
+        self.dropped = 0
+        conn = _connect(path)
+        conn.executescript(_SCHEMA)
+        conn.close()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stopping = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def log(self, kind, object_id=None, ts=None, **details):
+        """Record an event. Returns its uid, which other records can link to."""
+        uid = uuid.uuid4().hex
+        row = (uid, ts if ts is not None else time.time(), kind, object_id,
+               json.dumps(details, default=str) if details else None)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+        return uid
+
+    def _drain(self):
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        last_sync = time.monotonic()
+        while True:
+            stopping = self._stopping.wait(self.flush_interval)
+            rows = self._drain()
+            try:
+                if rows:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO events (uid, ts, kind, object_id, details) VALUES (?, ?, ?, ?, ?)", rows)
+                now = time.monotonic()
+                if stopping or (rows and now - last_sync >= self.sync_interval):
+                    conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                    last_sync = now
+            except sqlite3.Error as e:
+                print(f"⚠️ Event log error: {e}")
+            if stopping:
+                conn.close()
+                return
+
+    def close(self):
+        """Flush queued events and checkpoint"""
+        self._stopping.set()
+        self._writer.join()
+
+
+class EventLogReader:
+    """Time-range / per-object queries over the event store, newest first"""
+
+    def __init__(self, path=EVENT_LOG_FILE):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=rw", uri=True, timeout=5.0)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def encode_cursor(row):
+        return f"{row['ts']!r}:{row['id']}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        ts, row_id = cursor.rsplit(":", 1)
+        return float(ts), int(row_id)
+
+    def query(self, since=None, until=None, object_id=None, kind=None, limit=100, cursor=None):
+        """Events with since <= ts < until, newest first.
+
+        Returns (events, next_cursor). Pagination is keyset based: the
+        cursor is the (ts, id) of the last row returned, so every page is
+        an index range scan no matter how deep into the history it is.
+        """
+        limit = max(1, min(int(limit), MAX_QUERY_LIMIT))
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if object_id is not None:
+            clauses.append("object_id = ?")
+            params.append(object_id)
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if cursor:
+            clauses.append("(ts, id) < (?, ?)")
+            params.extend(self.decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        try:
+            rows = self._conn().execute(
+                f"SELECT id, uid, ts, kind, object_id, details FROM events {where} "
+                "ORDER BY ts DESC, id DESC LIMIT ?", params + [limit + 1]).fetchall()
+        except sqlite3.OperationalError:
+            # Nothing logged yet (no database file)
+            return [], None
+
+        next_cursor = self.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        events = []
+        for row in rows[:limit]:
+            event = {
+                "uid": row["uid"],
+                "ts": row["ts"],
+                "kind": row["kind"],
+                "object_id": row["object_id"],
+            }
+            if row["details"]:
+                event["details"] = json.loads(row["details"])
+            events.append(event)
+        return events, next_cursor
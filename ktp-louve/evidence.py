@@ -0,0 +1,159 @@
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+import cv2
+from clip_recorder import ClipRecorder
+from preroll import PREROLL_SECONDS, PREROLL_MAX_BYTES
+
+EVIDENCE_DIR = "evidence"  # Snapshots and alert clips go here
+EVIDENCE_WORKERS = 2  # Threads encoding and writing snapshots
+EVIDENCE_QUEUE_SIZE = 16  # Frames waiting for a snapshot worker (~6 MB each at 1080p); more are dropped
+EVIDENCE_POSTROLL = 5.0  # Seconds of video kept after the last alert of an incident
+EVIDENCE_FPS = 10.0  # Alert clips (and so the always-running pre-roll) keep at most this many frames per second
+SNAPSHOT_JPEG_QUALITY = 90
+CROP_MARGIN = 0.5  # Crops extend the object's box by this fraction of its size on each side
+
+EvidenceRequest = namedtuple("EvidenceRequest", ["kind", "object_id", "event", "bbox", "timestamp"])
+
+
+class EvidenceRecorder:
+    """Snapshots and a video clip for every alert, with all encoding and disk I/O off the frame loop.
+
+    The frame loop calls capture() when an alert is raised and add() with
+    every frame. The first frame added after an alert (the one that raised
+    it) is copied once and handed to a bounded pool of workers. They write
+    a full-frame JPEG and a crop around the object's box. The same alert
+    triggers a ClipRecorder, which cuts a clip from its pre-roll buffer
+    plus EVIDENCE_POSTROLL seconds after the alert.
+
+    Each saved file is recorded as an "evidence" event whose `event` is
+    the uid of the moved/missing event it documents, so the alert record
+    leads to its photos and clip. With a ClipLibrary, clips are also
+    indexed there (trigger = the alert kind) for /api/clips, after it has
+    made them browser-playable.
+    """
+
+    def __init__(self, event_log, fps, width, height, out_dir=EVIDENCE_DIR, workers=EVIDENCE_WORKERS,
+                 max_pending=EVIDENCE_QUEUE_SIZE, quality=SNAPSHOT_JPEG_QUALITY, preroll=PREROLL_SECONDS,
+                 postroll=EVIDENCE_POSTROLL, preroll_bytes=PREROLL_MAX_BYTES, clips=True, library=None):
+        self.event_log = event_log
+        self.library = library
+        self.out_dir = out_dir
+        self.quality = quality
+        self.snapshots = 0
+        self.dropped = 0
+        os.makedirs(out_dir, exist_ok=True)
+        self._requests = []  # Alerts waiting for their frame
+        self._pending_clips = []  # (trigger time, request) not yet linked to a saved clip
+        self._lock = threading.Lock()
+        self.recorder = None
+        if clips:
+            self.recorder = ClipRecorder(out_dir, fps, width, height, preroll=preroll, postroll=postroll,
+                                         preroll_bytes=preroll_bytes, prefix="alert", on_saved=self._clip_saved)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def capture(self, kind, object_id, event, bbox=None, timestamp=None):
+        """Collect evidence for an alert; `event` is the uid of the event log record it belongs to"""
+        request = EvidenceRequest(kind, object_id, event, bbox, time.time() if timestamp is None else timestamp)
+        self._requests.append(request)
+        if self.recorder is not None:
+            trigger = time.monotonic()
+            with self._lock:
+                self._pending_clips.append((trigger, request))
+            self.recorder.trigger(trigger)
+
+    def add(self, frame, timestamp=None, copy=True):
+        """Feed every frame (before anything is drawn on it); never blocks.
+        copy=False: the caller won't reuse the frame's buffer, so it is kept without a copy."""
+        if self.recorder is not None:
+            self.recorder.add(frame, timestamp, copy=copy)
+        if not self._requests:
+            return
+        requests, self._requests = self._requests, []
+        try:
+            # Copy: the capture buffer is reused before a worker gets to it
+            self._queue.put_nowait((frame.copy() if copy else frame, requests))
+        except queue.Full:
+            self.dropped += len(requests)
+
+    def _path(self, request, prefix):
+        stamp = datetime.fromtimestamp(request.timestamp).strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.out_dir, f"{prefix}_{stamp}_{request.event[:8]}.jpg")
+
+    def _write(self, path, image):
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        with open(path, 'wb') as f:
+            f.write(encoded.tobytes())
+        return path
+
+    def _crop(self, frame, bbox):
+        if bbox is None:
+            return None
+        x1, y1, x2, y2 = bbox
+        pad_x, pad_y = int((x2 - x1) * CROP_MARGIN), int((y2 - y1) * CROP_MARGIN)
+        height, width = frame.shape[:2]
+        x1, y1 = max(x1 - pad_x, 0), max(y1 - pad_y, 0)
+        x2, y2 = min(x2 + pad_x, width), min(y2 + pad_y, height)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return frame[y1:y2, x1:x2]
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, requests = item
+            snapshot = None  # Alerts raised on the same frame share one full-frame JPEG
+            for request in requests:
+                try:
+                    if snapshot is None:
+                        snapshot = self._write(self._path(request, "snapshot"), frame)
+                    crop = self._crop(frame, request.bbox)
+                    crop_path = None
+                    if crop is not None:
+                        crop_path = self._write(self._path(request, f"{request.kind}_{request.object_id}"), crop)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Evidence snapshot failed: {e}")
+                    continue
+                self.snapshots += 1
+                print(f"📸 Evidence for {request.kind} alert (object {request.object_id}): {crop_path or snapshot}")
+                self.event_log.log("evidence", request.object_id, request.timestamp, event=request.event,
+                                   alert=request.kind, snapshot=snapshot, crop=crop_path)
+
+    def _clip_saved(self, path, start, end):
+        # Runs on the recorder's writer thread; links the clip to every alert it covers
+        with self._lock:
+            covered = [request for trigger, request in self._pending_clips if start <= trigger <= end]
+            self._pending_clips = [(trigger, request) for trigger, request in self._pending_clips
+                                   if not start <= trigger <= end]
+        if self.library is None:
+            self._log_clip(covered, path)
+            return
+        # The library may transcode the clip to MP4 first; log the file that ends up on disk
+        first = covered[0] if covered else None
+        self.library.add_later(path, time.time() - (time.monotonic() - start), first.kind if first else "alert",
+                               event=first.event if first else None,
+                               on_added=lambda clip_id, final_path: self._log_clip(covered, final_path))
+
+    def _log_clip(self, covered, path):
+        for request in covered:
+            self.event_log.log("evidence", request.object_id, request.timestamp, event=request.event,
+                               alert=request.kind, clip=path)
+
+    def close(self, timeout=10.0):
+        """Finish queued snapshots and the open clip"""
+        if self.recorder is not None:
+            self.recorder.close(timeout=timeout)
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=timeout)
@@ -0,0 +1,297 @@
+import argparse
+import struct
+import time
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+from capture import CapturedFrame, parse_source, is_live_source
+
+FRAME_BUS_NAME = "artwatch_camera"  # Consumers open it as source "bus:artwatch_camera"
+FRAME_BUS_SLOTS = 8  # Frames kept; a read_frame() (zero-copy) frame stays valid for about this many frame times
+BUS_STALE_TIMEOUT = 10.0  # Consumers give up if the capture service published nothing for this long
+
+_MAGIC = b"AWFB"
+_STATE_RUNNING = 1
+_STATE_CLOSED = 2
+# magic, state, slots, width, height, channels, fps, latest frame seq, last publish (monotonic)
+_BUS_HEADER = struct.Struct("<4sIIIIIdQd")
+# Per slot: lock seq (odd while being written), frame seq, capture time (monotonic), capture time (wall clock)
+_SLOT_HEADER = struct.Struct("<QQdd")
+_SLOT_HEADER_OFFSET = 64
+_SLOT_HEADER_SIZE = 32
+
+
+def _layout(slots, width, height, channels):
+    frame_bytes = width * height * channels
+    pixels_offset = _SLOT_HEADER_OFFSET + slots * _SLOT_HEADER_SIZE
+    pixels_offset += -pixels_offset % 64  # Cache-line aligned frames
+    return frame_bytes, pixels_offset, pixels_offset + slots * frame_bytes
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 every attach registers with the resource tracker, which would
+        # delete the segment when this consumer exits
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _is_live(shm, stale_timeout=BUS_STALE_TIMEOUT):
+    """True if a frame bus segment still has a capture service publishing into it"""
+    if shm.size < _BUS_HEADER.size:
+        return False
+    magic, state, _, _, _, _, _, _, last_publish = _BUS_HEADER.unpack_from(shm.buf, 0)
+    # Same test consumers use to give up on the service: not closed, and published recently
+    return magic == _MAGIC and state == _STATE_RUNNING and time.monotonic() - last_publish <= stale_timeout
+
+
+class FrameBusWriter:
+    """Capture-service side: publishes frames into a ring of slots in shared memory.
+
+    Each slot has its own sequence lock, and the header names the newest
+    frame. The writer never waits for anyone: a slow consumer only misses
+    frames (it always jumps to the newest one) and can't hold back the
+    capture service or the other consumers.
+
+    begin()/commit() let the camera decode straight into the next slot,
+    so publishing costs no copy at all.
+    """
+
+    def __init__(self, width, height, fps=30.0, name=FRAME_BUS_NAME, slots=FRAME_BUS_SLOTS, channels=3):
+        self.name = name
+        self.slots = slots
+        self.shape = (height, width, channels) if channels > 1 else (height, width)
+        frame_bytes, pixels_offset, size = _layout(slots, width, height, channels)
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            existing = _attach(name)
+            try:
+                if _is_live(existing):
+                    raise FileExistsError(f"Frame bus '{name}' is in use by a running capture service")
+                # Left over from a capture service that didn't shut down cleanly
+                existing.unlink()
+            finally:
+                existing.close()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        buf = self._shm.buf
+        self._frames = [np.ndarray(self.shape, dtype=np.uint8, buffer=buf, offset=pixels_offset + i * frame_bytes)
+                        for i in range(slots)]
+        self._seq = 0
+        self._slot = None
+        self._header = (slots, width, height, channels, float(fps))
+        _BUS_HEADER.pack_into(buf, 0, _MAGIC, _STATE_RUNNING, *self._header, 0, time.monotonic())
+
+    def begin(self):
+        """Lock the next slot for writing and return it as an ndarray to fill"""
+        slot = self._seq % self.slots
+        offset = _SLOT_HEADER_OFFSET + slot * _SLOT_HEADER_SIZE
+        lock = _SLOT_HEADER.unpack_from(self._shm.buf, offset)[0]
+        # Odd: readers that catch this slot mid-write retry or skip it
+        _SLOT_HEADER.pack_into(self._shm.buf, offset, lock + 1, 0, 0.0, 0.0)
+        self._slot = (slot, lock + 1)
+        return self._frames[slot]
+
+    def commit(self, timestamp=None, wall_time=None):
+        """Publish the slot filled since begin()"""
+        slot, lock = self._slot
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        self._seq += 1
+        buf = self._shm.buf
+        _SLOT_HEADER.pack_into(buf, _SLOT_HEADER_OFFSET + slot * _SLOT_HEADER_SIZE, lock + 1, self._seq,
+                               timestamp, time.time() if wall_time is None else wall_time)
+        _BUS_HEADER.pack_into(buf, 0, _MAGIC, _STATE_RUNNING, *self._header, self._seq, timestamp)
+        self._slot = None
+
+    def abort(self):
+        """Unlock the slot from begin() without publishing it (e.g. the camera read failed)"""
+        slot, lock = self._slot
+        _SLOT_HEADER.pack_into(self._shm.buf, _SLOT_HEADER_OFFSET + slot * _SLOT_HEADER_SIZE, lock + 1, 0, 0.0, 0.0)
+        self._slot = None
+
+    def publish(self, frame, timestamp=None):
+        """Copy a frame in and publish it (when it couldn't be decoded into begin()'s slot directly)"""
+        np.copyto(self.begin(), frame)
+        self.commit(timestamp)
+
+    def close(self):
+        _BUS_HEADER.pack_into(self._shm.buf, 0, _MAGIC, _STATE_CLOSED, *self._header, self._seq, time.monotonic())
+        self._frames = []
+        self._shm.close()
+        self._shm.unlink()
+
+
+class FrameBusCapture:
+    """Consumer side, shaped like ThreadedCapture (read_frame/read/get/isOpened/release).
+
+    read() returns a private copy, like cv2.VideoCapture, so the caller
+    can keep the frame through inference and recording however long that
+    takes. read_frame() hands out zero-copy read-only views into the
+    shared ring instead. Such a frame stays intact only until the capture
+    service comes back around to its slot, about `slots - 1` frame
+    intervals later, so those callers must check still_valid() before
+    trusting what they computed from it.
+    """
+
+    def __init__(self, name=FRAME_BUS_NAME, stale_timeout=BUS_STALE_TIMEOUT):
+        name = name or FRAME_BUS_NAME
+        self.name = name
+        self.stale_timeout = stale_timeout
+        self.dropped = 0
+        self.last_timestamp = None
+        self._last_seq = 0
+        try:
+            self._shm = _attach(name)
+        except FileNotFoundError:
+            self._shm = None
+            return
+        magic, _, self.slots, width, height, channels, self.fps, _, _ = _BUS_HEADER.unpack_from(self._shm.buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{name} is not a frame bus segment")
+        self.width, self.height = width, height
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        frame_bytes, pixels_offset, _ = _layout(self.slots, width, height, channels)
+        self._frames = [np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf, offset=pixels_offset + i * frame_bytes)
+                        for i in range(self.slots)]
+        for frame in self._frames:
+            # Other processes see the same pixels: draw on a copy (Detector.annotate does)
+            frame.flags.writeable = False
+        # Start from the newest frame, not from whatever the ring still holds
+        self._last_seq = max(_BUS_HEADER.unpack_from(self._shm.buf, 0)[7] - 1, 0)
+
+    def isOpened(self):
+        return self._shm is not None
+
+    def get(self, prop):
+        if self._shm is None:
+            return 0
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0
+
+    def _try_read(self):
+        buf = self._shm.buf
+        latest = _BUS_HEADER.unpack_from(buf, 0)[7]
+        if latest <= self._last_seq:
+            return None
+        slot = (latest - 1) % self.slots
+        offset = _SLOT_HEADER_OFFSET + slot * _SLOT_HEADER_SIZE
+        lock, seq, timestamp, _ = _SLOT_HEADER.unpack_from(buf, offset)
+        if lock % 2 or seq != latest:
+            return None  # Overwritten in the meantime; the next poll gets the newer frame
+        self.dropped += latest - self._last_seq - 1 if self._last_seq else 0
+        self._last_seq = latest
+        self.last_timestamp = timestamp
+        return CapturedFrame(self._frames[slot], timestamp, seq, self.dropped)
+
+    def still_valid(self, captured):
+        """True if the capture service hasn't started overwriting `captured`'s slot yet"""
+        slot = (captured.seq - 1) % self.slots
+        lock, seq, _, _ = _SLOT_HEADER.unpack_from(self._shm.buf, _SLOT_HEADER_OFFSET + slot * _SLOT_HEADER_SIZE)
+        return seq == captured.seq and not lock % 2
+
+    def read_frame(self, timeout=None):
+        """The newest CapturedFrame not seen yet, or None once the capture service is gone"""
+        if self._shm is None:
+            return None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            captured = self._try_read()
+            if captured is not None:
+                return captured
+            _, state, _, _, _, _, fps, _, last_publish = _BUS_HEADER.unpack_from(self._shm.buf, 0)
+            now = time.monotonic()
+            if state == _STATE_CLOSED or now - last_publish > self.stale_timeout:
+                return None
+            if deadline is not None and now >= deadline:
+                return None
+            # A fraction of a frame interval keeps the added latency small without spinning
+            time.sleep(min(0.25 / fps if fps > 0 else 0.005, 0.005))
+
+    def read(self):
+        """cv2.VideoCapture-compatible read: (ret, frame), with the frame copied out of the ring"""
+        while True:
+            captured = self.read_frame()
+            if captured is None:
+                return False, None
+            frame = captured.frame.copy()
+            if self.still_valid(captured):
+                return True, frame
+            # Overwritten while we copied it: take the newest frame instead
+
+    def release(self):
+        if self._shm is not None:
+            self._frames = []
+            self._shm.close()
+            self._shm = None
+
+
+def run_capture_service(source, name=FRAME_BUS_NAME, slots=FRAME_BUS_SLOTS):
+    """Own the camera and publish every frame to the bus until stopped"""
+    cap = cv2.VideoCapture(parse_source(source))
+    if not cap.isOpened():
+        raise Exception("❌ Camera not found or cannot be opened!")
+    live = is_live_source(source)
+    if live:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    ret, first = cap.read()
+    if not ret:
+        raise Exception("❌ Camera returned no frames")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    height, width = first.shape[:2]
+    try:
+        writer = FrameBusWriter(width, height, fps, name=name, slots=slots)
+    except FileExistsError:
+        cap.release()
+        raise
+    writer.publish(first)
+    print(f"📡 Publishing {width}x{height} @ {fps:.0f} fps on frame bus '{name}' (source: bus:{name})")
+    frames = 1
+    next_due = time.monotonic()
+    try:
+        while True:
+            target = writer.begin()
+            # Decodes straight into the shared slot when the shape matches
+            ret, frame = cap.read(target)
+            timestamp = time.monotonic()
+            if not ret:
+                writer.abort()
+                break
+            if frame is not target:
+                np.copyto(target, frame)
+            writer.commit(timestamp)
+            frames += 1
+            if not live:
+                # Files play at their own frame rate, like a camera would deliver them
+                next_due += 1.0 / fps
+                time.sleep(max(0.0, next_due - time.monotonic()))
+    except KeyboardInterrupt:
+        print("🛑 Stopping...")
+    finally:
+        writer.close()
+        cap.release()
+    print(f"📡 Published {frames} frames")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Own the camera and share its frames with detection.py, robberClipper.py, ... "
+                    "through shared memory",
+        epilog="example: python frame_bus.py --source 0 & python detection.py --source bus:artwatch_camera")
+    parser.add_argument("--source", default="0", help="camera index, video file or stream URL")
+    parser.add_argument("--name", default=FRAME_BUS_NAME, help="shared memory name consumers attach to")
+    parser.add_argument("--slots", type=int, default=FRAME_BUS_SLOTS)
+    args = parser.parse_args(argv)
+    run_capture_service(args.source, args.name, args.slots)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import os
+import struct
+import tempfile
+import threading
+import time
+import cv2
+import numpy as np
+from status_publisher import open_segment
+
+LIVE_VIEW_PATH = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                              "artwatch_live_view")
+LIVE_VIEW_WIDTH = 640  # Width frames are scaled to before they are handed to the web server
+LIVE_VIEW_FPS = 10  # Max rate frames are handed over / encoded
+LIVE_VIEW_QUALITY = 70  # JPEG quality
+VIEWER_TIMEOUT = 2.0  # Detector stops handing over frames this long after the last viewer left
+
+# Detector side: seq (odd while writing), frame id, width, height, capture time
+_FRAME_HEADER = struct.Struct("<QQIId")
+# Server side: wall-clock time until which someone is watching
+_VIEWER_HEADER = struct.Struct("<d")
+_VIEWER_OFFSET = 64
+_PIXELS_OFFSET = 128
+
+
+def _segment_size(width):
+    # Room for frames up to 1:2 (portrait) at the configured width
+    return _PIXELS_OFFSET + width * width * 2 * 3
+
+
+class LiveFrameWriter:
+    """Detector side of the live view: a low-copy handoff of annotated frames.
+
+    publish() resizes the frame straight into a shared-memory buffer, so
+    there is one scaled copy and no encoding on the detection thread. It
+    does nothing unless the web server reports a viewer, and it is rate
+    limited to `fps`.
+    """
+
+    def __init__(self, path=LIVE_VIEW_PATH, width=LIVE_VIEW_WIDTH, fps=LIVE_VIEW_FPS):
+        self.width = width
+        self.interval = 1.0 / fps
+        self._shm = open_segment(path, _segment_size(width), writable=True)
+        self._frame_id = 0
+        self._last_publish = 0.0
+
+    def has_viewers(self):
+        return _VIEWER_HEADER.unpack_from(self._shm, _VIEWER_OFFSET)[0] > time.time()
+
+    def wants_frame(self):
+        """True if publish() would take a frame now; lets the caller skip annotating it otherwise"""
+        return time.monotonic() - self._last_publish >= self.interval and self.has_viewers()
+
+    def publish(self, frame, timestamp=None):
+        """Hand `frame` to the web server if someone is watching. Returns True if it did."""
+        now = time.monotonic()
+        if now - self._last_publish < self.interval or not self.has_viewers():
+            return False
+        self._last_publish = now
+
+        height, width = frame.shape[:2]
+        out_width = min(self.width, width)
+        out_height = int(round(height * out_width / width))
+        if out_height > 2 * self.width:
+            out_height = 2 * self.width
+            out_width = int(round(width * out_height / height))
+
+        seq = _FRAME_HEADER.unpack_from(self._shm, 0)[0]
+        # Odd sequence number marks the frame as being written
+        _FRAME_HEADER.pack_into(self._shm, 0, seq + 1, self._frame_id, out_width, out_height, 0.0)
+        target = np.ndarray((out_height, out_width, 3), dtype=np.uint8, buffer=self._shm, offset=_PIXELS_OFFSET)
+        if (out_width, out_height) == (width, height):
+            np.copyto(target, frame)
+        else:
+            cv2.resize(frame, (out_width, out_height), dst=target, interpolation=cv2.INTER_AREA)
+        self._frame_id += 1
+        _FRAME_HEADER.pack_into(self._shm, 0, seq + 2, self._frame_id, out_width, out_height,
+                                timestamp if timestamp is not None else time.time())
+        return True
+
+    def close(self):
+        self._shm.close()
+
+
+class LiveFrameReader:
+    """Web server side of the live view segment"""
+
+    def __init__(self, path=LIVE_VIEW_PATH, width=LIVE_VIEW_WIDTH):
+        self._shm = open_segment(path, _segment_size(width), writable=True)
+
+    def mark_viewers(self, duration=VIEWER_TIMEOUT):
+        """Tell the detector someone is watching for the next `duration` seconds"""
+        _VIEWER_HEADER.pack_into(self._shm, _VIEWER_OFFSET, time.time() + duration)
+
+    def read(self, last_frame_id=None):
+        """Copy of the newest frame as (frame_id, frame), or (last_frame_id, None) if nothing new"""
+        for _ in range(10):
+            seq, frame_id, width, height, _ = _FRAME_HEADER.unpack_from(self._shm, 0)
+            if seq == 0 or frame_id == last_frame_id:
+                return last_frame_id, None
+            if seq % 2:
+                time.sleep(0.001)
+                continue
+            frame = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self._shm,
+                               offset=_PIXELS_OFFSET).copy()
+            if _FRAME_HEADER.unpack_from(self._shm, 0)[0] == seq:
+                return frame_id, frame
+        return last_frame_id, None
+
+
+class MjpegBroadcaster:
+    """Encodes each live frame to JPEG once and shares the bytes with every client.
+
+    The encoder thread only runs while at least one client is connected;
+    with nobody watching it stops refreshing the viewer mark, and the
+    detector stops handing frames over altogether. A client only ever
+    gets frames encoded after it connected, never a leftover from before.
+    """
+
+    def __init__(self, reader, fps=LIVE_VIEW_FPS, quality=LIVE_VIEW_QUALITY):
+        self.reader = reader
+        self.interval = 1.0 / fps
+        self.quality = quality
+        self._cond = threading.Condition()
+        self._clients = 0
+        self._jpeg = None
+        self._jpeg_id = 0
+        self._encoder = None
+
+    def _encode_loop(self):
+        frame_id = None
+        while True:
+            with self._cond:
+                if self._clients == 0:
+                    self._encoder = None
+                    self._jpeg = None  # Old by the time anyone connects again
+                    return
+            self.reader.mark_viewers()
+            new_id, frame = self.reader.read(frame_id)
+            if frame is not None:
+                frame_id = new_id
+                ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if ok:
+                    part = (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n"
+                            % len(jpeg)) + jpeg.tobytes() + b"\r\n"
+                    with self._cond:
+                        self._jpeg = part
+                        self._jpeg_id += 1
+                        self._cond.notify_all()
+            time.sleep(self.interval)
+
+    def stream(self):
+        """multipart/x-mixed-replace generator for one client"""
+        with self._cond:
+            self._clients += 1
+            if self._encoder is None:
+                self._encoder = threading.Thread(target=self._encode_loop, daemon=True)
+                self._encoder.start()
+            # Whatever is cached may be arbitrarily old (detector stalled); wait for the next encode
+            sent_id = self._jpeg_id
+        try:
+            streaming = False
+            while True:
+                with self._cond:
+                    fresh = self._cond.wait_for(lambda: self._jpeg_id != sent_id, timeout=5.0)
+                    part, sent_id = self._jpeg, self._jpeg_id
+                # Repeating the current frame every 5 s lets a dropped connection be noticed
+                if part is not None and (fresh or streaming):
+                    streaming = True
+                    yield part
+        finally:
+            with self._cond:
+                self._clients -= 1
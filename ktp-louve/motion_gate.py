@@ -0,0 +1,97 @@
+import time
+import cv2
+import numpy as np
+
+MOTION_SCALE_WIDTH = 160  # Frames are compared at this width (grayscale)
+MOTION_PIXEL_THRESHOLD = 25  # Gray-level difference that counts as a changed pixel
+MOTION_MIN_CHANGED = 0.002  # Fraction of changed pixels (whole frame) that counts as motion
+MOTION_REGION_CHANGED = 0.02  # Fraction of changed pixels inside a tracked object's box that counts as motion
+MOTION_LEARNING_RATE = 0.05  # How fast the background model absorbs slow changes (lighting)
+
+
+class MotionGate:
+    """Cheap check for whether a frame needs the full detector.
+
+    Each frame is shrunk to a small blurred grayscale image and compared
+    against a running-average background. The detector runs when enough
+    pixels changed, either across the whole frame or inside the box of a
+    tracked object (see set_regions). It also runs at least every
+    `refresh_interval` seconds no matter what. That interval bounds how
+    late a change the gate missed can be noticed, so it should stay well
+    below the missing-object threshold.
+    """
+
+    def __init__(self, refresh_interval=1.0, scale_width=MOTION_SCALE_WIDTH, pixel_threshold=MOTION_PIXEL_THRESHOLD,
+                 min_changed=MOTION_MIN_CHANGED, region_changed=MOTION_REGION_CHANGED,
+                 learning_rate=MOTION_LEARNING_RATE):
+        self.refresh_interval = refresh_interval
+        self.scale_width = scale_width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.region_changed = region_changed
+        self.learning_rate = learning_rate
+        self.inferred = 0
+        self.skipped = 0
+        self._regions = np.empty((0, 4), dtype=np.int32)
+        self._background = None
+        self._last_infer = 0.0
+        self._scale = 1.0
+
+    def _allocate(self, frame):
+        height, width = frame.shape[:2]
+        self._scale = self.scale_width / width
+        small_size = (self.scale_width, max(1, int(round(height * self._scale))))
+        self._small = np.empty((small_size[1], small_size[0], 3), dtype=np.uint8)
+        self._gray = np.empty(small_size[::-1], dtype=np.uint8)
+        self._diff = np.empty_like(self._gray)
+        self._background_u8 = np.empty_like(self._gray)
+        self._frame_shape = frame.shape
+
+    def set_regions(self, boxes):
+        """Full-frame (x1, y1, x2, y2) boxes of tracked objects to watch more closely"""
+        self._regions = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+    def check(self, frame, now=None):
+        """True if the full detector should run on this frame"""
+        now = time.monotonic() if now is None else now
+        if self._background is None or frame.shape != self._frame_shape:
+            self._allocate(frame)
+        cv2.resize(frame, (self._small.shape[1], self._small.shape[0]), dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.GaussianBlur(self._gray, (5, 5), 0, dst=self._gray)
+
+        if self._background is None:
+            self._background = self._gray.astype(np.float32)
+            motion = True
+        else:
+            cv2.convertScaleAbs(self._background, dst=self._background_u8)
+            cv2.absdiff(self._gray, self._background_u8, dst=self._diff)
+            changed = self._diff > self.pixel_threshold
+            motion = changed.mean() > self.min_changed or self._region_motion(changed)
+            cv2.accumulateWeighted(self._gray, self._background, self.learning_rate)
+
+        if motion or now - self._last_infer >= self.refresh_interval:
+            self._last_infer = now
+            self.inferred += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def _region_motion(self, changed):
+        regions = self._regions
+        if not len(regions):
+            return False
+        height, width = changed.shape
+        boxes = np.round(regions * self._scale).astype(np.int32)
+        x1 = np.clip(boxes[:, 0], 0, width)
+        y1 = np.clip(boxes[:, 1], 0, height)
+        x2 = np.clip(boxes[:, 2] + 1, 0, width)
+        y2 = np.clip(boxes[:, 3] + 1, 0, height)
+        area = (x2 - x1) * (y2 - y1)
+        valid = area > 0
+        if not valid.any():
+            return False
+        # Changed-pixel count per box in O(1) each from the integral image
+        integral = cv2.integral(changed.view(np.uint8))
+        counts = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+        return bool((counts[valid] > self.region_changed * area[valid]).any())
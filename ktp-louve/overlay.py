@@ -0,0 +1,67 @@
+import cv2
+
+
+class OverlayRenderer:
+    """Draws detection boxes, bottle IDs and the tracking summary onto a frame.
+
+    Nothing here runs as part of detection; the Detector only calls it
+    when some consumer (the local window, the live view, a snapshot)
+    asks for an annotated frame.
+    """
+
+    def __init__(self, tracker, missing_time):
+        self.tracker = tracker
+        self.missing_time = missing_time
+
+    def render(self, frame, other_objects, current_time):
+        # Detection boxes for non-bottle objects
+        for class_name, conf, x1, y1, x2, y2 in other_objects:
+            color = (255, 0, 0)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(frame, f"{class_name} {conf:.2f}", (x1, y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+        # Display bottle IDs and bounding boxes on frame
+        tracked_bottles = self.tracker
+        for bottle_id, bottle_data in tracked_bottles.items():
+            last_seen = bottle_data.get('last_seen_time', current_time)
+            time_missing = current_time - last_seen
+
+            if 'bbox' in bottle_data and time_missing <= self.missing_time:
+                x1, y1, x2, y2 = bottle_data['bbox']
+                # Determine color based on movement status
+                if bottle_data.get('movement_alerted', False):
+                    color = (0, 0, 255)  # Red for moved bottles
+                    label = f"Bottle #{bottle_id} MOVED!"
+                else:
+                    color = (0, 255, 0)  # Green for stable bottles
+                    label = f"Bottle #{bottle_id}"
+
+                # Draw bounding box
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
+                # Draw label with background for better visibility
+                (text_width, text_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+                cv2.rectangle(frame, (x1, y2 + 5), (x1 + text_width + 10, y2 + text_height + 25), (0, 0, 0), -1)
+                cv2.putText(frame, label, (x1 + 5, y2 + text_height + 15),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+            elif time_missing > self.missing_time and 'position' in bottle_data:
+                # Bottle missing - show last known position
+                cx, cy = bottle_data['position']
+                if not bottle_data.get('missing_alerted', False):
+                    # Still within threshold or just crossed it
+                    cv2.circle(frame, (int(cx), int(cy)), 25, (0, 165, 255), 3)  # Orange for missing
+                    cv2.putText(frame, f"Bottle #{bottle_id}?", (int(cx) - 50, int(cy) - 35),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 165, 255), 2)
+                else:
+                    # Already alerted - show as missing
+                    cv2.circle(frame, (int(cx), int(cy)), 30, (0, 0, 255), 3)  # Red for confirmed missing
+                    cv2.putText(frame, f"Bottle #{bottle_id} MISSING!", (int(cx) - 70, int(cy) - 40),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+        # Display count on frame
+        present_count = int(tracked_bottles.present_mask(current_time).sum())
+        missing_count = int(tracked_bottles.missing_mask(current_time).sum())
+        max_display = tracked_bottles.max_seen if tracked_bottles.max_seen > 0 else "?"
+        cv2.putText(frame, f"Tracking: {present_count} present, {missing_count} missing (Max: {max_display})", (10, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        return frame
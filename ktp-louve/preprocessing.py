@@ -0,0 +1,42 @@
+from openvino.preprocess import PrePostProcessor, ColorFormat, ResizeAlgorithm, PaddingMode
+from openvino.runtime import Layout, Type
+from yolo_decoder import letterbox_geometry
+
+LETTERBOX_PAD_VALUE = 114.0  # Same gray Ultralytics pads with
+
+
+def embed_preprocessing(ov_model, frame_width, frame_height, input_size=640, letterbox=False, batch=1):
+    """Bake resize, BGR->RGB, /255 and NHWC->NCHW into the model graph.
+
+    The returned model takes raw uint8 BGR camera frames shaped
+    (1, frame_height, frame_width, 3), so the host only has to copy the frame
+    into the request's input tensor. With `letterbox` the frame keeps its aspect
+    ratio and is padded to input_size; decode with
+    yolo_decoder.letterbox_transform to map boxes back. `batch` > 1 (for
+    tiled inference) expects a model already reshaped to that batch size.
+
+    Note that PrePostProcessor edits `ov_model` in place.
+    """
+    ppp = PrePostProcessor(ov_model)
+    model_input = ppp.input()
+    model_input.tensor() \
+        .set_element_type(Type.u8) \
+        .set_layout(Layout("NHWC")) \
+        .set_color_format(ColorFormat.BGR) \
+        .set_shape([batch, frame_height, frame_width, 3])
+    model_input.model().set_layout(Layout("NCHW"))
+
+    steps = model_input.preprocess()
+    steps.convert_element_type(Type.f32)
+    steps.convert_color(ColorFormat.RGB)
+    # Work in the model's NCHW layout so the resize/pad dims below are plain H/W
+    steps.convert_layout(Layout("NCHW"))
+    if letterbox:
+        new_width, new_height, (left, top, right, bottom) = letterbox_geometry(
+            frame_width, frame_height, input_size)
+        steps.resize(ResizeAlgorithm.RESIZE_LINEAR, new_height, new_width)
+        steps.pad([0, 0, top, left], [0, 0, bottom, right], LETTERBOX_PAD_VALUE, PaddingMode.CONSTANT)
+    else:
+        steps.resize(ResizeAlgorithm.RESIZE_LINEAR)
+    steps.scale(255.0)
+    return ppp.build()
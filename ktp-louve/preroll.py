@@ -0,0 +1,165 @@
+import struct
+import time
+from collections import deque
+import cv2
+
+PREROLL_SECONDS = 10.0  # How much video before a trigger is kept
+PREROLL_MAX_BYTES = 64 * 1024 * 1024  # Hard memory cap; the oldest frames go first when it's reached
+PREROLL_JPEG_QUALITY = 80  # ~150 KB per 1080p frame, so 10 s at 30 fps fits in about 45 MB
+
+_AVIF_HASINDEX = 0x10
+_AVIIF_KEYFRAME = 0x10
+
+
+class CompressedFrameRing:
+    """Pre-roll of the last `duration` seconds as JPEGs in one preallocated byte ring.
+
+    Frames are encoded once on append and copied into a bytearray of
+    `max_bytes`, allocated up front. A raw 1080p frame is about 6 MB; as a
+    JPEG it is around 150 KB, so a long pre-roll fits on a small device.
+    Frames older than `duration`, or overwritten once the ring is full,
+    are forgotten. frames() hands the JPEGs back as they are, so they can
+    be written straight into an MJPEG clip (MjpegAviWriter) without being
+    decoded again.
+    """
+
+    def __init__(self, duration=PREROLL_SECONDS, max_bytes=PREROLL_MAX_BYTES, quality=PREROLL_JPEG_QUALITY):
+        self.duration = duration
+        self.quality = quality
+        self._ring = bytearray(max_bytes)
+        self._view = memoryview(self._ring)
+        self._entries = deque()  # (timestamp, offset, length), oldest first
+        self._head = 0  # Where the next frame goes
+        self.dropped = 0  # Frames that didn't fit in the whole ring
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def bytes_used(self):
+        return sum(length for _, _, length in self._entries)
+
+    @property
+    def span(self):
+        """Seconds between the oldest and newest frame held"""
+        return self._entries[-1][0] - self._entries[0][0] if self._entries else 0.0
+
+    def append(self, frame, timestamp=None):
+        """JPEG-encode a BGR frame into the ring"""
+        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if ok:
+            self.append_jpeg(encoded, timestamp)
+
+    def append_jpeg(self, data, timestamp=None):
+        """Store already-encoded JPEG bytes (anything supporting the buffer protocol)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        data = memoryview(data).cast("B")
+        size = len(data)
+        capacity = len(self._ring)
+        if size > capacity:
+            self.dropped += 1
+            return
+        entries = self._entries
+        start = self._head
+        if start + size > capacity:
+            # Doesn't fit before the end: wrap. Whatever is left past the old head is the oldest lap.
+            while entries and entries[0][1] >= start:
+                entries.popleft()
+            start = 0
+        end = start + size
+        while entries and entries[0][1] < end and entries[0][1] + entries[0][2] > start:
+            entries.popleft()
+        self._view[start:end] = data
+        entries.append((timestamp, start, size))
+        self._head = end
+        while entries and entries[0][0] < timestamp - self.duration:
+            entries.popleft()
+
+    def frames(self, since=None):
+        """(timestamp, jpeg bytes) pairs, oldest first; copies, so the ring can keep filling"""
+        view = self._view
+        return [(timestamp, bytes(view[offset:offset + length]))
+                for timestamp, offset, length in self._entries if since is None or timestamp >= since]
+
+    def clear(self):
+        self._entries.clear()
+        self._head = 0
+
+
+class MjpegAviWriter:
+    """Minimal AVI (Motion JPEG) writer that takes JPEG bytes as they are.
+
+    cv2.VideoWriter only accepts decoded frames, so dumping a compressed
+    pre-roll through it means decoding and re-encoding every frame. Here
+    each JPEG becomes one video chunk. Any player (and cv2.VideoCapture)
+    reads the result.
+    """
+
+    def __init__(self, path, fps, width, height, quality=PREROLL_JPEG_QUALITY):
+        self.path = path
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.frame_count = 0
+        self._index = []  # (offset from 'movi', size)
+        self._max_chunk = 0
+        self._file = open(path, 'wb')
+        self._write_headers()
+
+    def _write_headers(self):
+        f = self._file
+        scale, rate = 1000, int(round(self.fps * 1000))
+        avih = struct.pack("<IIIIIIIIII16x", int(round(1e6 / self.fps)), 0, 0, _AVIF_HASINDEX,
+                           self.frame_count, 0, 1, self._max_chunk, self.width, self.height)
+        strh = struct.pack("<4s4sIHHIIIIIIIIhhhh", b"vids", b"MJPG", 0, 0, 0, 0, scale, rate, 0,
+                           self.frame_count, self._max_chunk, 0xFFFFFFFF, 0, 0, 0, self.width, self.height)
+        strf = struct.pack("<IiiHH4sIiiII", 40, self.width, self.height, 1, 24, b"MJPG",
+                           self.width * self.height * 3, 0, 0, 0, 0)
+        strl = b"strl" + _chunk(b"strh", strh) + _chunk(b"strf", strf)
+        hdrl = b"hdrl" + _chunk(b"avih", avih) + _chunk(b"LIST", strl)
+        f.write(b"RIFF\0\0\0\0AVI ")
+        f.write(_chunk(b"LIST", hdrl))
+        self._movi_start = f.tell()
+        f.write(b"LIST\0\0\0\0movi")
+
+    def write_jpeg(self, data):
+        """Append one already-encoded JPEG frame"""
+        size = len(data)
+        offset = self._file.tell() - (self._movi_start + 8)
+        self._file.write(struct.pack("<4sI", b"00dc", size))
+        self._file.write(data)
+        if size % 2:
+            self._file.write(b"\0")
+        self._index.append((offset, size))
+        self._max_chunk = max(self._max_chunk, size)
+        self.frame_count += 1
+
+    def write(self, frame):
+        """Encode and append a BGR frame (cv2.VideoWriter-compatible)"""
+        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if ok:
+            self.write_jpeg(encoded.tobytes())
+
+    def release(self):
+        f = self._file
+        if f.closed:
+            return
+        movi_end = f.tell()
+        f.write(b"idx1" + struct.pack("<I", 16 * len(self._index)))
+        for offset, size in self._index:
+            f.write(struct.pack("<4sIII", b"00dc", _AVIIF_KEYFRAME, offset, size))
+        file_end = f.tell()
+        # Now that the frame count and sizes are known, fill in the headers
+        f.seek(0)
+        self._write_headers()
+        f.seek(4)
+        f.write(struct.pack("<I", file_end - 8))
+        f.seek(self._movi_start + 4)
+        f.write(struct.pack("<I", movi_end - self._movi_start - 8))
+        f.close()
+
+
+def _chunk(fourcc, payload):
+    padding = b"\0" if len(payload) % 2 else b""
+    return fourcc + struct.pack("<I", len(payload)) + payload + padding
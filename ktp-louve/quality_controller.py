@@ -0,0 +1,136 @@
+import time
+import numpy as np
+
+LATENCY_TARGET = 0.1  # Glass-to-decision budget (seconds): frame grabbed -> status published
+QUALITY_INPUT_SIZES = [320, 480, 640]  # Model input sizes compiled up front (each needs its own IR)
+QUALITY_WINDOW = 30  # Frames measured between decisions
+SPEEDUP_MARGIN = 0.8  # Only step quality up if the predicted p95 stays under this fraction of the target
+FPS_STEP = 0.7  # Rate cap multiplier per step down (divided by it per step up)
+MIN_FPS = 2.0  # Never process slower than this
+
+
+class QualityController:
+    """Holds end-to-end frame latency under a target by trading input size and frame rate.
+
+    `levels` maps input size -> (compiled_model, input_transform), all
+    compiled before the loop starts so a switch costs nothing. Every
+    QUALITY_WINDOW frames the p95 glass-to-decision latency is compared
+    with the target:
+
+    - over budget: drop to the next smaller input size; at the smallest
+      one, cap the processing rate instead (fewer frames leave the CPU
+      to OpenVINO's threads and whatever else runs on the box);
+    - well under budget: lift the rate cap first, then go to the next
+      larger size, but only if the latency scaled by the pixel count
+      ratio still fits under SPEEDUP_MARGIN of the target, so it doesn't
+      bounce straight back.
+
+    Every switch is printed and passed to `on_change(input_size, max_fps,
+    reason)`.
+    """
+
+    def __init__(self, levels, target_latency=LATENCY_TARGET, max_fps=None, min_fps=MIN_FPS,
+                 window=QUALITY_WINDOW, on_change=None):
+        self.levels = levels
+        self.sizes = sorted(levels)
+        self.target_latency = target_latency
+        self.max_fps = max_fps  # None = as fast as the pipeline goes
+        self.min_fps = min_fps
+        self.window = window
+        self.on_change = on_change
+        self.level = len(self.sizes) - 1  # Start at full quality and back off if needed
+        self.fps = max_fps
+        self.switches = 0
+        self._latencies = []
+        self._frames = 0  # All frames in the window, inferred or not (for the frame rate)
+        self._window_start = None
+        self._uncapped_fps = None  # Rate we were managing when the cap first went on
+        self._next_due = 0.0
+
+    @property
+    def input_size(self):
+        return self.sizes[self.level]
+
+    @property
+    def compiled_model(self):
+        return self.levels[self.input_size][0]
+
+    @property
+    def input_transform(self):
+        return self.levels[self.input_size][1]
+
+    def wait(self):
+        """Sleep until the next frame is due under the current rate cap"""
+        if self.fps is None:
+            return
+        now = time.monotonic()
+        if now < self._next_due:
+            time.sleep(self._next_due - now)
+            now = self._next_due
+        self._next_due = now + 1.0 / self.fps
+
+    def record(self, latency, now=None, inferred=True):
+        """Add one frame's glass-to-decision latency (seconds); may switch level or rate
+
+        Frames that skipped inference (inferred=False, e.g. the motion gate
+        found nothing new) count toward the frame rate only: their
+        near-zero latency says nothing about whether the model fits the budget.
+        """
+        now = time.monotonic() if now is None else now
+        if self._window_start is None:
+            self._window_start = now
+        self._frames += 1
+        if inferred:
+            self._latencies.append(latency)
+        if len(self._latencies) < self.window:
+            return False
+        p95 = float(np.percentile(self._latencies, 95))
+        rate = self._frames / max(now - self._window_start, 1e-6)
+        # Each window only measures one setting
+        self._latencies = []
+        self._frames = 0
+        self._window_start = now
+        return self._decide(p95, rate)
+
+    def _decide(self, p95, rate):
+        target = self.target_latency
+        measured = f"p95 {p95 * 1000:.0f} ms, target {target * 1000:.0f} ms, {rate:.1f} fps"
+        if p95 > target:
+            if self.level > 0:
+                return self._switch(self.level - 1, self.fps, f"over budget ({measured})")
+            current = self.fps if self.fps is not None else rate
+            fps = max(self.min_fps, current * FPS_STEP)
+            if self.fps is None or fps < self.fps:
+                if self._uncapped_fps is None:
+                    self._uncapped_fps = rate
+                return self._switch(self.level, fps, f"over budget at the smallest input ({measured})")
+            return False
+        if p95 > target * SPEEDUP_MARGIN:
+            return False
+        if self.fps != self.max_fps:
+            fps = self.fps / FPS_STEP
+            ceiling = self.max_fps if self.max_fps is not None else self._uncapped_fps
+            if ceiling is not None and fps >= ceiling:
+                fps = self.max_fps
+                self._uncapped_fps = None
+            return self._switch(self.level, fps, f"headroom ({measured})")
+        if self.level + 1 < len(self.sizes):
+            predicted = p95 * (self.sizes[self.level + 1] / self.input_size) ** 2
+            if predicted <= target * SPEEDUP_MARGIN:
+                return self._switch(self.level + 1, self.fps,
+                                    f"headroom ({measured}, predicted {predicted * 1000:.0f} ms)")
+        return False
+
+    def _switch(self, level, fps, reason):
+        previous = (self.input_size, self.fps)
+        self.level = level
+        self.fps = fps
+        self.switches += 1
+
+        def rate(value):
+            return "max fps" if value is None else f"{value:.1f} fps"
+
+        print(f"🎚️ Quality {previous[0]} @ {rate(previous[1])} → {self.input_size} @ {rate(fps)}: {reason}")
+        if self.on_change is not None:
+            self.on_change(self.input_size, None if fps is None else round(fps, 2), reason)
+        return True
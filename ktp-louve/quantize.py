@@ -0,0 +1,132 @@
+import argparse
+import os
+import shutil
+import sys
+import time
+import cv2
+import numpy as np
+from openvino.runtime import Core, serialize
+
+try:
+    import nncf
+except ImportError:  # Only needed to build the INT8 model, not to run it
+    nncf = None
+
+INPUT_SIZE = 640
+SUBSET_SIZE = 300  # Calibration frames; more barely changes the ranges NNCF picks
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+# The box/class decoding at the end of YOLOv8 (DFL, anchor math, class sigmoid) loses accuracy as INT8
+HEAD_IGNORED_PATTERNS = [".*model.22/.*/Add", ".*model.22/.*/Sub.*", ".*model.22/.*/Mul.*",
+                         ".*model.22/.*/Div.*", ".*model.22\\.dfl.*"]
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def _media_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def _video_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    # Spread the frames over the whole recording rather than taking its first seconds
+    stride = max(1, total // limit) if total > 0 else 1
+    index = 0
+    taken = 0
+    while taken < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % stride == 0:
+            taken += 1
+            yield frame
+        index += 1
+    cap.release()
+
+
+def load_calibration_frames(paths, subset_size=SUBSET_SIZE, input_size=INPUT_SIZE):
+    """Frames from images and recordings under `paths`, already resized to the model input (uint8 BGR)"""
+    files = list(_media_files(paths))
+    videos = [f for f in files if f.lower().endswith(VIDEO_EXTENSIONS)]
+    per_video = -(-subset_size // max(len(videos), 1))
+    frames = []
+    for path in files:
+        if len(frames) >= subset_size:
+            break
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            source = _video_frames(path, per_video)
+        else:
+            image = cv2.imread(path)
+            source = [image] if image is not None else []
+        for frame in source:
+            frames.append(cv2.resize(frame, (input_size, input_size), interpolation=cv2.INTER_LINEAR))
+            if len(frames) >= subset_size:
+                break
+    return frames
+
+
+def to_model_input(frame):
+    """Same preprocessing detection.py does on the host: BGR->RGB, /255, NCHW float32"""
+    return (frame[..., ::-1].transpose(2, 0, 1)[np.newaxis].astype(np.float32) / 255.0)
+
+
+def quantize_model(model_dir, output_dir, frames, fast_bias_correction=True):
+    """Post-training INT8 quantization of the FP32 IR in `model_dir`, calibrated on `frames`"""
+    ov_model = Core().read_model(os.path.join(model_dir, "yolov8n.xml"))
+    calibration = nncf.Dataset(frames, to_model_input)
+    quantized = nncf.quantize(
+        ov_model, calibration,
+        preset=nncf.QuantizationPreset.MIXED,  # Asymmetric activations: SiLU outputs aren't centered
+        subset_size=len(frames),
+        fast_bias_correction=fast_bias_correction,
+        ignored_scope=nncf.IgnoredScope(patterns=HEAD_IGNORED_PATTERNS, types=["Sigmoid"], validate=False))
+    os.makedirs(output_dir, exist_ok=True)
+    serialize(quantized, os.path.join(output_dir, "yolov8n.xml"))
+    # detection.py reads the class names from here
+    shutil.copy(os.path.join(model_dir, "metadata.yaml"), output_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the INT8 detector model (post-training quantization with NNCF) "
+                    "calibrated on our own recorded frames",
+        epilog="example: python quantize.py --calibration recordings/ && python detection.py --precision INT8")
+    parser.add_argument("--calibration", nargs="+", required=True,
+                        help="image/video files or folders of them, ideally from the gallery cameras")
+    parser.add_argument("--input-size", type=int, default=INPUT_SIZE,
+                        help="model input size; other sizes than %d are for detection.py --adaptive" % INPUT_SIZE)
+    parser.add_argument("--model-dir", help="FP32 OpenVINO IR to quantize (default: the one for --input-size, "
+                                            "exported if needed)")
+    parser.add_argument("--output", help="default: where detection.py looks for the INT8 model of --input-size")
+    parser.add_argument("--subset-size", type=int, default=SUBSET_SIZE)
+    parser.add_argument("--accurate-bias-correction", action="store_true",
+                        help="slower calibration, sometimes a little more accurate")
+    args = parser.parse_args(argv)
+
+    if nncf is None:
+        sys.exit("❌ NNCF is not installed — pip install nncf")
+    # Imported here: detection pulls in pygame etc., which --help doesn't need
+    from detection import find_model, int8_model_dir
+    # The anchor grid is baked into the IR, so each input size is quantized from its own FP32 export
+    model_dir = args.model_dir or find_model("FP32", args.input_size)
+    output = args.output or int8_model_dir(args.input_size)
+    print("🎞️ Loading calibration frames...")
+    frames = load_calibration_frames(args.calibration, args.subset_size, args.input_size)
+    if not frames:
+        sys.exit("❌ No calibration frames found")
+    print(f"🔧 Quantizing with {len(frames)} frames...")
+    start = time.time()
+    quantize_model(model_dir, output, frames, fast_bias_correction=not args.accurate_bias_correction)
+    print(f"✅ INT8 model written to {output} in {time.time() - start:.0f}s")
+    print("📊 Compare it with: python compare_models.py --source <clip>")
+
+
+if __name__ == "__main__":
+    main()
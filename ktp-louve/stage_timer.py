@@ -0,0 +1,59 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+import numpy as np
+
+_NO_TIMING = nullcontext()
+
+
+class StageTimer:
+    """Collects wall-clock samples per pipeline stage.
+
+        with timer.stage("decode"):
+            ...
+
+    summary() reports count, mean and p50/p95/p99/max in milliseconds.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.samples[name].append(seconds)
+
+    def reset(self):
+        self.samples.clear()
+
+    def summary(self):
+        stages = {}
+        for name, samples in self.samples.items():
+            ms = np.asarray(samples) * 1000.0
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            stages[name] = {
+                "count": int(ms.size),
+                "total_ms": round(float(ms.sum()), 3),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(ms.max()), 3),
+            }
+        return stages
+
+
+class NullTimer:
+    """Drop-in for StageTimer that records nothing (the normal, untimed run)"""
+
+    def stage(self, name):
+        return _NO_TIMING
+
+    def add(self, name, seconds):
+        pass
@@ -0,0 +1,60 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+
+GZIP_MIN_SIZE = 512  # Not worth compressing tiny snapshots
+
+# gzip_etag is the ETag of the gzip representation: a strong ETag must differ per encoding
+CachedStatus = namedtuple("CachedStatus", ["version", "body", "etag", "gzip_etag", "last_modified"])
+
+
+class StatusCache:
+    """Pre-serialized /api/status response, rebuilt only when the status version changes.
+
+    The version check is a shared-memory header read (or one stat() of
+    status.json). Requests in between reuse the same JSON bytes, ETag and
+    gzip body. Nothing is re-read or re-encoded per request.
+    """
+
+    def __init__(self, reader, fallback):
+        self.reader = reader
+        self.fallback = fallback  # Called for a status dict when nothing was published yet
+        self._lock = threading.Lock()
+        self._entry = None
+        self._gzip_body = None
+
+    def get(self):
+        version = self.reader.version()
+        entry = self._entry
+        if entry is not None and entry.version == version:
+            return entry
+        with self._lock:
+            if self._entry is None or self._entry.version != version:
+                self._rebuild(version)
+            return self._entry
+
+    def _rebuild(self, version):
+        body = None
+        if version is not None:
+            body = self.reader.read_bytes()
+        if not body:
+            body = json.dumps(self.fallback()).encode("utf-8")
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        # File versions carry the mtime, shared-memory versions don't
+        modified = version[0] / 1e9 if isinstance(version, tuple) else time.time()
+        self._entry = CachedStatus(version, body, etag, f"{etag}-gz", modified)
+        self._gzip_body = None
+
+    def gzip_body(self, entry):
+        """Gzip-compressed body for `entry`, compressed at most once per version"""
+        if len(entry.body) < GZIP_MIN_SIZE:
+            return None
+        with self._lock:
+            if self._entry is entry:
+                if self._gzip_body is None:
+                    self._gzip_body = gzip.compress(entry.body, compresslevel=5)
+                return self._gzip_body
+        return gzip.compress(entry.body, compresslevel=5)
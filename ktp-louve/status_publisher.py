@@ -0,0 +1,204 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+# Shared-memory snapshot of the latest status; tmpfs on Linux so it never touches the disk
+STATUS_SHM_PATH = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                               "artwatch_status")
+STATUS_SHM_SIZE = 1 << 20  # Initial size; doubled whenever a snapshot doesn't fit
+
+# seq (odd while a write is in progress), version, payload length
+_HEADER = struct.Struct("<QQI")
+_OVERSIZE = 0xFFFFFFFF  # Payload length meaning "didn't fit, read the JSON file"
+
+
+def _without_keys(value, keys):
+    if isinstance(value, dict):
+        return {k: _without_keys(v, keys) for k, v in value.items() if k not in keys}
+    if isinstance(value, list):
+        return [_without_keys(v, keys) for v in value]
+    return value
+
+
+def open_segment(path, size, writable):
+    """mmap a shared segment file; writers create/grow it, readers map whatever is there"""
+    if writable:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            return mmap.mmap(fd, size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class StatusPublisher:
+    """Publishes detector status only when it changes (or on a heartbeat).
+
+    Every snapshot gets a monotonically increasing `version` and is written
+    atomically: the JSON file is replaced with os.replace, so readers see
+    either the old or the new file, never half of one. Optionally the same
+    bytes go into a shared-memory segment guarded by a sequence lock, which
+    lets the web server read the latest snapshot without touching the
+    filesystem.
+
+    Keys listed in `volatile_keys` (like the ever-growing missing_for
+    counter) are ignored when deciding whether something changed; they are
+    refreshed by the heartbeat instead.
+    """
+
+    def __init__(self, path, heartbeat=1.0, shm_path=None, volatile_keys=("missing_for",)):
+        self.path = path
+        self.heartbeat = heartbeat
+        self.volatile_keys = set(volatile_keys)
+        self.version = self._previous_version()
+        self._last_fingerprint = None
+        self._last_publish = 0.0
+        self._shm = None
+        self._shm_path = shm_path
+        self._oversize_warned = False
+        if shm_path:
+            try:
+                self._shm = open_segment(shm_path, STATUS_SHM_SIZE, writable=True)
+            except OSError as e:
+                print(f"⚠️ Shared memory status disabled: {e}")
+
+    def _previous_version(self):
+        # Continue counting after a restart so readers never see the version go backwards
+        try:
+            with open(self.path, 'r') as f:
+                return int(json.load(f).get("version", 0))
+        except (OSError, ValueError, AttributeError):
+            return 0
+
+    def publish(self, status, force=False):
+        """Publish `status` if it changed or the heartbeat is due. Returns True if published."""
+        fingerprint = json.dumps(_without_keys(status, self.volatile_keys), sort_keys=True, default=str)
+        now = time.monotonic()
+        if (not force and fingerprint == self._last_fingerprint
+                and now - self._last_publish < self.heartbeat):
+            return False
+
+        self.version += 1
+        snapshot = dict(status, version=self.version, published_at=time.time())
+        data = json.dumps(snapshot, default=str).encode("utf-8")
+        try:
+            self._write_file(data)
+        except Exception as e:
+            print(f"⚠️ Status file error: {e}")
+        if self._shm is not None:
+            self._write_shm(data)
+
+        self._last_fingerprint = fingerprint
+        self._last_publish = now
+        return True
+
+    def _write_file(self, data):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def _write_shm(self, data):
+        length = len(data)
+        if _HEADER.size + length > len(self._shm):
+            length = self._grow_shm(_HEADER.size + length)
+        seq = _HEADER.unpack_from(self._shm, 0)[0]
+        # Odd sequence number tells readers a write is in progress
+        _HEADER.pack_into(self._shm, 0, seq + 1, self.version, length)
+        if length != _OVERSIZE:
+            self._shm[_HEADER.size:_HEADER.size + length] = data
+        _HEADER.pack_into(self._shm, 0, seq + 2, self.version, length)
+
+    def _grow_shm(self, needed):
+        """Make the segment big enough for `needed` bytes; readers remap when they see a longer payload.
+        Returns the payload length to publish, or _OVERSIZE if the segment couldn't grow."""
+        size = len(self._shm)
+        while size < needed:
+            size *= 2
+        try:
+            segment = open_segment(self._shm_path, size, writable=True)
+        except OSError as e:
+            if not self._oversize_warned:
+                print(f"⚠️ Status snapshot ({needed} bytes) doesn't fit in shared memory ({e}); "
+                      f"readers use {self.path} until it does")
+                self._oversize_warned = True
+            return _OVERSIZE
+        self._shm.close()
+        self._shm = segment
+        return needed - _HEADER.size
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+
+class StatusReader:
+    """Reads the latest published status, from shared memory when available"""
+
+    def __init__(self, path, shm_path=None):
+        self.path = path
+        self.shm_path = shm_path
+        self._shm = None
+
+    def _segment(self):
+        if self._shm is None and self.shm_path and os.path.exists(self.shm_path):
+            try:
+                self._shm = open_segment(self.shm_path, STATUS_SHM_SIZE, writable=False)
+            except (OSError, ValueError):
+                self._shm = None
+        return self._shm
+
+    def version(self):
+        """Cheap change check: the shared-memory version, or the file's mtime"""
+        shm = self._segment()
+        if shm is not None:
+            seq, version, _ = _HEADER.unpack_from(shm, 0)
+            if seq:
+                return version
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def read_bytes(self):
+        """Raw JSON bytes of the latest snapshot, or None if nothing was published yet"""
+        shm = self._segment()
+        if shm is not None:
+            for _ in range(100):
+                seq, _, length = _HEADER.unpack_from(shm, 0)
+                if seq == 0:
+                    break
+                if seq % 2:
+                    time.sleep(0.0005)
+                    continue
+                if length == _OVERSIZE:
+                    break  # Too big for the segment; the file has it
+                if _HEADER.size + length > len(shm):
+                    # The publisher grew the segment after we mapped it
+                    shm.close()
+                    self._shm = None
+                    shm = self._segment()
+                    if shm is None:
+                        break
+                    continue
+                data = shm[_HEADER.size:_HEADER.size + length]
+                if _HEADER.unpack_from(shm, 0)[0] == seq:
+                    return data
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def read(self):
+        data = self.read_bytes()
+        if data is None:
+            return None
+        return json.loads(data)
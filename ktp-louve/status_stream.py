@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+
+
+class StatusBroadcaster:
+    """Server-Sent Events fan-out for status snapshots.
+
+    A single watcher thread polls the status source for a new version and
+    formats each new snapshot as one SSE message. The message is pushed to
+    every subscriber's small bounded queue. A client that can't keep up
+    loses its oldest queued snapshots instead of blocking the watcher or
+    the other clients; it only ever needs the latest status anyway.
+    """
+
+    def __init__(self, read_version, read_bytes, poll_interval=0.05, keepalive=15.0, client_queue_size=4):
+        self.read_version = read_version
+        self.read_bytes = read_bytes
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.client_queue_size = client_queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._latest = None
+        self._watcher = None
+
+    def _format(self, version, data):
+        # Shared-memory versions are ints, file versions are (mtime_ns, size)
+        event_id = version if isinstance(version, int) else version[0]
+        return b"id: %d\ndata: %s\n\n" % (event_id, data)
+
+    def _watch(self):
+        last_version = None
+        while True:
+            try:
+                version = self.read_version()
+                if version is not None and version != last_version:
+                    data = self.read_bytes()
+                    if data:
+                        last_version = version
+                        self._broadcast(self._format(version, data.strip()))
+            except Exception as e:
+                print(f"⚠️ Status stream error: {e}")
+            time.sleep(self.poll_interval)
+
+    def _broadcast(self, message):
+        with self._lock:
+            self._latest = message
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            self._offer(q, message)
+
+    @staticmethod
+    def _offer(q, message):
+        while True:
+            try:
+                q.put_nowait(message)
+                return
+            except queue.Full:
+                # Slow consumer: drop its oldest snapshot
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, daemon=True)
+                self._watcher.start()
+
+    def subscribe(self):
+        self._ensure_watcher()
+        q = queue.Queue(maxsize=self.client_queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+            latest = self._latest
+        if latest is not None:
+            q.put_nowait(latest)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def client_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stream(self):
+        """Generator of SSE bytes for one client, with keep-alive comments"""
+        q = self.subscribe()
+        try:
+            # Tell EventSource to reconnect quickly if the server restarts
+            yield b"retry: 2000\n\n"
+            while True:
+                try:
+                    yield q.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield b": keep-alive\n\n"
+        finally:
+            self.unsubscribe(q)
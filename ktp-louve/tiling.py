@@ -0,0 +1,134 @@
+import math
+from collections import namedtuple
+from functools import lru_cache
+import cv2
+import numpy as np
+from yolo_decoder import InputTransform, decode_yolo_output, nms
+
+TILE_SIZE = 1280  # Side of a grid tile in frame pixels (each tile is scaled to the model input size)
+TILE_OVERLAP = 0.2  # Fraction of a tile shared with its neighbour, so objects on a seam are whole in one tile
+ZONE_MARGIN = 0.25  # Extra context around a registered artifact zone, as a fraction of its size
+CONTAINMENT_THRESHOLD = 0.7  # A box this much inside a better same-class box from another tile is a cut-off duplicate
+
+# crops: int32 (T, 4) x1, y1, x2, y2 in frame pixels; transforms: model input -> frame, one per crop
+TilePlan = namedtuple("TilePlan", ["crops", "transforms", "frame_size", "input_size"])
+
+
+def _grid_positions(length, tile, overlap):
+    if length <= tile:
+        return [0], length
+    step = tile * (1.0 - overlap)
+    count = math.ceil((length - tile) / step) + 1
+    return np.linspace(0, length - tile, count).round().astype(int).tolist(), tile
+
+
+def _zone_crop(zone, frame_width, frame_height, margin):
+    """Square crop around a zone (so it isn't stretched), shifted to stay inside the frame"""
+    x1, y1, x2, y2 = zone
+    side = int(round(max(x2 - x1, y2 - y1) * (1.0 + 2 * margin)))
+    side = min(side, frame_width, frame_height)
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    left = int(round(min(max(cx - side / 2, 0), frame_width - side)))
+    top = int(round(min(max(cy - side / 2, 0), frame_height - side)))
+    return left, top, left + side, top + side
+
+
+@lru_cache(maxsize=16)
+def plan_tiles(frame_width, frame_height, input_size=640, tile_size=TILE_SIZE, overlap=TILE_OVERLAP,
+               zones=None, include_full_frame=True):
+    """Crops to run the detector on for one frame size, computed once per configuration.
+
+    Without `zones` the frame is covered by an overlapping grid of
+    tile_size squares. With `zones` (a tuple of (x1, y1, x2, y2) artifact
+    areas) only square crops around those zones are used. The whole frame,
+    squashed as in the untiled mode, is added too when include_full_frame
+    is set, so objects bigger than a tile are still found.
+    """
+    crops = []
+    if zones:
+        crops = [_zone_crop(zone, frame_width, frame_height, ZONE_MARGIN) for zone in zones]
+    else:
+        xs, tile_w = _grid_positions(frame_width, tile_size, overlap)
+        ys, tile_h = _grid_positions(frame_height, tile_size, overlap)
+        crops = [(x, y, x + tile_w, y + tile_h) for y in ys for x in xs]
+    if include_full_frame and (len(crops) > 1 or zones):
+        crops.append((0, 0, frame_width, frame_height))
+    crops = np.asarray(crops, dtype=np.int32).reshape(-1, 4)
+    transforms = tuple(InputTransform((x2 - x1) / input_size, (y2 - y1) / input_size, float(x1), float(y1))
+                       for x1, y1, x2, y2 in crops.tolist())
+    crops.setflags(write=False)
+    return TilePlan(crops, transforms, (frame_width, frame_height), input_size)
+
+
+class TileBatcher:
+    """Cuts frames into a plan's crops for one batched request and merges the results"""
+
+    def __init__(self, plan):
+        self.plan = plan
+        size = plan.input_size
+        # Reused every frame; OpenVINO copies it into the request's input tensor
+        self._batch = np.empty((len(plan.crops), size, size, 3), dtype=np.uint8)
+
+    @property
+    def batch_size(self):
+        return len(self.plan.crops)
+
+    def fill(self, frame):
+        """(T, input_size, input_size, 3) uint8 BGR batch of the plan's crops"""
+        size = self.plan.input_size
+        for slot, (x1, y1, x2, y2) in zip(self._batch, self.plan.crops.tolist()):
+            cv2.resize(frame[y1:y2, x1:x2], (size, size), dst=slot, interpolation=cv2.INTER_LINEAR)
+        return self._batch
+
+    def decode(self, output, conf_threshold=0.5, class_ids=None):
+        """Decode a (T, 4 + classes, anchors) batched output into one set of frame-space detections.
+
+        Returns boxes, scores, class_ids and the index of the crop each box came from (for merge_nms).
+        """
+        frame_width, frame_height = self.plan.frame_size
+        parts = [decode_yolo_output(output[tile:tile + 1], frame_width, frame_height,
+                                    conf_threshold=conf_threshold, input_size=self.plan.input_size,
+                                    class_ids=class_ids, transform=transform)
+                 for tile, transform in enumerate(self.plan.transforms)]
+        boxes = np.concatenate([p[0] for p in parts])
+        scores = np.concatenate([p[1] for p in parts])
+        class_ids = np.concatenate([p[2] for p in parts])
+        tiles = np.repeat(np.arange(len(parts), dtype=np.int32), [len(p[0]) for p in parts])
+        return boxes, scores, class_ids, tiles
+
+
+def _class_nms(boxes, scores, class_ids, score_threshold, nms_threshold):
+    """NMS within each class: boxes are shifted apart per class so different classes never overlap"""
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int32)
+    offset = float(boxes.max()) + 1.0
+    shifted = boxes.astype(np.float32) + (class_ids.astype(np.float32) * offset)[:, None]
+    return nms(shifted, scores, score_threshold, nms_threshold)
+
+
+def merge_nms(boxes, scores, class_ids, tiles, score_threshold, nms_threshold, containment=CONTAINMENT_THRESHOLD):
+    """NMS across tiles: per-class IoU suppression, then drop cut-off duplicates.
+
+    An object cut by a tile edge gives a partial box in one tile and a
+    whole one in its neighbour; their IoU can be low, but the partial box
+    lies almost entirely inside the whole one. Only a box of the same
+    class from a different tile counts as such a duplicate: a bottle held
+    in front of a person lies inside the person's box too, and must stay.
+    """
+    keep = _class_nms(boxes, scores, class_ids, score_threshold, nms_threshold)
+    if len(keep) < 2:
+        return keep
+    keep = keep[np.argsort(-scores[keep], kind="stable")]
+    kept = boxes[keep].astype(np.float32)
+    x1 = np.maximum.outer(kept[:, 0], kept[:, 0])
+    y1 = np.maximum.outer(kept[:, 1], kept[:, 1])
+    x2 = np.minimum.outer(kept[:, 2], kept[:, 2])
+    y2 = np.minimum.outer(kept[:, 3], kept[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = np.maximum((kept[:, 2] - kept[:, 0]) * (kept[:, 3] - kept[:, 1]), 1.0)
+    # covered[i, j]: share of box i inside box j; only higher-scored boxes (j < i) may suppress
+    covered = inter / area[:, None]
+    kept_classes, kept_tiles = class_ids[keep], tiles[keep]
+    duplicate = (kept_classes[:, None] == kept_classes[None, :]) & (kept_tiles[:, None] != kept_tiles[None, :])
+    suppressed = np.tril((covered >= containment) & duplicate, k=-1).any(axis=1)
+    return np.sort(keep[~suppressed])
@@ -0,0 +1,357 @@
+import numpy as np
+from collections import namedtuple
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional, fall back to the NumPy solver below
+    linear_sum_assignment = None
+
+SETTLING_FRAMES = 10  # Frames to wait before locking the initial position and alerting on movement
+MAX_PREDICTION_TIME = 0.5  # Don't extrapolate velocity further than this (seconds)
+VELOCITY_SMOOTHING = 0.5  # Weight of the newest velocity sample
+PREDICTION_MIN_SHIFT = 0.1  # Ignore predicted shifts below this fraction of the match threshold
+
+# kind is "moved", "missing", "recovered" (a missing object matched again) or "reassigned"
+# (a missing object's ID handed to a new detection); time_missing is how long it had been unseen
+TrackEvent = namedtuple("TrackEvent", ["kind", "object_id", "time_missing"])
+
+
+def _pairs_within(centers, points, order, xs, radius):
+    """(row, col, squared distance) for every point within `radius` of centers[row].
+
+    `order` sorts the points by x and `xs` are those sorted x values, so
+    each center only looks at the points in its x window instead of all of
+    them. The work grows with the number of nearby pairs, not rows x cols.
+    """
+    lo = np.searchsorted(xs, centers[:, 0] - radius, side="left")
+    hi = np.searchsorted(xs, centers[:, 0] + radius, side="right")
+    counts = hi - lo
+    total = int(counts.sum())
+    rows = np.repeat(np.arange(len(centers)), counts)
+    # Index of each pair inside its center's window, added to the window start
+    starts = np.cumsum(counts) - counts
+    cols = order[np.repeat(lo - starts, counts) + np.arange(total)]
+    delta = points[cols] - centers[rows]
+    d2 = np.einsum("ij,ij->i", delta, delta)
+    near = d2 < radius * radius
+    return rows[near], cols[near], d2[near]
+
+
+def min_cost_assignment(cost):
+    """Globally optimal assignment for a (rows, cols) cost matrix.
+
+    Uses scipy when available, otherwise a vectorized Hungarian
+    (shortest augmenting path) solver. Returns (row_indices, col_indices).
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    # Potentials and matching are 1-based with column 0 as the virtual start
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    col_owner = np.zeros(m + 1, dtype=np.intp)
+    way = np.zeros(m + 1, dtype=np.intp)
+    for row in range(1, n + 1):
+        col_owner[0] = row
+        j0 = 0
+        min_slack = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = col_owner[j0]
+            free = ~used[1:]
+            slack = cost[i0 - 1] - u[i0] - v[1:]
+            improve = free & (slack < min_slack[1:])
+            min_slack[1:][improve] = slack[improve]
+            way[1:][improve] = j0
+            candidates = np.where(free, min_slack[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[col_owner[used]] += delta
+            v[used] -= delta
+            min_slack[1:][free] -= delta
+            j0 = j1
+            if col_owner[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            col_owner[j0] = col_owner[j1]
+            j0 = j1
+
+    assigned = np.flatnonzero(col_owner[1:])
+    rows = col_owner[1:][assigned] - 1
+    cols = assigned
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def gated_assignment(rows, cols, cost, shape, gate):
+    """Optimal assignment over candidate pairs (rows[k], cols[k]) with squared distances cost[k] < gate.
+
+    Rows and columns with exactly one candidate on both sides are matched
+    directly; only the ambiguous remainder goes through the solver, as a
+    dense matrix over just those rows and columns. That keeps static
+    scenes with hundreds of objects cheap.
+    """
+    row_counts = np.bincount(rows, minlength=shape[0])
+    col_counts = np.bincount(cols, minlength=shape[1])
+    isolated = (row_counts[rows] == 1) & (col_counts[cols] == 1)
+    matched_rows = [rows[isolated]]
+    matched_cols = [cols[isolated]]
+
+    ambiguous = ~isolated
+    if ambiguous.any():
+        rest_rows, sub_r = np.unique(rows[ambiguous], return_inverse=True)
+        rest_cols, sub_c = np.unique(cols[ambiguous], return_inverse=True)
+        # Minimize total distance; non-candidate pairs cost more than any set of valid pairs
+        limit = np.sqrt(gate)
+        sub = np.full((len(rest_rows), len(rest_cols)), limit * (min(len(rest_rows), len(rest_cols)) + 1))
+        sub[sub_r, sub_c] = np.sqrt(cost[ambiguous])
+        valid_pairs = np.zeros(sub.shape, dtype=bool)
+        valid_pairs[sub_r, sub_c] = True
+        sub_rows, sub_cols = min_cost_assignment(sub)
+        valid = valid_pairs[sub_rows, sub_cols]
+        matched_rows.append(rest_rows[sub_rows[valid]])
+        matched_cols.append(rest_cols[sub_cols[valid]])
+
+    return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+
+class ObjectTracker:
+    """Multi-object tracker with struct-of-arrays state.
+
+    Object IDs are array indices in [0, max_seen). Each frame finds the
+    (track, detection) pairs within match_threshold of a track's last or
+    constant-velocity predicted position, and solves them with a global
+    optimal assignment instead of greedy first-come matching.
+
+    Alert semantics are the same as the original dict based tracking in
+    detection.py: a new or recovered object settles for SETTLING_FRAMES
+    before its initial position is locked; it raises one "moved" event when
+    it moves more than 2x move_threshold from that position or more than
+    move_threshold between frames; and it raises one "missing" event after
+    missing_time seconds unseen. IDs of missing objects are reused before
+    new ones are handed out. Those two cases are reported as "recovered"
+    and "reassigned" events; they are informational, not alerts.
+    """
+
+    def __init__(self, move_threshold=100, match_threshold=100, missing_time=2.0, capacity=16):
+        self.move_threshold = move_threshold
+        self.match_threshold = match_threshold
+        self.missing_time = missing_time
+        self.max_seen = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.active = np.zeros(capacity, dtype=bool)
+        self.position = np.zeros((capacity, 2), dtype=np.float64)
+        self.initial_position = np.zeros((capacity, 2), dtype=np.float64)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float64)
+        self.bbox = np.zeros((capacity, 4), dtype=np.int32)
+        self.last_seen = np.zeros(capacity, dtype=np.float64)
+        self.frames_seen = np.zeros(capacity, dtype=np.int32)
+        self.settling = np.zeros(capacity, dtype=np.int32)
+        self.missing_alerted = np.zeros(capacity, dtype=bool)
+        self.movement_alerted = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, needed):
+        capacity = len(self.active)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = {name: getattr(self, name) for name in (
+            "active", "position", "initial_position", "velocity", "bbox", "last_seen",
+            "frames_seen", "settling", "missing_alerted", "movement_alerted")}
+        self._allocate(capacity)
+        for name, values in old.items():
+            getattr(self, name)[:len(values)] = values
+
+    # --- read access, mirrors the old tracked_bottles dict ---
+
+    def __contains__(self, object_id):
+        return 0 <= object_id < len(self.active) and bool(self.active[object_id])
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def keys(self):
+        return np.flatnonzero(self.active).tolist()
+
+    def __getitem__(self, object_id):
+        if object_id not in self:
+            raise KeyError(object_id)
+        return {
+            'position': tuple(self.position[object_id].tolist()),
+            'initial_position': tuple(self.initial_position[object_id].tolist()),
+            'velocity': tuple(self.velocity[object_id].tolist()),
+            'frames_seen': int(self.frames_seen[object_id]),
+            'last_seen_time': float(self.last_seen[object_id]),
+            'missing_alerted': bool(self.missing_alerted[object_id]),
+            'movement_alerted': bool(self.movement_alerted[object_id]),
+            'bbox': tuple(self.bbox[object_id].tolist()),
+            'settling_frames': int(self.settling[object_id]),
+        }
+
+    def items(self):
+        return [(object_id, self[object_id]) for object_id in self.keys()]
+
+    def missing_mask(self, current_time):
+        return self.active & (current_time - self.last_seen > self.missing_time)
+
+    def present_mask(self, current_time):
+        return self.active & (current_time - self.last_seen <= self.missing_time)
+
+    # --- per-frame update ---
+
+    def _start_track(self, object_id, detection, current_time):
+        self.active[object_id] = True
+        self.position[object_id] = detection[:2]
+        self.initial_position[object_id] = detection[:2]
+        self.velocity[object_id] = 0.0
+        self.bbox[object_id] = detection[2:6]
+        self.last_seen[object_id] = current_time
+        self.frames_seen[object_id] = 1
+        self.settling[object_id] = SETTLING_FRAMES
+        self.missing_alerted[object_id] = False
+        self.movement_alerted[object_id] = False
+
+    def _available_id(self, current_time):
+        """Free ID in [0, max_seen), else the first long-missing one, else the longest unseen"""
+        if self.max_seen <= 0:
+            return 0
+        active = self.active[:self.max_seen]
+        free = np.flatnonzero(~active)
+        if free.size:
+            return int(free[0])
+        time_missing = current_time - self.last_seen[:self.max_seen]
+        long_missing = np.flatnonzero(time_missing > self.missing_time)
+        if long_missing.size:
+            return int(long_missing[0])
+        oldest = int(np.argmax(time_missing))
+        if time_missing[oldest] > 0:
+            return oldest
+        return 0
+
+    def _check_missing(self, ids, current_time, events):
+        time_missing = current_time - self.last_seen[ids]
+        alert = (time_missing > self.missing_time) & ~self.missing_alerted[ids]
+        for object_id, missing_for in zip(ids[alert].tolist(), time_missing[alert].tolist()):
+            events.append(TrackEvent("missing", object_id, missing_for))
+        self.missing_alerted[ids[alert]] = True
+
+    def update(self, detections, current_time):
+        """Feed one frame of detections (rows of cx, cy, x1, y1, x2, y2).
+
+        Returns the list of TrackEvents raised by this frame.
+        """
+        detections = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+        events = []
+
+        if len(detections) > self.max_seen:
+            self.max_seen = len(detections)
+            self._grow(self.max_seen)
+
+        if len(detections) == 0:
+            self._check_missing(np.flatnonzero(self.active), current_time, events)
+            return events
+
+        time_missing = current_time - self.last_seen
+        long_missing = self.active & (time_missing > self.missing_time)
+        # Missing objects that already alerted only come back through ID reuse below
+        tracks = np.flatnonzero(self.active & ~(long_missing & self.missing_alerted))
+
+        # Distance to the constant-velocity prediction or to the last position, whichever is
+        # closer, so fast movers keep their ID and sudden stops don't lose it either
+        points = detections[:, :2]
+        order = np.argsort(points[:, 0], kind="stable")
+        xs = points[order, 0]
+        rows, cols, cost = _pairs_within(self.position[tracks], points, order, xs, self.match_threshold)
+        dt = np.clip(time_missing[tracks], 0.0, MAX_PREDICTION_TIME)
+        shift = self.velocity[tracks] * dt[:, None]
+        # Only objects whose prediction moves noticeably need the second lookup
+        moving = np.flatnonzero(np.abs(shift).max(axis=1) > self.match_threshold * PREDICTION_MIN_SHIFT)
+        if moving.size:
+            predicted = self.position[tracks[moving]] + shift[moving]
+            p_rows, p_cols, p_cost = _pairs_within(predicted, points, order, xs, self.match_threshold)
+            rows = np.concatenate([rows, moving[p_rows]])
+            cols = np.concatenate([cols, p_cols])
+            cost = np.concatenate([cost, p_cost])
+            # A pair found both ways keeps the smaller distance
+            key = rows * len(points) + cols
+            by_key = np.lexsort((cost, key))
+            first = np.ones(len(by_key), dtype=bool)
+            first[1:] = key[by_key][1:] != key[by_key][:-1]
+            keep = by_key[first]
+            rows, cols, cost = rows[keep], cols[keep], cost[keep]
+        rows, cols = gated_assignment(rows, cols, cost, (len(tracks), len(points)), self.match_threshold ** 2)
+
+        matched_ids = tracks[rows]
+        matched = detections[cols]
+
+        # Objects that were missing and are found again restart as new detections
+        was_missing = long_missing[matched_ids]
+        for object_id, detection in zip(matched_ids[was_missing], matched[was_missing]):
+            events.append(TrackEvent("recovered", int(object_id), float(time_missing[object_id])))
+            self._start_track(object_id, detection, current_time)
+
+        ids = matched_ids[~was_missing]
+        new_pos = matched[~was_missing, :2]
+        prev_pos = self.position[ids]
+
+        settling = self.settling[ids]
+        is_settled = settling == 0
+        counting = settling > 0
+        self.settling[ids[counting]] -= 1
+        just_settled = counting & (settling == 1)
+        # After settling completes, lock in the initial position
+        self.initial_position[ids[just_settled]] = new_pos[just_settled]
+        is_settled |= just_settled
+
+        from_initial = np.linalg.norm(new_pos - self.initial_position[ids], axis=1) > self.move_threshold * 2
+        from_prev = np.linalg.norm(new_pos - prev_pos, axis=1) > self.move_threshold
+        alert = is_settled & (from_initial | from_prev) & ~self.movement_alerted[ids]
+        for object_id in ids[alert].tolist():
+            events.append(TrackEvent("moved", object_id, 0.0))
+        self.movement_alerted[ids[alert]] = True
+
+        elapsed = current_time - self.last_seen[ids]
+        moving = elapsed > 0
+        sample = (new_pos[moving] - prev_pos[moving]) / elapsed[moving, None]
+        self.velocity[ids[moving]] = (VELOCITY_SMOOTHING * sample
+                                      + (1 - VELOCITY_SMOOTHING) * self.velocity[ids[moving]])
+
+        self.position[ids] = new_pos
+        self.bbox[ids] = matched[~was_missing, 2:6]
+        self.last_seen[ids] = current_time
+        self.frames_seen[ids] += 1
+        self.missing_alerted[ids] = False
+
+        # Tracked objects with no detection this frame
+        track_matched = np.zeros(len(tracks), dtype=bool)
+        track_matched[rows] = True
+        self._check_missing(tracks[~track_matched], current_time, events)
+
+        # New objects for unmatched detections
+        det_matched = np.zeros(len(detections), dtype=bool)
+        det_matched[cols] = True
+        for det_idx in np.flatnonzero(~det_matched).tolist():
+            object_id = self._available_id(current_time)
+            if self.active[object_id]:
+                events.append(TrackEvent("reassigned", object_id, current_time - self.last_seen[object_id]))
+            self._start_track(object_id, detections[det_idx], current_time)
+
+        # Only keep IDs in range [0, max_seen-1]
+        self.active[self.max_seen:] = False
+        return events
@@ -1,6 +1,13 @@
-from flask import Flask, render_template_string, jsonify
 import json
+from datetime import datetime
 import os
+from flask import Flask, Response, abort, render_template_string, request, send_file
+from status_publisher import StatusReader, STATUS_SHM_PATH
+from status_stream import StatusBroadcaster
+from status_cache import StatusCache
+from live_view import LiveFrameReader, MjpegBroadcaster
+from event_log import EventLogReader, EVENT_LOG_FILE
+from clip_library import ClipLibraryReader, CLIP_LIBRARY_FILE
 
 app = Flask(__name__)
 
@@ -14,13 +21,15 @@ def after_request(response):
 
 STATUS_FILE = "status.json"
 OBJECT_NAME = "bottle"  # Should match detection.py
+USE_SHARED_MEMORY_STATUS = True  # Should match detection.py
 
+status_reader = StatusReader(STATUS_FILE, shm_path=STATUS_SHM_PATH if USE_SHARED_MEMORY_STATUS else None)
 def read_status():
-    """Read status from JSON file"""
+    """Read the latest status snapshot published by detection.py"""
     try:
-        if os.path.exists(STATUS_FILE):
-            with open(STATUS_FILE, 'r') as f:
-                return json.load(f)
+        status = status_reader.read()
+        if status is not None:
+            return status
         else:
             return {
                 "object_present": False,
@@ -38,6 +47,24 @@ def read_status():
             "status_message": f"Error reading status: {e}"
         }
 
+# Serialized once per status version and shared by /api/status and /api/stream
+status_cache = StatusCache(status_reader, fallback=read_status)
+# One watcher pushes every new status snapshot to all /api/stream clients
+status_broadcaster = StatusBroadcaster(status_reader.version, lambda: status_cache.get().body)
+# Annotated frames handed over by detection.py, JPEG-encoded once for all /video_feed clients
+live_view = MjpegBroadcaster(LiveFrameReader())
+event_reader = EventLogReader(EVENT_LOG_FILE)
+clip_reader = ClipLibraryReader(CLIP_LIBRARY_FILE)
+
+def parse_time(value):
+    """Unix timestamp or ISO 8601 string (local time if it has no offset)"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
@@ -118,6 +145,12 @@ HTML_TEMPLATE = """
         .value {
             color: #333;
         }
+        .live-view {
+            width: 100%;
+            border-radius: 15px;
+            background: #222;
+            display: block;
+        }
         .connection-status {
             text-align: center;
             padding: 10px;
@@ -146,6 +179,9 @@ HTML_TEMPLATE = """
             <div class="status-text" id="statusText">Checking...</div>
             <div class="timestamp" id="timestamp">--</div>
         </div>
+        <div class="status-card">
+            <img class="live-view" src="/video_feed" alt="Live view">
+        </div>
         <div class="status-card">
             <div class="info-row">
                 <span class="label">Object:</span>
@@ -164,69 +200,142 @@ HTML_TEMPLATE = """
     <script>
         let lastUpdate = null;
         
-        function updateStatus() {
-            fetch('/api/status')
-                .then(response => response.json())
-                .then(data => {
-                    const card = document.getElementById('statusCard');
-                    const icon = document.getElementById('statusIcon');
-                    const text = document.getElementById('statusText');
-                    const timestamp = document.getElementById('timestamp');
-                    const connStatus = document.getElementById('connectionStatus');
-                    
-                    // Check if detection script is running
-                    const now = Date.now();
-                    if (lastUpdate && (now - lastUpdate) > 5000) {
-                        connStatus.className = 'connection-status disconnected';
-                        connStatus.textContent = '⚠️ Detection script not responding';
-                    } else {
-                        connStatus.className = 'connection-status connected';
-                        connStatus.textContent = '✓ Connected to detection script';
-                    }
-                    lastUpdate = now;
-                    
-                    if (data.object_present) {
-                        card.className = 'status-card present';
-                        icon.textContent = '✅';
-                        text.textContent = 'Object Present';
-                        text.style.color = '#28a745';
-                    } else {
-                        card.className = 'status-card missing';
-                        icon.textContent = '⚠️';
-                        text.textContent = '🚨 OBJECT MISSING!';
-                        text.style.color = '#dc3545';
-                    }
-                    
-                    timestamp.textContent = data.status_message;
-                    document.getElementById('lastSeen').textContent = data.last_seen || 'Never';
-                    document.getElementById('lastMovement').textContent = data.last_movement || 'None';
-                })
-                .catch(error => {
-                    console.error('Error fetching status:', error);
-                    const connStatus = document.getElementById('connectionStatus');
-                    connStatus.className = 'connection-status disconnected';
-                    connStatus.textContent = '❌ Connection error';
-                });
+        function updateStatus(data) {
+            const card = document.getElementById('statusCard');
+            const icon = document.getElementById('statusIcon');
+            const text = document.getElementById('statusText');
+            const timestamp = document.getElementById('timestamp');
+            const connStatus = document.getElementById('connectionStatus');
+            
+            connStatus.className = 'connection-status connected';
+            connStatus.textContent = '✓ Connected to detection script';
+            lastUpdate = Date.now();
+            
+            if (data.object_present) {
+                card.className = 'status-card present';
+                icon.textContent = '✅';
+                text.textContent = 'Object Present';
+                text.style.color = '#28a745';
+            } else {
+                card.className = 'status-card missing';
+                icon.textContent = '⚠️';
+                text.textContent = '🚨 OBJECT MISSING!';
+                text.style.color = '#dc3545';
+            }
+            
+            timestamp.textContent = data.status_message;
+            document.getElementById('lastSeen').textContent = data.last_seen || 'Never';
+            document.getElementById('lastMovement').textContent = data.last_movement || 'None';
         }
         
-        // Update every 500ms
-        setInterval(updateStatus, 500);
-        updateStatus();
+        // Status is pushed by the server as soon as it changes (plus a heartbeat)
+        const events = new EventSource('/api/stream');
+        events.onmessage = (event) => updateStatus(JSON.parse(event.data));
+        events.onerror = () => {
+            // EventSource reconnects on its own
+            const connStatus = document.getElementById('connectionStatus');
+            connStatus.className = 'connection-status disconnected';
+            connStatus.textContent = '❌ Connection error';
+        };
+        
+        // Detection script publishes at least every second while it is running
+        setInterval(() => {
+            if (lastUpdate && (Date.now() - lastUpdate) > 5000) {
+                const connStatus = document.getElementById('connectionStatus');
+                connStatus.className = 'connection-status disconnected';
+                connStatus.textContent = '⚠️ Detection script not responding';
+            }
+        }, 1000);
     </script>
 </body>
 </html>
 """
 
+# The page only depends on OBJECT_NAME, so render it once at startup
+with app.app_context():
+    INDEX_PAGE = render_template_string(HTML_TEMPLATE, object_name=OBJECT_NAME.capitalize())
+
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE, object_name=OBJECT_NAME.capitalize())
+    return INDEX_PAGE
 
 @app.route('/api/status')
 def get_status():
-    return jsonify(read_status())
+    entry = status_cache.get()
+    response = Response(entry.body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    etag = entry.etag
+    if 'gzip' in request.accept_encodings:
+        compressed = status_cache.gzip_body(entry)
+        if compressed is not None:
+            response.set_data(compressed)
+            response.headers['Content-Encoding'] = 'gzip'
+            etag = entry.gzip_etag
+    response.set_etag(etag)
+    response.last_modified = entry.last_modified
+    # Answers If-None-Match / If-Modified-Since with an empty 304
+    return response.make_conditional(request)
+
+@app.route('/api/stream')
+def stream_status():
+    """Server-Sent Events stream of status snapshots"""
+    return Response(status_broadcaster.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/events')
+def get_events():
+    """Event history, newest first: ?since=&until=&object=&kind=&limit=&cursor="""
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+        object_id = request.args.get('object', type=int)
+        limit = request.args.get('limit', default=100, type=int)
+        events, next_cursor = event_reader.query(since=since, until=until, object_id=object_id,
+                                                 kind=request.args.get('kind'), limit=limit,
+                                                 cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return Response(json.dumps({"error": str(e)}), status=400, mimetype='application/json')
+    return Response(json.dumps({"events": events, "next_cursor": next_cursor}), mimetype='application/json')
+
+@app.route('/api/clips')
+def get_clips():
+    """Recorded clips, newest first: ?since=&until=&trigger=&limit=&cursor="""
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+        limit = request.args.get('limit', default=50, type=int)
+        clips, next_cursor = clip_reader.query(since=since, until=until, trigger=request.args.get('trigger'),
+                                               limit=limit, cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return Response(json.dumps({"error": str(e)}), status=400, mimetype='application/json')
+    return Response(json.dumps({"clips": clips, "next_cursor": next_cursor}), mimetype='application/json')
+
+@app.route('/clips/<int:clip_id>')
+def get_clip(clip_id):
+    """The clip file; Range requests get 206 partial content, so players can seek without downloading it all"""
+    path = clip_reader.clip_path(clip_id)
+    if path is None or not os.path.exists(path):
+        abort(404)
+    return send_file(path, conditional=True, max_age=3600)
+
+@app.route('/clips/<int:clip_id>/thumbnail')
+def get_clip_thumbnail(clip_id):
+    thumbnail = clip_reader.thumbnail(clip_id)
+    if thumbnail is None:
+        abort(404)
+    # A clip's thumbnail never changes
+    return Response(thumbnail, mimetype='image/jpeg', headers={'Cache-Control': 'max-age=86400'})
+
+@app.route('/video_feed')
+def video_feed():
+    """Live MJPEG view of the annotated detection frames"""
+    return Response(live_view.stream(), mimetype='multipart/x-mixed-replace; boundary=frame',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 if __name__ == "__main__":
     print("🌐 Starting web server...")
     print("📱 Open http://localhost:5000 in your browser")
     print("💡 Make sure detection.py is running in another terminal!")
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    # threaded: every /api/stream and /video_feed client holds a connection open
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+from collections import namedtuple
+
+# Affine map from model input coordinates to frame coordinates:
+#   frame_x = input_x * scale_x + offset_x
+#   frame_y = input_y * scale_y + offset_y
+InputTransform = namedtuple("InputTransform", ["scale_x", "scale_y", "offset_x", "offset_y"])
+
+
+def stretch_transform(frame_width, frame_height, input_size=640):
+    """Transform for a frame squashed straight to input_size x input_size"""
+    return InputTransform(frame_width / input_size, frame_height / input_size, 0.0, 0.0)
+
+
+def letterbox_geometry(frame_width, frame_height, input_size=640):
+    """Scaled size and (left, top, right, bottom) padding to fit a frame into a square input"""
+    gain = min(input_size / frame_width, input_size / frame_height)
+    new_width = int(round(frame_width * gain))
+    new_height = int(round(frame_height * gain))
+    left = (input_size - new_width) // 2
+    top = (input_size - new_height) // 2
+    return new_width, new_height, (left, top, input_size - new_width - left, input_size - new_height - top)
+
+
+def letterbox_transform(frame_width, frame_height, input_size=640):
+    """Transform for a frame scaled with its aspect ratio kept and padded to input_size"""
+    new_width, new_height, (left, top, _, _) = letterbox_geometry(frame_width, frame_height, input_size)
+    scale_x = frame_width / new_width
+    scale_y = frame_height / new_height
+    return InputTransform(scale_x, scale_y, -left * scale_x, -top * scale_y)
+
+
+def class_ids_for_names(class_names, wanted):
+    """Look up the class indices for a list of class names (unknown names are ignored)"""
+    lookup = {name: idx for idx, name in class_names.items()}
+    return [lookup[name] for name in wanted if name in lookup]
+
+
+def decode_yolo_output(output, frame_width, frame_height, conf_threshold=0.5,
+                       input_size=640, class_ids=None, transform=None):
+    """Decode a raw YOLOv8 output tensor into frame-space boxes in one batched pass.
+
+    `output` is the model output, either (1, 4 + num_classes, num_anchors) as
+    produced by the OpenVINO export or an already transposed (num_anchors, 4 + num_classes).
+    When `class_ids` is given only those class columns are scored, which skips
+    the argmax over all 80 COCO classes when we only track a couple of them.
+
+    Returns (boxes, scores, class_ids): int32 (N, 4) boxes as x1, y1, x2, y2
+    clipped to the frame, float32 (N,) confidences and int32 (N,) class indices.
+    """
+    if output.ndim == 3:
+        preds = output[0]
+    else:
+        preds = output.T
+
+    if transform is None:
+        transform = stretch_transform(frame_width, frame_height, input_size)
+
+    if class_ids is None:
+        class_scores = preds[4:]
+    else:
+        class_ids = np.asarray(class_ids, dtype=np.intp)
+        class_scores = preds[4 + class_ids]
+
+    # Threshold on the best score first so argmax/box math only touches candidates
+    best = class_scores.max(axis=0)
+    keep = np.flatnonzero(best >= conf_threshold)
+    if keep.size == 0:
+        return (np.empty((0, 4), dtype=np.int32),
+                np.empty(0, dtype=np.float32),
+                np.empty(0, dtype=np.int32))
+
+    scores = best[keep].astype(np.float32)
+    cls = class_scores[:, keep].argmax(axis=0)
+    if class_ids is not None:
+        cls = class_ids[cls]
+
+    x_center, y_center, width, height = preds[:4, keep]
+    half_w = width / 2
+    half_h = height / 2
+    boxes = np.empty((keep.size, 4), dtype=np.float32)
+    boxes[:, 0] = (x_center - half_w) * transform.scale_x + transform.offset_x
+    boxes[:, 1] = (y_center - half_h) * transform.scale_y + transform.offset_y
+    boxes[:, 2] = (x_center + half_w) * transform.scale_x + transform.offset_x
+    boxes[:, 3] = (y_center + half_h) * transform.scale_y + transform.offset_y
+
+    # Truncate like int() did, then clip to the frame
+    boxes = boxes.astype(np.int32)
+    np.clip(boxes[:, 0::2], 0, frame_width, out=boxes[:, 0::2])
+    np.clip(boxes[:, 1::2], 0, frame_height, out=boxes[:, 1::2])
+
+    return boxes, scores, cls.astype(np.int32)
+
+
+def nms(boxes, scores, score_threshold=0.5, nms_threshold=0.4):
+    """Class-agnostic NMS over x1, y1, x2, y2 boxes, returns the kept indices"""
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int32)
+
+    # cv2.dnn.NMSBoxes expects x, y, w, h rectangles
+    xywh = boxes.copy()
+    xywh[:, 2:] -= boxes[:, :2]
+    indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(),
+                               score_threshold=score_threshold, nms_threshold=nms_threshold)
+    return np.asarray(indices, dtype=np.int32).reshape(-1)
@@ -1,36 +1,68 @@
 import cv2
 import time
-import numpy as np
 import sounddevice as sd
-from collections import deque
 import os
+import sys
+
+KTP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ktp-louve")
+sys.path.insert(0, KTP_DIR)
+from capture import open_capture
+from clip_recorder import ClipRecorder, MAX_CLIP_SECONDS
+from audio_trigger import AudioTrigger, AudioRing, BLOCK_SIZE
+from clip_library import ClipLibrary, CLIP_LIBRARY_FILE
 
 # --- SETTINGS ---
-SOUND_THRESHOLD = 0.05   # Adjust this for sensitivity
-DURATION_AFTER_SOUND = 5 # total clip length (2s before + 3s after)
+SOUND_THRESHOLD = 0.05   # Adjust this for sensitivity (level above the 250-8000 Hz noise floor, see audio_trigger.py)
+PREROLL_SECONDS = 10     # video kept from before the sound (held as JPEGs, ~45 MB at 1080p30)
+PREROLL_MAX_MB = 64      # memory cap for the pre-roll; oldest frames are dropped first
+POSTROLL_SECONDS = 3     # recorded after the sound
 SAMPLE_RATE = 44100      # audio sample rate
+CAMERA_SOURCE = sys.argv[1] if len(sys.argv) > 1 else "0"  # camera index, video file, stream URL or bus:<name>
 
 # --- OUTPUT FOLDER ---
 os.makedirs("recordings", exist_ok=True)
 
+# --- CLIP LIBRARY ---
+# Same index web_server.py lists at /api/clips; also deletes the oldest clips past the disk quota / age limit
+library = ClipLibrary(CLIP_LIBRARY_FILE)
+
 # --- CAMERA SETUP ---
-cap = cv2.VideoCapture(0)
+cap = open_capture(CAMERA_SOURCE)
 frame_rate = int(cap.get(cv2.CAP_PROP_FPS)) or 30
 frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-buffer = deque(maxlen=frame_rate * 2)  # store last 2 seconds of frames
+# Pre-roll, encoding and file writes all happen on the recorder's own thread
+recorder = ClipRecorder("recordings", frame_rate, frame_width, frame_height, preroll=PREROLL_SECONDS,
+                        postroll=POSTROLL_SECONDS, preroll_bytes=PREROLL_MAX_MB * 1024 * 1024,
+                        prefix="sound_clip", on_saved=lambda path, start, end: save_audio(path, start, end))
+
+# --- SOUND DETECTION ---
+# Starts a clip on a loud sound, and keeps the current one going while it lasts
+sound_trigger = AudioTrigger(SAMPLE_RATE, BLOCK_SIZE, trigger_level=SOUND_THRESHOLD, on_trigger=recorder.trigger)
+# Audio for everything a clip can cover, so every clip gets a matching WAV
+audio_ring = AudioRing(PREROLL_SECONDS + MAX_CLIP_SECONDS + POSTROLL_SECONDS + 5, SAMPLE_RATE, BLOCK_SIZE)
 
-# --- SOUND DETECTION FUNCTION ---
 def sound_callback(indata, frames, time_info, status):
-    volume_norm = np.linalg.norm(indata) * 10
-    global sound_detected
-    if volume_norm > SOUND_THRESHOLD * 100:
-        sound_detected = True
+    # Time of the block's first sample on the same clock as the video frames' capture timestamps
+    now = time.monotonic()
+    delay = time_info.currentTime - time_info.inputBufferAdcTime
+    block_start = now - delay if time_info.inputBufferAdcTime > 0 and 0 <= delay < 1 else now - frames / SAMPLE_RATE
+    samples = indata[:, 0]
+    audio_ring.write(samples, block_start)
+    sound_trigger.process(samples, block_start)
     return None
 
+def save_audio(clip_path, start, end):
+    wav_path = os.path.splitext(clip_path)[0] + ".wav"
+    audio_ring.save_wav(wav_path, start, end)
+    print(f"Saved audio: {wav_path}")
+    # start is time.monotonic() based; the library keeps wall-clock times
+    # Indexed (and, with ffmpeg, turned into an MP4 with this audio) on the library's thread
+    library.add_later(clip_path, time.time() - (time.monotonic() - start), "sound", attachments=[wav_path])
+
 # --- START AUDIO STREAM ---
-sound_detected = False
-stream = sd.InputStream(callback=sound_callback, channels=1, samplerate=SAMPLE_RATE)
+stream = sd.InputStream(callback=sound_callback, channels=1, samplerate=SAMPLE_RATE, blocksize=BLOCK_SIZE,
+                        dtype="float32")
 stream.start()
 
 print("Listening for sounds... Press 'q' to quit.")
@@ -40,51 +72,24 @@ while True:
     ret, frame = cap.read()
     if not ret:
         break
+    # Grab time, so clip timing follows the camera rather than this loop
+    recorder.add(frame, cap.last_timestamp)
 
-    buffer.append(frame)
-
-    if sound_detected:
-        print("Sound detected! Recording 5-second clip...")
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        filename = os.path.join("recordings", f"sound_clip_{int(time.time())}.mp4")
-        out = cv2.VideoWriter(filename, fourcc, frame_rate, (frame_width, frame_height))
-
-        # Display recording status
-        start_time_display = time.time()
-        while time.time() - start_time_display < 1:
-            display_frame = frame.copy()
-            cv2.putText(display_frame, "🔴 Recording...", (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
-            cv2.imshow("Camera", display_frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-
-        # Save the last 2 seconds (from buffer)
-        for f in list(buffer):
-            out.write(f)
-
-        # Then record 3 more seconds live
-        start_time = time.time()
-        while time.time() - start_time < DURATION_AFTER_SOUND - 2:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            out.write(frame)
-            display_frame = frame.copy()
-            cv2.putText(display_frame, "🔴 Recording...", (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
-            cv2.imshow("Camera", display_frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-
-        out.release()
-        print(f"Saved clip: {filename}")
-        sound_detected = False
+    if recorder.recording:
+        frame = frame.copy()
+        cv2.putText(frame, "🔴 Recording...", (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
+    cv2.imshow("Camera", frame)
 
     # Exit key
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
 # --- CLEANUP ---
-cap.release()
-cv2.destroyAllWindows()
 stream.stop()
 stream.close()
+recorder.close()  # finishes a clip in progress
+library.close()  # finishes indexing/transcoding queued clips
+if recorder.dropped:
+    print(f"Recorder fell behind and skipped {recorder.dropped} frames (gaps are filled in the clips)")
+cap.release()
+cv2.destroyAllWindows()